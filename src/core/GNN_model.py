@@ -1,17 +1,23 @@
 import random
 import os, sys, time, shutil
+import argparse
+import threading
 import numpy as np
 
 import torch
 import torch.nn as nn
 import torch.optim as optim
+import torch.distributed as dist
+import torch.multiprocessing as torchmp
+from torch.nn.parallel import DistributedDataParallel
 from torch.optim.lr_scheduler import MultiStepLR
 from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Sampler
 from torch.nn import DataParallel as DataParallel_raw
 
 sys.path.append(f'{os.getcwd()}/src')
 from core.log_print import *
-from core.utils import ListRWTools
+from core.utils import ListRWTools, SSHTools
 
 
 class DataParallel(DataParallel_raw):
@@ -28,11 +34,6 @@ class DataParallel(DataParallel_raw):
                     new_inputs[i][key] = kwargs[key][i].to(device, non_blocking=True)
                 break
             #
-            elif key == 'crystal_atom_idx':
-                for i, device in enumerate(self.device_ids):
-                    new_inputs[i][key] = [cry_idx.to(device, non_blocking=True) 
-                                            for cry_idx in kwargs[key][i]]
-            #
             else:
                 for i, device in enumerate(self.device_ids):
                     new_inputs[i][key] = kwargs[key][i].to(device, non_blocking=True)
@@ -43,14 +44,62 @@ class DataParallel(DataParallel_raw):
         
 
 class GNNData(Dataset):
-    #Self-define dataset
+    #Packed dataset, samples are stored contiguously with atom offsets
     def __init__(self, atom_feas, atom_symm, nbr_feas, nbr_idxes, targets):
-        self.atom_feas = atom_feas
-        self.atom_symm = atom_symm
-        self.nbr_feas = nbr_feas
-        self.nbr_idxes = nbr_idxes
-        self.targets = targets
-
+        atom_num = [len(i) for i in atom_feas]
+        self.offsets = np.concatenate(([0], np.cumsum(atom_num))).astype(int)
+        self.atom_fea = torch.from_numpy(self.pack(atom_feas, np.float32))
+        self.atom_symm = torch.from_numpy(self.pack(atom_symm, np.float32))
+        self.nbr_fea = torch.from_numpy(self.pack(nbr_feas, np.float32))
+        #neighbor index is offset by position in packed arrays
+        nbr_idxes = [np.array(idx) + self.offsets[i] for i, idx in enumerate(nbr_idxes)]
+        self.nbr_idx = torch.from_numpy(self.pack(nbr_idxes, np.int64))
+        self.targets = torch.Tensor(np.array(targets, dtype=np.float32)).view(-1, 1)
+    
+    def pack(self, arrays, dtype):
+        """
+        concatenate arrays of samples into one array
+        
+        Parameters
+        ----------
+        arrays [float, 3d]: arrays of samples
+        dtype [obj, 0d]: data type
+        
+        Returns
+        ----------
+        packed [float, nd, np]: packed array
+        """
+        if len(arrays) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.concatenate([np.array(i, dtype=dtype) for i in arrays])
+    
+    def state_dict(self):
+        """
+        return packed arrays as plain tensors
+        
+        Returns
+        ----------
+        state [dict]: packed tensors and offsets
+        """
+        return {'offsets': torch.from_numpy(self.offsets), 
+                'atom_fea': self.atom_fea, 'atom_symm': self.atom_symm,
+                'nbr_fea': self.nbr_fea, 'nbr_idx': self.nbr_idx, 'targets': self.targets}
+    
+    def load_state_dict(self, state):
+        """
+        load packed arrays saved by state_dict
+        
+        Parameters
+        ----------
+        state [dict]: packed tensors and offsets
+        """
+        self.offsets = state['offsets'].numpy()
+        self.atom_fea = state['atom_fea']
+        self.atom_symm = state['atom_symm']
+        self.nbr_fea = state['nbr_fea']
+        self.nbr_idx = state['nbr_idx']
+        self.targets = state['targets']
+    
     def __len__(self):
         """
         length of dataset
@@ -59,27 +108,75 @@ class GNNData(Dataset):
     
     def __getitem__(self, idx):
         """
-        get each item in dataset by idx
+        get each item in dataset by idx, or a whole batch by list of idx
         
         Returns
         ----------
         atom_fea [float, 2d, tensor]: feature of atoms
         atom_symm [int, 2d]: symmetry of atoms
-        nbr_fea [float, 3d, tensor]: bond feature
+        nbr_fea [float, 2d, tensor]: neighbor distance
         nbr_idx [int, 2d, tensor]: index of neighbors
         target [int, 1d, tensor]: target value
         """
-        atom_fea = self.atom_feas[idx]
-        atom_symm = self.atom_symm[idx]
-        nbr_fea = self.nbr_feas[idx]
-        nbr_idx = self.nbr_idxes[idx]
+        if not np.isscalar(idx):
+            return self.get_batch(idx)
+        start, end = self.offsets[idx], self.offsets[idx+1]
+        atom_fea = self.atom_fea[start:end]
+        atom_symm = self.atom_symm[start:end].tolist()
+        nbr_fea = self.nbr_fea[start:end]
+        nbr_idx = self.nbr_idx[start:end] - start
         target = self.targets[idx]
-        #convert to float tensor
-        atom_fea = torch.Tensor(atom_fea)
-        nbr_fea = torch.Tensor(nbr_fea)
-        nbr_idx = torch.LongTensor(nbr_idx)
-        target = torch.Tensor([target])
         return atom_fea, atom_symm, nbr_fea, nbr_idx, target
+    
+    def get_batch(self, idx):
+        """
+        collate batch from packed arrays
+        contiguous samples are sliced without copy
+        
+        Parameters
+        ----------
+        idx [int, 1d]: index of samples
+        
+        Returns
+        ----------
+        store_1 [float, 2d, tensor]: atom features
+        store_2 [float, 1d, tensor]: symmetry weight
+        store_3 [float, 3d, tensor]: bond features
+        store_4 [int, 2d, tensor]: index of neighbors
+        store_5 [int, 1d, tensor]: crystal id of atoms
+        target [float, 2d, tensor]: target values
+        """
+        idx = np.array(idx, dtype=int)
+        start, end = self.offsets[idx], self.offsets[idx+1]
+        atom_num = end - start
+        #shift from packed position to batch position
+        base = np.cumsum(atom_num) - atom_num
+        shift = np.repeat(base - start, atom_num)
+        if np.all(start[1:] == end[:-1]):
+            rows = slice(start[0], end[-1])
+        else:
+            rows = torch.from_numpy(np.arange(np.sum(atom_num)) - shift)
+        store_1 = self.atom_fea[rows]
+        store_2 = self.atom_symm[rows]
+        store_3 = self.nbr_fea[rows]
+        store_4 = self.nbr_idx[rows] + torch.from_numpy(shift).view(-1, 1)
+        store_5 = torch.from_numpy(np.repeat(np.arange(len(idx)), atom_num))
+        return (store_1, store_2, store_3, store_4, store_5), self.targets[idx]
+
+
+def collate_packed(batch):
+    """
+    batch is already collated by GNNData
+    
+    Parameters
+    ----------
+    batch [tuple]: output of GNNData.get_batch
+    
+    Returns
+    ----------
+    batch [tuple]: input of GNN and target values
+    """
+    return batch
 
 def collate_pool_cpu(dataset_list):
     """
@@ -95,26 +192,26 @@ def collate_pool_cpu(dataset_list):
     store_2 [float, 2d]: symmetry weight assigned to gpus
     store_3 [float, 4d]: bond features assigned to gpus
     store_4 [int, 3d]: index of neighbors assigned to gpus
-    store_5 [int, 3d]: index of crystals assigned to gpus
+    store_5 [int, 1d]: crystal id of atoms
     target [float, 2d, tensor]: target values
     """
     batch_atom_fea, batch_symm, batch_nbr_fea  = [], [], []
-    batch_nbr_idx, crystal_atom_idx, batch_target = [], [], []
+    batch_nbr_idx, crystal_idx, batch_target = [], [], []
     base_idx = 0
-    for atom_fea, atom_symm, nbr_fea, nbr_idx, target in dataset_list:
+    for i, (atom_fea, atom_symm, nbr_fea, nbr_idx, target) in enumerate(dataset_list):
         n_i = len(atom_fea)
         batch_atom_fea.append(atom_fea)
         batch_symm += atom_symm
         batch_nbr_fea.append(nbr_fea)
         batch_nbr_idx.append(nbr_idx+base_idx)
-        crystal_atom_idx.append(torch.LongTensor(base_idx+np.arange(n_i)))
+        crystal_idx += [i for _ in range(n_i)]
         batch_target.append(target)
         base_idx += n_i
     store_1 = torch.cat(batch_atom_fea)
     store_2 = torch.Tensor(batch_symm)
     store_3 = torch.cat(batch_nbr_fea)
     store_4 = torch.cat(batch_nbr_idx)
-    store_5 = crystal_atom_idx
+    store_5 = torch.LongTensor(crystal_idx)
     return (store_1, store_2, store_3, store_4, store_5), \
             torch.stack(batch_target, dim=0)
 
@@ -132,13 +229,13 @@ def collate_pool_gpu(dataset_list):
     store_2 [float, 2d]: symmetry weight assigned to gpus
     store_3 [float, 4d]: bond features assigned to gpus
     store_4 [int, 3d]: index of neighbors assigned to gpus
-    store_5 [int, 3d]: index of crystals assigned to gpus
+    store_5 [int, 2d]: crystal id of atoms assigned to gpus
     target [float, 2d, tensor]: target values
     """
     assign_plan = batch_divide(dataset_list)
     batch_atom_fea, batch_symm, batch_nbr_fea  = [], [], []
-    batch_nbr_idx, crystal_atom_idx, batch_target = [], [], []
-    num, base_idx, counter = 0, 0, 0
+    batch_nbr_idx, crystal_idx, batch_target = [], [], []
+    num, base_idx, counter, crys_num = 0, 0, 0, 0
     store_1, store_2, store_3, store_4, store_5 = [], [], [], [], []
     #divide data by number of gpus
     for atom_fea, atom_symm, nbr_fea, nbr_idx, target in dataset_list:
@@ -148,9 +245,10 @@ def collate_pool_gpu(dataset_list):
         batch_symm += atom_symm
         batch_nbr_fea.append(nbr_fea)
         batch_nbr_idx.append(base_idx+nbr_idx)
-        crystal_atom_idx.append(torch.LongTensor(base_idx+np.arange(n_i)))
+        crystal_idx += [crys_num for _ in range(n_i)]
         batch_target.append(target)
         base_idx += n_i
+        crys_num += 1
         counter += 1
         #save data
         if counter == assign_plan[num]:
@@ -158,10 +256,10 @@ def collate_pool_gpu(dataset_list):
             store_2.append(torch.Tensor(batch_symm))
             store_3.append(torch.cat(batch_nbr_fea))
             store_4.append(torch.cat(batch_nbr_idx))
-            store_5.append(crystal_atom_idx)
+            store_5.append(torch.LongTensor(crystal_idx))
             batch_atom_fea, batch_nbr_fea, batch_nbr_idx = [], [], []
-            batch_symm, crystal_atom_idx = [], []
-            base_idx = 0
+            batch_symm, crystal_idx = [], []
+            base_idx, crys_num = 0, 0
             num += 1
     return (store_1, store_2, store_3, store_4, store_5), \
             torch.stack(batch_target, dim=0)
@@ -205,29 +303,158 @@ def batch_balance(num, batch_size, tuple):
         for i in tuple:
             del i[-num_last_batch:]
 
-def get_loader(dataset, batch_size, num_workers, shuffle=False):
+class AtomBudgetSampler(Sampler):
+    #Pack crystals into batches up to budget of atoms
+    def __init__(self, dataset, batch_size, shuffle=False, min_num=1, rank=0, world_size=1):
+        self.atom_num = np.diff(dataset.offsets)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.min_num = min_num
+        self.rank = rank
+        self.world_size = world_size
+        self.epoch = 0
+        self.batches = None
+        if Batch_Atom_Budget > 0:
+            self.budget = Batch_Atom_Budget
+        elif len(self.atom_num) > 0:
+            self.budget = batch_size*np.mean(self.atom_num)
+        else:
+            self.budget = batch_size
+    
+    def set_epoch(self, epoch):
+        """
+        set epoch, batches are rebuilt and all processes shuffle in same order
+        
+        Parameters
+        ----------
+        epoch [int, 0d]: training epoch
+        """
+        self.epoch = epoch
+        self.batches = None
+    
+    def get_random(self):
+        """
+        random generator shared by processes in distributed training
+        
+        Returns
+        ----------
+        rng [obj, 0d]: random generator
+        """
+        if self.world_size > 1:
+            return np.random.RandomState(Dist_Seed+self.epoch)
+        return np.random
+    
+    def get_order(self):
+        """
+        order of crystals, shuffled crystals are sorted by size in buckets
+        
+        Returns
+        ----------
+        idx [int, 1d, np]: order of crystals
+        """
+        idx = np.arange(len(self.atom_num))
+        if self.shuffle and len(idx) > 0:
+            self.get_random().shuffle(idx)
+            bucket = Batch_Bucket_Size*self.batch_size
+            buckets = [idx[i:i+bucket] for i in range(0, len(idx), bucket)]
+            idx = np.concatenate([i[np.argsort(self.atom_num[i], kind='stable')] for i in buckets])
+        return idx
+    
+    def get_batches(self):
+        """
+        pack crystals in order until atom budget is full
+        edges are bounded too since neighbor number is fixed
+        
+        Returns
+        ----------
+        batches [int, 2d]: index of crystals in each batch
+        """
+        batches, batch, atoms = [], [], 0
+        for i in self.get_order():
+            if len(batch) >= self.min_num and atoms + self.atom_num[i] > self.budget:
+                batches.append(batch)
+                batch, atoms = [], 0
+            batch.append(int(i))
+            atoms += self.atom_num[i]
+        if len(batch) > 0:
+            if len(batch) < self.min_num and len(batches) > 0:
+                batches[-1] += batch
+            else:
+                batches.append(batch)
+        if self.shuffle:
+            self.get_random().shuffle(batches)
+        #processes get same number of batches, repeat batches to pad
+        if self.world_size > 1 and len(batches) > 0:
+            pad = -len(batches) % self.world_size
+            batches += [batches[i % len(batches)] for i in range(pad)]
+            batches = batches[self.rank::self.world_size]
+        return batches
+    
+    def __iter__(self):
+        #batches are built once per epoch, shared by iteration and length
+        if self.batches is None:
+            self.batches = self.get_batches()
+        return iter(self.batches)
+    
+    def __len__(self):
+        if self.batches is None:
+            self.batches = self.get_batches()
+        return len(self.batches)
+
+
+def get_loader(dataset, batch_size, num_workers, shuffle=False, rank=0, world_size=1):
     """
-    returen data loader
+    returen data loader, batches are packed by number of atoms
         
     Parameters
     ----------
     dataset [obj]: object generated by GNNData
+    rank [int, 0d]: rank of process in distributed training
+    world_size [int, 0d]: number of processes in distributed training
     
     Returns
     ----------
     loader [obj]: data loader of ppm
     """
     if Job_Queue == 'CPU':
-        collate_pool = collate_pool_cpu
+        sampler = AtomBudgetSampler(dataset, batch_size, shuffle, rank=rank, world_size=world_size)
+        loader = DataLoader(dataset, batch_size=None, sampler=sampler,
+                            collate_fn=collate_packed, num_workers=num_workers,
+                            pin_memory=True)
     elif Job_Queue == 'GPU':
-        collate_pool = collate_pool_gpu
-    loader = DataLoader(dataset, batch_size=batch_size,
-                        collate_fn=collate_pool,
-                        shuffle=shuffle, num_workers=num_workers,
-                        pin_memory=True)
+        sampler = AtomBudgetSampler(dataset, batch_size, shuffle, min_num=Num_GPUs)
+        loader = DataLoader(dataset, batch_sampler=sampler,
+                            collate_fn=collate_pool_gpu, num_workers=num_workers,
+                            pin_memory=True)
     return loader
 
 
+class GaussianExpand(nn.Module):
+    #Expand near distance in gaussian feature space
+    def __init__(self, dmin=0, dmax=8, step=0.2, var=0.2):
+        super(GaussianExpand, self).__init__()
+        filter = torch.arange(dmin, dmax+step, step, dtype=torch.float32)
+        #buffers are not saved, old checkpoints stay loadable
+        self.register_buffer('filter', filter, persistent=False)
+        self.register_buffer('var', torch.tensor(var, dtype=torch.float32), persistent=False)
+    
+    def forward(self, distances):
+        """
+        expand distances, expanded features pass through
+        
+        Parameters
+        ----------
+        distances [float, 2d, tensor]: distance of near neighbors
+        
+        Returns
+        ----------
+        nbr_fea [float, 3d, tensor]: gaussian feature vector
+        """
+        if distances.dim() == 3:
+            return distances
+        return torch.exp(-(distances.unsqueeze(-1) - self.filter)**2 / self.var**2)
+
+
 class ConvLayer(nn.Module):
     #Graph convolutional layer
     def __init__(self, atom_fea_len, nbr_fea_len):
@@ -271,6 +498,39 @@ class ConvLayer(nn.Module):
         nbr_sumed = self.bn2(nbr_sumed)
         out = self.softplus2(atom_in_fea + nbr_sumed)
         return out
+    
+    def forward_rows(self, atom_in_fea, nbr_fea, nbr_idx, rows):
+        """
+        update atoms in rows only, used in eval mode
+        
+        Parameters
+        ----------
+        atom_in_fea [float, 2d]: atom feature vector
+        nbr_fea [float, 3d]: bond feature vector
+        nbr_idx [int, 2d]: index of neighbors
+        rows [int, 1d]: index of updated atoms
+        
+        Returns
+        ----------
+        out [float, 2d]: feature vector of updated atoms
+        """
+        nbr_idx = nbr_idx[rows]
+        N, M = nbr_idx.shape
+        self_fea = atom_in_fea[rows]
+        atom_nbr_fea = atom_in_fea[nbr_idx, :]
+        total_nbr_fea = torch.cat(
+            [self_fea.unsqueeze(1).expand(N, M, self.atom_fea_len),
+             atom_nbr_fea, nbr_fea[rows]], dim=2)
+        total_gated_fea = self.fc_full(total_nbr_fea)
+        total_gated_fea = self.bn1(total_gated_fea.view(
+            -1, self.atom_fea_len*2)).view(N, M, self.atom_fea_len*2)
+        nbr_filter, nbr_core = total_gated_fea.chunk(2, dim=2)
+        nbr_filter = self.sigmoid(nbr_filter)
+        nbr_core = self.softplus1(nbr_core)
+        nbr_sumed = torch.sum(nbr_filter * nbr_core, dim=1)
+        nbr_sumed = self.bn2(nbr_sumed)
+        out = self.softplus2(self_fea + nbr_sumed)
+        return out
         
 
 class CrystalGraphConvNet(nn.Module):
@@ -278,6 +538,7 @@ class CrystalGraphConvNet(nn.Module):
     def __init__(self, n_conv=3, orig_atom_fea_len=92, 
                  atom_fea_len=64, nbr_fea_len=41, h_fea_len=128):
         super(CrystalGraphConvNet, self).__init__()
+        self.expansion = GaussianExpand()
         self.embedding = nn.Linear(orig_atom_fea_len, atom_fea_len)
         self.convs = nn.ModuleList([ConvLayer(atom_fea_len=atom_fea_len,
                                               nbr_fea_len=nbr_fea_len)
@@ -286,7 +547,7 @@ class CrystalGraphConvNet(nn.Module):
         self.conv_to_fc_softplus = nn.Softplus()
         self.fc_out = nn.Linear(h_fea_len, 1)
     
-    def forward(self, atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_atom_idx):
+    def forward(self, atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_idx):
         """
         predict energy
         
@@ -294,43 +555,46 @@ class CrystalGraphConvNet(nn.Module):
         ----------
         atom_fea [float, 2d, tensor]: atom feature
         atom_symm [float, 1d, tensor]: symmetry of atoms
-        nbr_fea [float, 3d, tensor]: bond feature
+        nbr_fea [float, 2d, tensor]: neighbor distance
         nbr_idx [int, 2d, tensor]: neighbor index
-        crystal_atom_idx [int, 2d, tensor]: atom index in batch
+        crystal_idx [int, 1d, tensor]: crystal id of atoms
 
         Returns
         ----------
         out [float, 2d, tensor]: prediction energy
         """
+        nbr_fea = self.expansion(nbr_fea)
         atom_fea = self.embedding(atom_fea)
         for conv_func in self.convs:
             atom_fea = conv_func(atom_fea, nbr_fea, nbr_idx)
-        crys_fea = self.pooling(atom_fea, atom_symm, crystal_atom_idx)
+        crys_fea = self.pooling(atom_fea, atom_symm, crystal_idx)
         crys_fea = self.conv_to_fc(self.conv_to_fc_softplus(crys_fea))
         crys_fea = self.conv_to_fc_softplus(crys_fea)
         out = self.fc_out(crys_fea)
         return out
     
-    def pooling(self, atom_fea, atom_symm, crystal_atom_idx):
+    def pooling(self, atom_fea, atom_symm, crystal_idx):
         """
         symmetry weighted average
-        mix atom vector into crystal vector
+        mix atom vector into crystal vector by scatter sum
         
         Parameters
         ----------
         atom_fea [float, 2d, tensor]: atom vector
         atom_symm [float, 1d, tensor]: symmetry of atoms
-        crystal_atom_idx [int, 2d, tensor]: atom index in batch
+        crystal_idx [int, 1d, tensor]: crystal id of atoms
         
         Returns
         ----------
         crys_fea [float, 2d, tensor]: crystal vector
         """
-        multiplicity = [torch.abs(atom_symm[idx_map]).view(-1,1) for idx_map in crystal_atom_idx]
-        weights = [multi/torch.sum(multi) for multi in multiplicity]
-        summed_fea = [torch.sum(weight*atom_fea[idx_map], dim=0, keepdim=True) 
-                      for weight, idx_map in zip(weights, crystal_atom_idx)]
-        return torch.cat(summed_fea, dim=0)
+        crys_num = int(crystal_idx[-1]) + 1
+        multiplicity = torch.abs(atom_symm).view(-1, 1).to(atom_fea.dtype)
+        total = torch.zeros((crys_num, 1), dtype=atom_fea.dtype, device=atom_fea.device)
+        total = total.index_add_(0, crystal_idx, multiplicity)
+        summed_fea = torch.zeros((crys_num, atom_fea.shape[1]), dtype=atom_fea.dtype, device=atom_fea.device)
+        summed_fea = summed_fea.index_add_(0, crystal_idx, multiplicity*atom_fea)
+        return summed_fea/total
 
 
 class FeatureExtractNet(CrystalGraphConvNet):
@@ -338,11 +602,94 @@ class FeatureExtractNet(CrystalGraphConvNet):
     def __init__(self):
         super(FeatureExtractNet, self).__init__()
         
-    def forward(self, atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_atom_idx):
+    def forward(self, atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_idx):
+        nbr_fea = self.expansion(nbr_fea)
         atom_fea = self.embedding(atom_fea)
         for conv_func in self.convs:
             atom_fea = conv_func(atom_fea, nbr_fea, nbr_idx)
-        crys_fea = self.pooling(atom_fea, atom_symm, crystal_atom_idx)
+        crys_fea = self.pooling(atom_fea, atom_symm, crystal_idx)
+        crys_fea = self.conv_to_fc(self.conv_to_fc_softplus(crys_fea))
+        crys_fea = self.conv_to_fc_softplus(crys_fea)
+        return crys_fea
+    
+    def forward_cache(self, atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_idx):
+        """
+        get crystal vector and keep atom features of each layer
+        
+        Parameters
+        ----------
+        atom_fea [float, 2d, tensor]: atom feature
+        atom_symm [float, 1d, tensor]: symmetry of atoms
+        nbr_fea [float, 2d, tensor]: neighbor distance
+        nbr_idx [int, 2d, tensor]: neighbor index
+        crystal_idx [int, 1d, tensor]: crystal id of atoms
+        
+        Returns
+        ----------
+        crys_fea [float, 2d, tensor]: crystal vector
+        layer_fea [float, 3d, tensor]: atom features of each layer
+        """
+        nbr_fea = self.expansion(nbr_fea)
+        atom_fea = self.embedding(atom_fea)
+        layer_fea = [atom_fea]
+        for conv_func in self.convs:
+            atom_fea = conv_func(atom_fea, nbr_fea, nbr_idx)
+            layer_fea.append(atom_fea)
+        crys_fea = self.readout_cache(layer_fea, atom_symm, crystal_idx)
+        return crys_fea, layer_fea
+    
+    def forward_update(self, layer_fea, changed, atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_idx):
+        """
+        update atom features within receptive field of changed atoms
+        
+        Parameters
+        ----------
+        layer_fea [float, 3d, tensor]: cached atom features of each layer
+        changed [int, 1d, tensor]: atoms with changed type or neighbors
+        atom_fea [float, 2d, tensor]: atom feature
+        atom_symm [float, 1d, tensor]: symmetry of atoms
+        nbr_fea [float, 2d, tensor]: neighbor distance
+        nbr_idx [int, 2d, tensor]: neighbor index
+        crystal_idx [int, 1d, tensor]: crystal id of atoms
+        
+        Returns
+        ----------
+        crys_fea [float, 2d, tensor]: crystal vector
+        new_layer_fea [float, 3d, tensor]: updated atom features of each layer
+        """
+        nbr_fea = self.expansion(nbr_fea)
+        N = len(nbr_idx)
+        affect = torch.zeros(N, dtype=torch.bool)
+        affect[changed] = True
+        #update embedding of changed atoms
+        fea = layer_fea[0].clone()
+        fea[changed] = self.embedding(atom_fea[changed])
+        new_layer_fea = [fea]
+        for i, conv_func in enumerate(self.convs):
+            #atoms whose neighbors are affected in last layer
+            affect = affect | affect[nbr_idx].any(dim=1)
+            rows = torch.nonzero(affect).flatten()
+            fea = layer_fea[i+1].clone()
+            fea[rows] = conv_func.forward_rows(new_layer_fea[-1], nbr_fea, nbr_idx, rows)
+            new_layer_fea.append(fea)
+        crys_fea = self.readout_cache(new_layer_fea, atom_symm, crystal_idx)
+        return crys_fea, new_layer_fea
+    
+    def readout_cache(self, layer_fea, atom_symm, crystal_idx):
+        """
+        pool last layer of cached atom features into crystal vector
+        
+        Parameters
+        ----------
+        layer_fea [float, 3d, tensor]: atom features of each layer
+        atom_symm [float, 1d, tensor]: symmetry of atoms
+        crystal_idx [int, 1d, tensor]: crystal id of atoms
+        
+        Returns
+        ----------
+        crys_fea [float, 2d, tensor]: crystal vector
+        """
+        crys_fea = self.pooling(layer_fea[-1], atom_symm, crystal_idx)
         crys_fea = self.conv_to_fc(self.conv_to_fc_softplus(crys_fea))
         crys_fea = self.conv_to_fc_softplus(crys_fea)
         return crys_fea
@@ -358,6 +705,17 @@ class ReadoutNet(CrystalGraphConvNet):
         return out
 
 
+class EnsembleReadoutNet(nn.Module):
+    #several readout heads on shared crystal vector
+    def __init__(self, head_num=8, h_fea_len=128):
+        super(EnsembleReadoutNet, self).__init__()
+        self.fc_heads = nn.Linear(h_fea_len, head_num)
+    
+    def forward(self, crys_fea):
+        out = self.fc_heads(crys_fea)
+        return out
+
+
 class GNNTrain(ListRWTools):
     #Train property predict model
     def __init__(self, iteration, train_data, valid_data, test_data, 
@@ -373,7 +731,19 @@ class GNNTrain(ListRWTools):
         self.num_workers = num_workers
         self.Num_GPUs = Num_GPUs
         self.print_feq = print_feq
+        self.iteration = iteration
+        self.rank, self.world_size = 0, 1
+        self.best_state, self.save_thread = None, None
         self.model_save_path = f'{Model_Path}/{iteration:02.0f}'
+        #warm start from model of last iteration
+        self.warm_model = f'{Model_Path}/{iteration-1:02.0f}/model_best.pth.tar'
+        self.warm_start = Warm_Start_Training and os.path.exists(self.warm_model)
+        if self.warm_start:
+            self.epochs = Warm_Start_Epochs
+        #frozen trunk of random model gives random crystal vectors
+        if Frozen_Trunk and not (Use_Pretrain_Model or self.warm_start):
+            raise ValueError('Frozen_Trunk needs a trained trunk, set Use_Pretrain_Model '
+                             f'or Warm_Start_Training with {self.warm_model}')
         if Job_Queue == 'CPU':
             self.device = torch.device('cpu')
         elif Job_Queue == 'GPU':
@@ -387,30 +757,51 @@ class GNNTrain(ListRWTools):
         """
         #load data
         train_loader = get_loader(self.train_data, 
-                                  self.batch_size, self.num_workers, shuffle=True)
+                                  self.batch_size, self.num_workers, shuffle=True,
+                                  rank=self.rank, world_size=self.world_size)
         valid_loader = get_loader(self.valid_data, 
                                   self.batch_size, self.num_workers)
         test_loader = get_loader(self.test_data, 
                                  self.batch_size, self.num_workers)
         sample_target = self.sample_data_list(self.train_data)
         normalizer = Normalizer(sample_target)
-        #build prediction model
-        if Dimension == 2:
+        #build prediction model, parameters of other ranks are broadcast from rank 0
+        load = Use_Pretrain_Model or self.warm_start
+        if self.rank > 0:
+            checkpoint, load = None, False
+        elif self.warm_start:
+            checkpoint = torch.load(self.warm_model, map_location=self.device)
+            normalizer.load_state_dict(checkpoint['normalizer'])
+            system_echo(f'Warm start from {self.warm_model}')
+        elif Dimension == 2:
             checkpoint = torch.load(Pretrain_Model_2d, map_location=self.device)
         elif Dimension == 3:
             checkpoint = torch.load(Pretrain_Model_3d, map_location=self.device)
-        model = self.model_initial(checkpoint, Use_Pretrain_Model)
+        model = self.model_initial(checkpoint, load)
+        #no gradient of trunk, it must be set before wrapping model
+        if Frozen_Trunk:
+            for name, param in model.named_parameters():
+                if not name.startswith('fc_out.'):
+                    param.requires_grad_(False)
         if Job_Queue == 'GPU':
             model = DataParallel(model)
+        elif self.world_size > 1:
+            model = DistributedDataParallel(model)
+            self.sync_normalizer(normalizer)
         model.to(self.device)
-        #set learning rate
-        if Use_Pretrain_Model:
-            if Job_Queue == 'CPU':
+        #set learning rate, only readout is trained with frozen trunk
+        if Frozen_Trunk:
+            if Job_Queue == 'CPU' and self.world_size == 1:
+                params = model.fc_out.parameters()
+            else:
+                params = model.module.fc_out.parameters()
+        elif Use_Pretrain_Model or self.warm_start:
+            if Job_Queue == 'CPU' and self.world_size == 1:
                 out_layer_id = list(map(id, model.fc_out.parameters()))
                 crysfea_layer = filter(lambda x: id(x) not in out_layer_id, model.parameters())
                 params = [{'params': crysfea_layer, 'lr': self.lr_factor*self.lr},
                           {'params': model.fc_out.parameters(), 'lr': self.lr}]
-            elif Job_Queue == 'GPU':
+            else:
                 out_layer_id = list(map(id, model.module.fc_out.parameters()))
                 crysfea_layer = filter(lambda x: id(x) not in out_layer_id, model.parameters())
                 params = [{'params': crysfea_layer, 'lr': self.lr_factor*self.lr},
@@ -421,33 +812,59 @@ class GNNTrain(ListRWTools):
         criterion = nn.MSELoss()
         optimizer = optim.Adam(params, lr=self.lr, weight_decay=0)
         scheduler = MultiStepLR(optimizer, milestones=[int(.8*self.epochs)], gamma=0.1)
-        mae_buffer, best_mae_error = [], 1e10
+        mae_buffer, best_mae_error, best_epoch = [], 1e10, 0
         system_echo('-----------Begin Training Property Predict Model------------')
         for epoch in range(0, self.epochs):
+            if Job_Queue == 'CPU':
+                train_loader.sampler.set_epoch(epoch)
+            elif Job_Queue == 'GPU':
+                train_loader.batch_sampler.set_epoch(epoch)
             if Update_ML_Model:
                 self.train_batch(train_loader, model, criterion, optimizer, epoch, normalizer)
-            mae_error = self.validate(valid_loader, model, criterion, epoch, normalizer)
+            #validate and decide on rank 0, other ranks follow
+            if self.rank > 0:
+                mae_error, is_best, stop = 0, False, False
+            else:
+                if self.world_size > 1:
+                    mae_error = self.validate(valid_loader, model.module, criterion, epoch, normalizer)
+                else:
+                    mae_error = self.validate(valid_loader, model, criterion, epoch, normalizer)
+                is_best = mae_error < best_mae_error
+                if is_best:
+                    best_epoch = epoch
+                #stop warm start training on validation plateau
+                stop = self.warm_start and epoch - best_epoch >= Early_Stop_Patience
+            if self.world_size > 1:
+                mae_error, is_best, stop = self.sync_decision(mae_error, is_best, stop)
             scheduler.step()
-            is_best = mae_error < best_mae_error
             best_mae_error = min(mae_error, best_mae_error)
-            if Job_Queue == 'CPU':
+            if self.rank > 0:
+                pass
+            elif Job_Queue == 'CPU' and self.world_size == 1:
                 self.save_checkpoint(epoch,
                     {'state_dict': model.state_dict(),
                     'normalizer': normalizer.state_dict()}, is_best)
-            elif Job_Queue == 'GPU':
+            else:
                 self.save_checkpoint(epoch,
                     {'state_dict': model.module.state_dict(),
                     'normalizer': normalizer.state_dict()}, is_best)
             mae_buffer.append([mae_error])
+            if stop:
+                if self.rank == 0:
+                    system_echo(f'Early stop at epoch {epoch}, best epoch {best_epoch}')
+                break
+        if self.rank > 0:
+            return
         system_echo('-----------------Evaluate Model on Test Set-----------------')
-        best_checkpoint = torch.load(f'{self.model_save_path}/model_best.pth.tar', map_location=self.device)
-        model = self.model_initial(best_checkpoint)
+        model = self.model_initial(self.best_state)
         if Job_Queue == 'GPU':
             model = DataParallel(model)
         model.to(self.device)
         self.validate(test_loader, model, criterion, epoch, normalizer, best_model_test=True)
         self.write_list2d(f'{self.model_save_path}/validation.dat', mae_buffer, style='{0:6.4f}')
-        self.remove_checkpoints()
+        self.wait_checkpoint()
+        if Checkpoint_Interval > 0:
+            self.remove_checkpoints()
         
     def train_batch(self, loader, model, criterion, optimizer, epoch, normalizer):
         """
@@ -467,13 +884,15 @@ class GNNTrain(ListRWTools):
         losses = AverageMeter()
         mae_errors = AverageMeter()
         model.train()
+        if Frozen_Trunk:
+            model.eval()
         start = time.time()
         for input, target in loader:
             data_time.update(time.time() - start)
             target_normed = normalizer.norm(target)
             target_var = target_normed.to(self.device, non_blocking=True)
             pred = model(atom_fea=input[0], atom_symm=input[1], nbr_fea=input[2],
-                         nbr_idx=input[3], crystal_atom_idx=input[4])
+                         nbr_idx=input[3], crystal_idx=input[4])
             loss = criterion(pred, target_var)
             mae_error = self.mae(normalizer.denorm(pred.data.cpu()), target)
             losses.update(loss.data.cpu(), target.size(0))
@@ -512,12 +931,12 @@ class GNNTrain(ListRWTools):
         for input, target in loader:
             #tensor with no grad
             with torch.no_grad():
-                atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_atom_idx = input
+                atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_idx = input
                 target_normed = normalizer.norm(target)
                 target_var = target_normed.to(self.device, non_blocking=True)
             #calculate loss
             pred = model(atom_fea=atom_fea, atom_symm=atom_symm, nbr_fea=nbr_fea,
-                         nbr_idx=nbr_idx, crystal_atom_idx=crystal_atom_idx)
+                         nbr_idx=nbr_idx, crystal_idx=crystal_idx)
             loss = criterion(pred, target_var)
             pred = normalizer.denorm(pred.data.cpu())
             mae_error = self.mae(pred, target)
@@ -569,14 +988,10 @@ class GNNTrain(ListRWTools):
         sample_target [float, 2d, tensor]: sampled target 
         """
         if len(dataset) < 500:
-            sample_data_list = [dataset[i] for i in range(len(dataset))]
+            idx = [i for i in range(len(dataset))]
         else:
-            sample_data_list = [dataset[i] for i in
-                                random.sample(range(len(dataset)), 500)]
-        if Job_Queue == 'CPU':
-            _, sample_target = collate_pool_cpu(sample_data_list)
-        elif Job_Queue == 'GPU':
-            _, sample_target = collate_pool_gpu(sample_data_list)
+            idx = random.sample(range(len(dataset)), 500)
+        sample_target = dataset.targets[idx]
         return sample_target
     
     def mae(self, prediction, target):
@@ -596,17 +1011,47 @@ class GNNTrain(ListRWTools):
     
     def save_checkpoint(self, epoch, state, is_best):
         """
-        save model
+        keep best model in memory, write it on improvement
+        other checkpoints are written every interval epochs
         
         Parameters
         ----------
         state [dict]: save data in the form of dictionary
         is_best [bool]: whether model perform best in validation set
         """
-        filename = f'{self.model_save_path}/checkpoint-{epoch:03.0f}.pth.tar'
-        torch.save(state, filename)
+        interval = Checkpoint_Interval > 0 and np.mod(epoch+1, Checkpoint_Interval) == 0
+        if is_best or interval:
+            state = {'state_dict': {key: value.detach().clone() for key, value in state['state_dict'].items()},
+                     'normalizer': {key: value.clone() for key, value in state['normalizer'].items()}}
         if is_best:
-            shutil.copyfile(filename, f'{self.model_save_path}/model_best.pth.tar')
+            self.best_state = state
+            self.write_checkpoint(state, f'{self.model_save_path}/model_best.pth.tar')
+        if interval:
+            self.write_checkpoint(state, f'{self.model_save_path}/checkpoint-{epoch:03.0f}.pth.tar')
+    
+    def write_checkpoint(self, state, filename):
+        """
+        write checkpoint, on background thread if allowed
+        
+        Parameters
+        ----------
+        state [dict]: copied parameters of model
+        filename [str, 0d]: name of checkpoint
+        """
+        if Checkpoint_Background:
+            self.wait_checkpoint()
+            self.save_thread = threading.Thread(target=torch.save, args=(state, filename))
+            self.save_thread.start()
+        else:
+            torch.save(state, filename)
+    
+    def wait_checkpoint(self):
+        """
+        wait for checkpoint writing on background
+        """
+        if self.save_thread is not None:
+            self.save_thread.join()
+            self.save_thread = None
     
     def remove_checkpoints(self):
         """
@@ -618,6 +1063,90 @@ class GNNTrain(ListRWTools):
                         rm checkpoint-*
                         '''
         os.system(shell_script)
+    
+    def sync_normalizer(self, normalizer):
+        """
+        broadcast mean and std of normalizer from rank 0
+        
+        Parameters
+        ----------
+        normalizer [obj]: normalize targets
+        """
+        stats = torch.tensor([float(normalizer.mean), float(normalizer.std)])
+        dist.broadcast(stats, src=0)
+        normalizer.mean, normalizer.std = stats[0], stats[1]
+    
+    def sync_decision(self, mae_error, is_best, stop):
+        """
+        broadcast validation mae, checkpoint and stop decision from rank 0
+        
+        Parameters
+        ----------
+        mae_error [float, 0d]: validation mae
+        is_best [bool, 0d]: whether model perform best in validation set
+        stop [bool, 0d]: whether stop training
+        
+        Returns
+        ----------
+        mae_error [float, 0d]: validation mae of rank 0
+        is_best [bool, 0d]: checkpoint decision of rank 0
+        stop [bool, 0d]: stop decision of rank 0
+        """
+        decision = torch.tensor([float(mae_error), float(is_best), float(stop)], dtype=torch.float64)
+        dist.broadcast(decision, src=0)
+        return decision[0].item(), bool(decision[1]), bool(decision[2])
+    
+    def train_epochs_distributed(self):
+        """
+        train model by gloo processes on host and CPU nodes
+        training set is sharded by rank, rank 0 saves checkpoints
+        """
+        world_size = Dist_Procs_per_Node*(1+len(Dist_Nodes))
+        data_file = f'{self.model_save_path}/dist_data.pth.tar'
+        if len(Dist_Nodes) > 0:
+            torch.save({'train': self.train_data.state_dict(), 'valid': self.valid_data.state_dict(), 
+                        'test': self.test_data.state_dict(),
+                        'batch_size': self.batch_size, 'lr': self.lr, 'lr_factor': self.lr_factor,
+                        'epochs': self.epochs, 'warm_start': self.warm_start}, data_file)
+            ssh = SSHTools()
+            for i, node in enumerate(Dist_Nodes):
+                rank_start = (i+1)*Dist_Procs_per_Node
+                shell_script = f'''
+                                #!/bin/bash --login
+                                cd {SCCOP_Path}/
+                                if [ ! -d {self.model_save_path} ]; then
+                                    mkdir -p {self.model_save_path}
+                                fi
+                                scp {Host_Node}:{SCCOP_Path}/{data_file} {self.model_save_path}/.
+                                python src/core/GNN_model.py --iteration {self.iteration} --rank {rank_start} --world {world_size} >> log&
+                                '''
+                ssh.ssh_node(shell_script, node)
+        system_echo(f'Distributed training with {world_size} processes')
+        torchmp.spawn(self.dist_worker, args=(0, world_size), nprocs=Dist_Procs_per_Node, join=True)
+        if os.path.exists(data_file):
+            os.remove(data_file)
+    
+    def dist_worker(self, local_rank, rank_start, world_size):
+        """
+        join process group and train on shard of training set
+        
+        Parameters
+        ----------
+        local_rank [int, 0d]: rank of process on node
+        rank_start [int, 0d]: first rank on node
+        world_size [int, 0d]: number of processes
+        """
+        self.rank, self.world_size = rank_start + local_rank, world_size
+        torch.set_num_threads(max(1, os.cpu_count()//Dist_Procs_per_Node))
+        if len(Dist_Nodes) > 0:
+            init_method = f'tcp://{Host_Node}:{Dist_Port}'
+        else:
+            init_method = f'tcp://127.0.0.1:{Dist_Port}'
+        dist.init_process_group('gloo', init_method=init_method, 
+                                rank=self.rank, world_size=world_size)
+        self.train_epochs()
+        dist.barrier()
+        dist.destroy_process_group()
         
 
 class Normalizer():
@@ -705,4 +1234,23 @@ class AverageMeter():
 
 
 if __name__ == '__main__':
-    pass
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iteration', type=int)
+    parser.add_argument('--rank', type=int)
+    parser.add_argument('--world', type=int)
+    args = parser.parse_args()
+    
+    #join distributed training from CPU node
+    iteration = args.iteration
+    data = torch.load(f'{Model_Path}/{iteration:02.0f}/dist_data.pth.tar', weights_only=True)
+    #rebuild datasets from packed tensors
+    dataset = []
+    for name in ['train', 'valid', 'test']:
+        gnn_data = GNNData([], [], [], [], [])
+        gnn_data.load_state_dict(data[name])
+        dataset.append(gnn_data)
+    gnn = GNNTrain(iteration, *dataset, 
+                   train_batchsize=data['batch_size'], train_epochs=data['epochs'],
+                   lr_factor=data['lr_factor'], lr=data['lr'])
+    gnn.warm_start, gnn.epochs = data['warm_start'], data['epochs']
+    torchmp.spawn(gnn.dist_worker, args=(args.rank, args.world), nprocs=Dist_Procs_per_Node, join=True)
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os, sys, time
+import hashlib
 import numpy as np
 
 import torch
@@ -11,6 +12,380 @@ from core.del_duplicates import DeleteDuplicates
 from core.utils import ListRWTools, SSHTools
 
 
+class InferenceSession():
+    #gradient-free GNN inference shared by SA, PES update and sample selection
+    def __init__(self, device):
+        self.device = device
+        self.model_name = None
+        self.normalizer = Normalizer(torch.tensor([]))
+        self.buffers = {}
+        self.precision, self.autocast = 'float32', False
+        self.ensemble_model = None
+        if hasattr(torch, 'inference_mode'):
+            self.grad_mode = torch.inference_mode
+        else:
+            self.grad_mode = torch.no_grad
+    
+    def load(self, model_name):
+        """
+        load feature extraction and readout model once
+        
+        Parameters
+        ----------
+        model_name [str, 0d]: full name of model
+        """
+        self.vec_model = FeatureExtractNet()
+        self.out_model = ReadoutNet()
+        precision = 'float32'
+        if model_name != 'random':
+            params = torch.load(model_name, map_location=self.device)
+            self.vec_model.load_state_dict(params['state_dict'])
+            self.out_model.load_state_dict(params['state_dict'])
+            self.normalizer.load_state_dict(params['normalizer'])
+            #precision passed accuracy check of model
+            precision = params.get('precision', 'float32')
+            #readout heads fitted on crystal vectors
+            if 'ensemble' in params:
+                head_num = len(params['ensemble']['fc_heads.bias'])
+                self.ensemble_model = EnsembleReadoutNet(head_num)
+                self.ensemble_model.load_state_dict(params['ensemble'])
+                self.ensemble_model.to(self.device)
+                self.ensemble_model.eval()
+        for model in [self.vec_model, self.out_model]:
+            model.to(self.device)
+            model.eval()
+            model.requires_grad_(False)
+        self.set_precision(precision)
+        self.model_name = model_name
+    
+    def set_precision(self, precision):
+        """
+        set inference precision, incremental update keeps float32
+        
+        Parameters
+        ----------
+        precision [str, 0d]: float32, bfloat16 or int8
+        """
+        self.vec_run, self.out_run, self.autocast = self.vec_model, self.out_model, False
+        if precision == 'int8':
+            layers = set([f'convs.{i}.fc_full' for i in range(len(self.vec_model.convs))])
+            self.vec_run = torch.quantization.quantize_dynamic(self.vec_model, layers, dtype=torch.qint8)
+            self.out_run = torch.quantization.quantize_dynamic(self.out_model, set(['fc_out']), dtype=torch.qint8)
+        elif precision == 'bfloat16':
+            self.autocast = True
+        if precision != 'int8' and GNN_JIT_Inference:
+            self.compile()
+        self.precision = precision
+    
+    def compile(self):
+        """
+        compile models by TorchScript and freeze weights
+        keep eager models if compiling fails
+        """
+        try:
+            self.vec_run = torch.jit.freeze(torch.jit.script(self.vec_model))
+            self.out_run = torch.jit.freeze(torch.jit.script(self.out_model))
+        except Exception as error:
+            self.vec_run, self.out_run = self.vec_model, self.out_model
+            system_echo(f'TorchScript compile failed, use eager model: {error}')
+    
+    def to_buffer(self, name, array, dtype):
+        """
+        copy array into preallocated tensor, buffer grows when too small
+        
+        Parameters
+        ----------
+        name [str, 0d]: name of buffer
+        array [float, nd]: input array
+        dtype [obj, 0d]: torch data type
+        
+        Returns
+        ----------
+        tensor [tensor, nd]: view of buffer filled by array
+        """
+        array = np.asarray(array)
+        shape = array.shape
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape[0] < shape[0] or buffer.shape[1:] != shape[1:]:
+            buffer = torch.empty((2*shape[0],)+tuple(shape[1:]), dtype=dtype, device=self.device)
+            self.buffers[name] = buffer
+        tensor = buffer[:shape[0]]
+        tensor.copy_(torch.from_numpy(array))
+        return tensor
+    
+    def get_input(self, symm, atom_fea, nbr_fea, nbr_idx, crystal_idx):
+        """
+        fill input tensors of GNN
+        
+        Parameters
+        ----------
+        symm [int, 1d]: symmetry of atoms
+        atom_fea [float, 2d]: atom feature
+        nbr_fea [float, 2d]: neighbor distance
+        nbr_idx [int, 2d]: neighbor index
+        crystal_idx [int, 1d]: crystal id of atoms
+        
+        Returns
+        ----------
+        input_var [tuple, 0d]: input of GNN
+        """
+        #buffers are always allocated and filled in grad mode of inference
+        with self.grad_mode():
+            input_var = (self.to_buffer('atom_fea', atom_fea, torch.float32),
+                         self.to_buffer('symm', symm, torch.float32),
+                         self.to_buffer('nbr_fea', nbr_fea, torch.float32),
+                         self.to_buffer('nbr_idx', nbr_idx, torch.long),
+                         self.to_buffer('crystal_idx', crystal_idx, torch.long))
+        return input_var
+    
+    def predict(self, symm, atom_fea, nbr_fea, nbr_idx, crystal_idx):
+        """
+        get crystal vectors and energys without autograd
+        
+        Parameters
+        ----------
+        symm [int, 1d]: symmetry of atoms
+        atom_fea [float, 2d]: atom feature
+        nbr_fea [float, 2d]: neighbor distance
+        nbr_idx [int, 2d]: neighbor index
+        crystal_idx [int, 1d]: crystal id of atoms
+        
+        Returns
+        ----------
+        energys [float, 1d, np]: prediction energys
+        crys_vec_np [float, 2d, np]: crystal vectors
+        """
+        input_var = self.get_input(symm, atom_fea, nbr_fea, nbr_idx, crystal_idx)
+        energys, crys_vec = self.forward(input_var)
+        return energys.numpy().flatten(), crys_vec.numpy()
+    
+    def forward(self, input_var):
+        """
+        forward of GNN in set precision
+        
+        Parameters
+        ----------
+        input_var [tuple, 0d]: input of GNN
+        
+        Returns
+        ----------
+        energys [float, 2d, tensor]: prediction energys
+        crys_vec [float, 2d, tensor]: crystal vectors
+        """
+        with self.grad_mode(), torch.autocast('cpu', dtype=torch.bfloat16, enabled=self.autocast):
+            crys_vec = self.vec_run(*input_var)
+            pred = self.out_run(crys_vec)
+        energys = self.normalizer.denorm(pred.float()).cpu()
+        return energys, crys_vec.float().cpu()
+    
+    def readout(self, crys_vec):
+        """
+        get energys from crystal vectors by readout layer
+        
+        Parameters
+        ----------
+        crys_vec [float, 2d, np]: crystal vectors
+        
+        Returns
+        ----------
+        energys [float, 1d, np]: prediction energys
+        """
+        if len(crys_vec) == 0:
+            return np.zeros(0)
+        with self.grad_mode():
+            crys_vec = torch.as_tensor(crys_vec, dtype=torch.float32, device=self.device)
+            pred = self.out_model(crys_vec)
+            energys = self.normalizer.denorm(pred).cpu().numpy().flatten()
+        return energys
+    
+    def readout_ensemble(self, crys_vec):
+        """
+        get mean and variance of energys by ensemble heads
+        
+        Parameters
+        ----------
+        crys_vec [float, 2d, np]: crystal vectors
+        
+        Returns
+        ----------
+        mean [float, 1d, np]: mean of energys
+        var [float, 1d, np]: variance of energys
+        """
+        if self.ensemble_model is None or len(crys_vec) == 0:
+            return self.readout(crys_vec), np.zeros(len(crys_vec))
+        with self.grad_mode():
+            crys_vec = torch.as_tensor(crys_vec, dtype=torch.float32, device=self.device)
+            pred = self.normalizer.denorm(self.ensemble_model(crys_vec)).cpu().numpy()
+        return np.mean(pred, axis=1), np.var(pred, axis=1)
+    
+    def get_trunk_id(self):
+        """
+        fingerprint of feature extraction model and its precision mode
+        vectors of int8, bfloat16 and compiled trunk are kept apart
+        
+        Returns
+        ----------
+        trunk_id [str, 0d]: sha1 digest of parameters
+        """
+        digest = hashlib.sha1()
+        compiled = isinstance(self.vec_run, torch.jit.ScriptModule)
+        digest.update(f'{self.precision}-{compiled}'.encode())
+        for key, value in sorted(self.vec_model.state_dict().items()):
+            digest.update(key.encode())
+            digest.update(value.detach().cpu().contiguous().numpy().tobytes())
+        return digest.hexdigest()
+    
+    def predict_loader(self, loader):
+        """
+        get crystal vectors and energys of samples in loader
+        
+        Parameters
+        ----------
+        loader [obj, 0d]: dataloader
+        
+        Returns
+        ----------
+        energys [float, 1d, np]: prediction energys
+        crys_vec [float, 2d, np]: crystal vectors
+        """
+        energys, crys_vec = [], []
+        for input, _ in loader:
+            input_var = [i.to(self.device) for i in input]
+            energy, vec = self.forward(input_var)
+            energys.append(energy)
+            crys_vec.append(vec)
+        energys = torch.cat(energys).numpy().flatten()
+        crys_vec = torch.cat(crys_vec).numpy()
+        return energys, crys_vec
+    
+    def predict_cache(self, symm, atom_fea, nbr_fea, nbr_idx, layer_fea=None, changed=None):
+        """
+        get crystal vector and energy with cached atom features
+        
+        Parameters
+        ----------
+        symm [int, 1d]: symmetry of atoms
+        atom_fea [float, 2d]: atom feature
+        nbr_fea [float, 2d]: neighbor distance
+        nbr_idx [int, 2d]: neighbor index
+        layer_fea [float, 3d, tensor]: cached atom features of each layer
+        changed [int, 1d]: atoms with changed type or neighbors
+        
+        Returns
+        ----------
+        energy [float, 0d]: prediction energy
+        crys_vec_np [float, 1d, np]: crystal vector
+        layer_fea [float, 3d, tensor]: atom features of each layer
+        """
+        with self.grad_mode():
+            input_var = self.get_input(symm, atom_fea, nbr_fea, nbr_idx, np.zeros(len(atom_fea), dtype=int))
+            if layer_fea is None:
+                crys_vec, layer_fea = self.vec_model.forward_cache(*input_var)
+            else:
+                changed = torch.as_tensor(changed, dtype=torch.long, device=self.device)
+                crys_vec, layer_fea = self.vec_model.forward_update(layer_fea, changed, *input_var)
+            pred = self.out_run(crys_vec)
+            energy = self.normalizer.denorm(pred).item()
+            crys_vec_np = crys_vec.cpu().numpy().flatten()
+        return energy, crys_vec_np, layer_fea
+
+
+class VectorStore():
+    #persistent crystal vectors of frozen trunk, new vectors are appended as shards
+    def __init__(self):
+        self.store = {}
+        self.new = {}
+        self.trunk_id = None
+    
+    def load(self, trunk_id):
+        """
+        load stored vectors, vectors of other trunk are dropped
+        
+        Parameters
+        ----------
+        trunk_id [str, 0d]: fingerprint of feature extraction model
+        """
+        if self.trunk_id == trunk_id:
+            return
+        self.store, self.new, self.trunk_id = self.read(trunk_id), {}, trunk_id
+    
+    def read(self, trunk_id):
+        """
+        read vectors of trunk from all shards
+        
+        Parameters
+        ----------
+        trunk_id [str, 0d]: fingerprint of feature extraction model
+        
+        Returns
+        ----------
+        store [dict]: key and crystal vector
+        """
+        store = {}
+        if os.path.exists(Vector_Store_Path):
+            shards = sorted([i for i in os.listdir(Vector_Store_Path) if i.startswith(f'{trunk_id}-')])
+            for shard in shards:
+                data = np.load(f'{Vector_Store_Path}/{shard}')
+                store.update(zip(data['keys'].tolist(), data['vecs']))
+        return store
+    
+    def add(self, keys, vecs):
+        """
+        add crystal vectors, they are written at next save
+        
+        Parameters
+        ----------
+        keys [str, 1d]: key of samples
+        vecs [float, 2d, np]: crystal vectors
+        """
+        for key, vec in zip(keys, vecs):
+            self.store[key] = vec
+            self.new[key] = vec
+    
+    def save(self):
+        """
+        write vectors added since last save as a new shard
+        shard appears at once, shards of other processes are kept
+        """
+        if len(self.new) == 0:
+            return
+        if not os.path.exists(Vector_Store_Path):
+            os.makedirs(Vector_Store_Path, exist_ok=True)
+        keys = np.array(list(self.new.keys()), dtype=str)
+        vecs = np.array(list(self.new.values()), dtype=np.float32)
+        name = f'{self.trunk_id}-{time.time_ns()}-{os.getpid()}'
+        tmp_file = f'{Vector_Store_Path}/tmp-{name}.npz'
+        np.savez(tmp_file, keys=keys, vecs=vecs)
+        os.replace(tmp_file, f'{Vector_Store_Path}/{name}.npz')
+        self.new = {}
+    
+    def get_keys(self, atom_pos, atom_type, grid_name, grid_ratio, space_group, angles, thicks):
+        """
+        key of samples
+        
+        Parameters
+        ----------
+        atom_pos [int, 2d]: position of atoms
+        atom_type [int, 2d]: type of atoms
+        grid_name [int, 1d]: name of grids
+        grid_ratio [float, 1d]: ratio of grids
+        space_group [int, 1d]: space group
+        angles [int, 2d]: cluster rotation angles
+        thicks [int, 2d]: atom displacement in z-direction
+        
+        Returns
+        ----------
+        keys [str, 1d]: sha1 digest of samples
+        """
+        keys = []
+        for i in range(len(atom_pos)):
+            sample = (int(grid_name[i]), int(space_group[i]), float(grid_ratio[i]), 
+                      [int(j) for j in atom_pos[i]], [int(j) for j in atom_type[i]],
+                      [int(j) for j in angles[i]], [int(j) for j in thicks[i]])
+            keys.append(hashlib.sha1(repr(sample).encode()).hexdigest())
+        return keys
+
+
 class GNNPredict(DeleteDuplicates):
     #get energy and crystal vector by gnn
     def __init__(self, batch_size=128, num_workers=0):
@@ -22,6 +397,106 @@ class GNNPredict(DeleteDuplicates):
         elif Job_Queue == 'GPU':
             self.device = torch.device('cuda')
         self.normalizer = Normalizer(torch.tensor([]))
+        self.session = None
+        self.vector_store = VectorStore()
+    
+    def load_session(self, model_name):
+        """
+        load inference session, models are shared until model changes
+
+        Parameters
+        ----------
+        model_name [str, 0d]: full name of model
+        """
+        if self.session is None or self.session.model_name != model_name:
+            self.session = InferenceSession(self.device)
+            self.session.load(model_name)
+        self.vec_model = self.session.vec_model
+        self.out_model = self.session.out_model
+        self.normalizer = self.session.normalizer
+    
+    def fit_ensemble(self, model_name, dataset):
+        """
+        fit readout heads on bootstrap samples of crystal vectors
+        heads are solved by ridge regression and saved in model
+        
+        Parameters
+        ----------
+        model_name [str, 0d]: full name of model
+        dataset [obj, 0d]: training set
+        """
+        if Ensemble_Heads == 0 or Job_Queue == 'GPU' or len(dataset) == 0:
+            return
+        loader = get_loader(dataset, self.batch_size, self.num_workers)
+        session = InferenceSession(self.device)
+        session.load(model_name)
+        session.set_precision('float32')
+        _, crys_vec = session.predict_loader(loader)
+        targets = session.normalizer.norm(dataset.targets).numpy().flatten()
+        x = np.concatenate((crys_vec, np.ones((len(crys_vec), 1))), axis=1)
+        weight, bias = [], []
+        for _ in range(Ensemble_Heads):
+            idx = np.random.randint(0, len(x), len(x))
+            x_boot, y_boot = x[idx], targets[idx]
+            w = np.linalg.solve(np.dot(x_boot.T, x_boot) + Ensemble_Ridge*np.eye(x.shape[1]), 
+                                np.dot(x_boot.T, y_boot))
+            weight.append(w[:-1])
+            bias.append(w[-1])
+        params = torch.load(model_name, map_location=self.device)
+        params['ensemble'] = {'fc_heads.weight': torch.tensor(np.array(weight), dtype=torch.float32),
+                              'fc_heads.bias': torch.tensor(np.array(bias), dtype=torch.float32)}
+        torch.save(params, model_name)
+        system_echo(f'Fit {Ensemble_Heads} readout heads on {len(x)} samples')
+    
+    def get_uncertainty(self, crys_vec):
+        """
+        get standard deviation of ensemble energys
+        
+        Parameters
+        ----------
+        crys_vec [float, 2d, np]: crystal vectors
+        
+        Returns
+        ----------
+        std [float, 1d, np]: standard deviation of energys
+        """
+        if Ensemble_Heads == 0:
+            return np.zeros(len(crys_vec))
+        model = self.get_gnn_model()
+        self.load_session(model)
+        _, var = self.session.readout_ensemble(crys_vec)
+        return np.sqrt(var)
+    
+    def check_precision(self, model_name, dataset):
+        """
+        compare reduced precision with float32 on training set
+        precision is saved in model if MAE degrades within threshold
+        
+        Parameters
+        ----------
+        model_name [str, 0d]: full name of model
+        dataset [obj, 0d]: training set
+        """
+        if GNN_Precision == 'float32' or Job_Queue == 'GPU' or len(dataset) == 0:
+            return
+        loader = get_loader(dataset, self.batch_size, self.num_workers)
+        targets = dataset.targets.numpy().flatten()
+        session = InferenceSession(self.device)
+        session.load(model_name)
+        session.set_precision('float32')
+        energys, _ = session.predict_loader(loader)
+        mae_float = np.mean(np.abs(energys - targets))
+        session.set_precision(GNN_Precision)
+        energys, _ = session.predict_loader(loader)
+        mae_low = np.mean(np.abs(energys - targets))
+        if mae_low - mae_float < Precision_MAE_Threshold:
+            precision = GNN_Precision
+        else:
+            precision = 'float32'
+        system_echo(f'MAE float32 {mae_float:.4f}, {GNN_Precision} {mae_low:.4f}, use {precision}')
+        params = torch.load(model_name, map_location=self.device)
+        params['precision'] = precision
+        torch.save(params, model_name)
     
     def get_gnn_model(self):
         """
@@ -185,7 +660,7 @@ class GNNPredict(DeleteDuplicates):
         ----------
         symm [int, 1d]: symmetry of atoms
         atom_fea [float, 2d]: atom feature 
-        nbr_fea [float, 3d]: bond feature
+        nbr_fea [float, 2d]: neighbor distance
         nbr_idx [int, 2d]: neighbor index
 
         Returns
@@ -193,22 +668,58 @@ class GNNPredict(DeleteDuplicates):
         energy [float, 0d]: prediction energy
         crys_vec_np [float, 1d, np]: crystal vector
         """
-        crystal_atom_idx = np.arange(len(atom_fea))
-        input_var = (torch.Tensor(atom_fea),
-                     torch.Tensor(symm),
-                     torch.Tensor(nbr_fea),
-                     torch.LongTensor(nbr_idx),
-                     [torch.LongTensor(crystal_atom_idx)])
-        #get crystal vector
-        self.vec_model.eval()
-        crys_vec = self.vec_model(*input_var)
-        #predict energy
-        self.out_model.eval()
-        pred = self.out_model(crys_vec)
-        energy = self.normalizer.denorm(pred.data).item()
-        crys_vec_np = crys_vec.cpu().detach().numpy().flatten()
-        return energy, crys_vec_np
-        
+        energys, crys_vec_np = self.session.predict(symm, atom_fea, nbr_fea, nbr_idx, np.zeros(len(atom_fea), dtype=int))
+        return float(energys[0]), crys_vec_np[0]
+
+    def predict_single_cache(self, symm, atom_fea, nbr_fea, nbr_idx, layer_fea=None, changed=None):
+        """
+        get crystal vector and energy for one structure with cached atom features
+        only atoms within receptive field of changed atoms are updated
+
+        Parameters
+        ----------
+        symm [int, 1d]: symmetry of atoms
+        atom_fea [float, 2d]: atom feature
+        nbr_fea [float, 2d]: neighbor distance
+        nbr_idx [int, 2d]: neighbor index
+        layer_fea [float, 3d, tensor]: cached atom features of each layer
+        changed [int, 1d]: atoms with changed type or neighbors
+
+        Returns
+        ----------
+        energy [float, 0d]: prediction energy
+        crys_vec_np [float, 1d, np]: crystal vector
+        layer_fea [float, 3d, tensor]: atom features of each layer
+        """
+        return self.session.predict_cache(symm, atom_fea, nbr_fea, nbr_idx, layer_fea, changed)
+
+    def predict_multiple(self, symm, atom_fea, nbr_fea, nbr_idx):
+        """
+        get crystal vectors and energys for multiple structures in one forward
+
+        Parameters
+        ----------
+        symm [int, 2d]: symmetry of atoms
+        atom_fea [float, 3d]: atom feature
+        nbr_fea [float, 3d]: neighbor distance
+        nbr_idx [int, 3d]: neighbor index
+
+        Returns
+        ----------
+        energys [float, 1d, np]: prediction energys
+        crys_vec_np [float, 2d, np]: crystal vectors
+        """
+        batch_symm, batch_nbr_idx, crystal_idx = [], [], []
+        base_idx = 0
+        for i in range(len(atom_fea)):
+            n_i = len(atom_fea[i])
+            batch_symm += list(symm[i])
+            batch_nbr_idx.append(np.array(nbr_idx[i]) + base_idx)
+            crystal_idx += [i for _ in range(n_i)]
+            base_idx += n_i
+        return self.session.predict(batch_symm, np.concatenate(atom_fea), np.concatenate(nbr_fea),
+                                    np.concatenate(batch_nbr_idx), crystal_idx)
+
     def predict_batch(self, loader):
         """
         predict energy in batch
@@ -228,12 +739,12 @@ class GNNPredict(DeleteDuplicates):
         energy = []
         with torch.no_grad():
             for input, _ in loader:
-                atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_atom_idx = input
+                atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_idx = input
                 pred = self.gnn_model(atom_fea=atom_fea, 
                                       atom_symm=atom_symm,
                                       nbr_fea=nbr_fea,
                                       nbr_idx=nbr_idx, 
-                                      crystal_atom_idx=crystal_atom_idx)
+                                      crystal_idx=crystal_idx)
                 energy.append(self.normalizer.denorm(pred))
         return torch.cat(energy)
     
@@ -277,12 +788,12 @@ class GNNPredict(DeleteDuplicates):
         crys_vec = []
         with torch.no_grad():
             for input, _ in loader:
-                atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_atom_idx = input
+                atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_idx = input
                 vecs = self.vec_model(atom_fea=atom_fea, 
                                       atom_symm=atom_symm,
                                       nbr_fea=nbr_fea,
                                       nbr_idx=nbr_idx, 
-                                      crystal_atom_idx=crystal_atom_idx)
+                                      crystal_idx=crystal_idx)
                 crys_vec.append(vecs)
         return crys_vec
     
@@ -742,7 +1253,41 @@ class GNNSlice(GNNPredict):
         energys [float, 1d]: energy of structures
         crys_vec [float, 2d]: crystal vectors
         """
-        #get data loader
+        #load GNN model
+        model = self.get_gnn_model()
+        self.load_session(model)
+        if Frozen_Trunk and Job_Queue == 'CPU':
+            return self.update_PES_by_store(atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks)
+        #predict energy and calculate crystal vector
+        loader = self.get_PES_loader(atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks)
+        if Job_Queue == 'CPU':
+            energys, crys_vec = self.session.predict_loader(loader)
+        elif Job_Queue == 'GPU':
+            crys_vec = self.get_crystal_vector_batch(loader)
+            energys = self.readout_crystal_vector_batch(crys_vec)
+            energys = energys.cpu().numpy().flatten()
+            crys_vec = torch.cat(crys_vec).cpu().numpy()
+        return energys, crys_vec
+    
+    def get_PES_loader(self, atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks):
+        """
+        get data loader of samples
+        
+        Parameters
+        ----------
+        atom_pos [int, 2d]: position of atoms
+        atom_type [int, 2d]: type of atoms
+        atom_symm [int, 2d]: symmetry of atoms
+        grid_name [int, 1d]: name of grids
+        grid_ratio [float, 1d]: ratio of grids
+        space_group [int, 1d]: space group
+        angles [int, 2d]: cluster rotation angles
+        thicks [int, 2d]: atom displacement in z-direction
+        
+        Returns
+        ----------
+        loader [obj, 0d]: dataloader
+        """
         if Cluster_Search or (Dimension == 2 and Thickness > 0):
             loader = self.dataloader_all_atoms(atom_pos, atom_type, grid_name, grid_ratio, space_group, angles, thicks)
         else:
@@ -750,16 +1295,42 @@ class GNNSlice(GNNPredict):
                 loader = self.dataloader_general(atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group)
             elif Template_Search:
                 loader = self.dataloader_template(atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group)
-        #load GNN model
-        model = self.get_gnn_model()
-        self.load_fea_model(model)
-        self.load_out_model(model)
-        self.load_normalizer(model)
-        #predict energy and calculate crystal vector
-        crys_vec = self.get_crystal_vector_batch(loader)
-        energys = self.readout_crystal_vector_batch(crys_vec)
-        energys = energys.cpu().numpy().flatten()
-        crys_vec = torch.cat(crys_vec).cpu().numpy()
+        return loader
+    
+    def update_PES_by_store(self, atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks):
+        """
+        update PES by cached crystal vectors of frozen trunk
+        only new samples go through the graph network
+        
+        Parameters
+        ----------
+        atom_pos [int, 2d]: position of atoms
+        atom_type [int, 2d]: type of atoms
+        atom_symm [int, 2d]: symmetry of atoms
+        grid_name [int, 1d]: name of grids
+        grid_ratio [float, 1d]: ratio of grids
+        space_group [int, 1d]: space group
+        angles [int, 2d]: cluster rotation angles
+        thicks [int, 2d]: atom displacement in z-direction
+        
+        Returns
+        ----------
+        energys [float, 1d]: energy of structures
+        crys_vec [float, 2d]: crystal vectors
+        """
+        self.vector_store.load(self.session.get_trunk_id())
+        keys = self.vector_store.get_keys(atom_pos, atom_type, grid_name, grid_ratio, space_group, angles, thicks)
+        idx = [i for i, key in enumerate(keys) if key not in self.vector_store.store]
+        if len(idx) > 0:
+            miss_pos, miss_type, miss_symm, miss_grid, miss_ratio, miss_sg, miss_angles, miss_thicks = \
+                self.filter_samples(idx, atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks)
+            loader = self.get_PES_loader(miss_pos, miss_type, miss_symm, miss_grid, miss_ratio, miss_sg, miss_angles, miss_thicks)
+            _, miss_vec = self.session.predict_loader(loader)
+            self.vector_store.add([keys[i] for i in idx], miss_vec)
+            self.vector_store.save()
+        crys_vec = np.array([self.vector_store.store[key] for key in keys])
+        energys = self.session.readout(crys_vec)
+        system_echo(f'Vector store: {len(keys)-len(idx)} cached, {len(idx)} new')
         return energys, crys_vec
     
     def candidate_select(self, atom_pos, atom_type, atom_symm, grid_name, grid_ratio,
@@ -376,6 +376,7 @@ class AssignPlan(GridGenerate):
         head = f'{Grid_Path}/{grid:03.0f}'
         frac_file = f'{head}_frac_coords_{sg}.bin'
         mapping_file = f'{head}_mapping_{sg}.bin'
+        orbit_file = f'{head}_orbit_{sg}.bin'
         atom_num = max_num_dict.values()
         #discrete space into grid
         if crys_system > 0:
@@ -390,6 +391,7 @@ class AssignPlan(GridGenerate):
         if len(all_grid) > 0:
             self.write_list2d(frac_file, all_grid, binary=True)
             self.write_list2d(mapping_file, mapping, binary=True)
+            self.write_list2d(orbit_file, self.get_orbit_table(mapping), binary=True)
         else:
             all_grid, mapping = [], []
         return all_grid, mapping
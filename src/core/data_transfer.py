@@ -1,9 +1,10 @@
 import os, sys
+import atexit
 import numpy as np
 import multiprocessing as pythonmp
+from multiprocessing import shared_memory
 
 from pymatgen.core.structure import Structure
-from pymatgen.symmetry.groups import SpaceGroup
 
 sys.path.append(f'{os.getcwd()}/src')
 from core.log_print import *
@@ -11,13 +12,90 @@ from core.neighbors import Neighbors
 from core.cluster import AtomManipulate
 
 
+def run_job(job):
+    """
+    run one job in worker pool
+    
+    Parameters
+    ----------
+    job [tuple, 1d]: function and its parameters
+    
+    Returns
+    ----------
+    result [obj, 0d]: result of function
+    """
+    func, args = job
+    return func(*args)
+
+
 class Transfer(Neighbors, AtomManipulate):
     #transfer data to structure object or input of GNN
+    #worker pool shared by all instances, created lazily and reused
+    worker_pool = None
+    worker_pid = None
+    worker_cores = 1
+    
     def __init__(self):
         Neighbors.__init__(self)
     
+    def get_worker_pool(self):
+        """
+        get long-lived worker pool, forked at first use
+        
+        Returns
+        ----------
+        pool [obj, 0d]: worker pool, None in daemonic workers
+        """
+        if Transfer.worker_pool is not None and Transfer.worker_pid == os.getpid():
+            return Transfer.worker_pool
+        #workers of other pools can not fork
+        if pythonmp.current_process().daemon:
+            return None
+        #use half of cores by default
+        if Transfer_Cores == 0:
+            cores = max(1, int(.5*pythonmp.cpu_count()))
+        else:
+            cores = min(Transfer_Cores, pythonmp.cpu_count())
+        Transfer.worker_pool = pythonmp.get_context('fork').Pool(processes=cores)
+        Transfer.worker_pid = os.getpid()
+        Transfer.worker_cores = cores
+        #workers are joined at exit if owner does not close pool
+        atexit.register(self.close_worker_pool)
+        return Transfer.worker_pool
+    
+    def close_worker_pool(self):
+        """
+        close worker pool
+        """
+        if Transfer.worker_pool is not None and Transfer.worker_pid == os.getpid():
+            Transfer.worker_pool.close()
+            Transfer.worker_pool.join()
+        Transfer.worker_pool = None
+        Transfer.worker_pid = None
+    
+    def map_jobs(self, func, args_list):
+        """
+        stream results of parallel jobs in order
+        
+        Parameters
+        ----------
+        func [obj, 0d]: function of jobs
+        args_list [list:tuple, 1d]: parameters of parallel jobs
+        
+        Returns
+        ----------
+        results [obj, 1d]: iterator of results
+        """
+        jobs = [(func, args) for args in args_list]
+        pool = self.get_worker_pool()
+        if pool is None:
+            return map(run_job, jobs)
+        #send several jobs at once to reduce pickling overhead
+        chunksize = max(1, len(jobs)//(4*Transfer.worker_cores))
+        return pool.imap(run_job, jobs, chunksize=chunksize)
+    
     def get_gnn_input_general(self, atom_pos, atom_type, elem_embed,
-                              ratio, sg, latt_vec, grid_coords):
+                              ratio, sg, latt_vec, grid_coords, orbit=None):
         """
         get input of GNN model
         
@@ -30,6 +108,7 @@ class Transfer(Neighbors, AtomManipulate):
         sg [int, 0d]: space group number
         latt_vec [float, 2d, np]: lattice vector
         grid_coords [float, 2d, np]: fraction coordinates of grid
+        orbit [int, 2d, np]: orbit table of grid
         
         Returns
         ----------
@@ -41,7 +120,7 @@ class Transfer(Neighbors, AtomManipulate):
         atom_fea = self.get_atom_fea(atom_type, elem_embed)
         #get bond features and neighbor index
         nbr_fea, nbr_idx = \
-            self.get_nbr_fea_general(atom_pos, ratio, sg, latt_vec, grid_coords)
+            self.get_nbr_fea_general(atom_pos, ratio, sg, latt_vec, grid_coords, orbit=orbit)
         return atom_fea, nbr_fea, nbr_idx
     
     def get_gnn_input_template(self, atom_pos, atom_type, elem_embed,
@@ -93,8 +172,8 @@ class Transfer(Neighbors, AtomManipulate):
             stru = Structure.from_file(stru)
         atom_type = np.array(stru.atomic_numbers)
         nbr_idx, nbr_dis = self.get_nbr_stru(stru)
-        #get atom and bond features
-        nbr_fea = self.expand(nbr_dis)
+        #get atom features, bond features are expanded inside GNN
+        nbr_fea = nbr_dis
         atom_fea = self.get_atom_fea(atom_type, elem_embed)
         return atom_fea, nbr_fea, nbr_idx
     
@@ -122,7 +201,7 @@ class Transfer(Neighbors, AtomManipulate):
             nbr_idx_bh.append(nbr_idx)
         return atom_fea_bh, nbr_fea_bh, nbr_idx_bh
     
-    def get_gnn_input_from_stru_batch_parallel(self, strus, type='structure', limit=0):
+    def get_gnn_input_from_stru_batch_parallel(self, strus, type='structure'):
         """
         get input of GNN in batch
         
@@ -130,7 +209,6 @@ class Transfer(Neighbors, AtomManipulate):
         ----------
         strus [obj, 1d]: structure object
         type [str, 0d]: type of structure
-        limit [int, 0d]: limit of core number
         
         Returns
         ----------
@@ -141,26 +219,11 @@ class Transfer(Neighbors, AtomManipulate):
         elem_embed = self.import_data('elem')
         atom_fea_bh, nbr_fea_bh, nbr_idx_bh = [], [], []
         #multi-cores
-        args_list = []
-        if limit == 0:
-            cores = pythonmp.cpu_count()
-        else:
-            cores = min(limit, pythonmp.cpu_count())
-        with pythonmp.get_context('fork').Pool(processes=cores) as pool:
-            for stru in strus:
-                args_list.append((stru, elem_embed, type))
-            #put atoms into grid with symmetry constrain
-            jobs = [pool.apply_async(self.get_gnn_input_from_stru, args) for args in args_list]
-            pool.close()
-            pool.join()
-            #get results
-            jobs_pool = [p.get() for p in jobs]
-            for atom_fea, nbr_fea, nbr_idx in jobs_pool:
-                atom_fea_bh.append(atom_fea)
-                nbr_fea_bh.append(nbr_fea)
-                nbr_idx_bh.append(nbr_idx)
-        pool.close()
-        del pool
+        args_list = [(stru, elem_embed, type) for stru in strus]
+        for atom_fea, nbr_fea, nbr_idx in self.map_jobs(self.get_gnn_input_from_stru, args_list):
+            atom_fea_bh.append(atom_fea)
+            nbr_fea_bh.append(nbr_fea)
+            nbr_idx_bh.append(nbr_idx)
         return atom_fea_bh, nbr_fea_bh, nbr_idx_bh
     
     def get_gnn_input_seq_general(self, atom_pos, atom_type, grid, grid_ratio, space_group,
@@ -188,17 +251,16 @@ class Transfer(Neighbors, AtomManipulate):
         atom_fea_seq, nbr_fea_seq, nbr_idx_seq = [], [], []
         #transform pos, type into input of gnn for different space groups
         grid_coords = self.import_data('frac', grid, last_sg)
-        atom_fea, nbr_fea, nbr_idx = \
-            self.get_gnn_input_general(atom_pos[0], atom_type[0], elem_embed,
-                                       grid_ratio[0], last_sg, latt_vec, grid_coords)
+        orbit = self.import_data('orbit', grid, last_sg)
         for i, sg in enumerate(space_group):
             #update fraction coordinates
             if sg != last_sg:
                 grid_coords = self.import_data('frac', grid, sg)
+                orbit = self.import_data('orbit', grid, sg)
                 last_sg = sg
             atom_fea, nbr_fea, nbr_idx = \
                 self.get_gnn_input_general(atom_pos[i], atom_type[i], elem_embed, 
-                                           grid_ratio[i], sg, latt_vec, grid_coords)
+                                           grid_ratio[i], sg, latt_vec, grid_coords, orbit=orbit)
             atom_fea_seq.append(atom_fea)
             nbr_fea_seq.append(nbr_fea)
             nbr_idx_seq.append(nbr_idx)
@@ -324,7 +386,9 @@ class Transfer(Neighbors, AtomManipulate):
             order = np.argsort(atom_type)
             atom_type = np.array(atom_type)[order]
             coords = np.array(coords)[order]
-            stru = Structure.from_spacegroup(sg, latt, atom_type, coords)
+            images, unique = self.get_orbit_batch(sg, coords)
+            all_types = np.repeat(atom_type, np.sum(unique, axis=1)).tolist()
+            stru = Structure(latt, all_types, images[unique])
         return stru
     
     def generate_stru_cluster(self, sg, latt, atom_type, coords, cluster_angles, property_dict, angle, thick):
@@ -348,9 +412,9 @@ class Transfer(Neighbors, AtomManipulate):
         """
         frac_thick = Thickness/Vacuum_Space
         all_coords, all_types = [], []
-        spg = SpaceGroup.from_int_number(sg)
+        images, unique = self.get_orbit_batch(sg, coords)
         for i, atom in enumerate(atom_type):
-            equal_coords = spg.get_orbit(coords[i])
+            equal_coords = images[i][unique[i]]
             carte_coords = np.dot(equal_coords, latt)
             equal_num = len(equal_coords)
             if atom > 0:
@@ -392,9 +456,9 @@ class Transfer(Neighbors, AtomManipulate):
         disturb = [[0, 0, .5+frac_thick*i/Z_Layers] for i in thick]
         #disturb atoms in z direction
         disturb_types, disturb_coords = [], []
-        spg = SpaceGroup.from_int_number(sg)
+        images, unique = self.get_orbit_batch(sg, coords)
         for i in range(atom_num):
-            equal_coords = spg.get_orbit(coords[i])
+            equal_coords = images[i][unique[i]]
             disturb_equal_coords = np.array(equal_coords) + disturb[i]
             disturb_coords += disturb_equal_coords.tolist()
             disturb_types += [atom_type[i] for _ in range(len(equal_coords))]
@@ -407,6 +471,80 @@ class MultiGridTransfer(Transfer):
     def __init__(self):
         Transfer.__init__(self)
     
+    def write_shared(self, func, args, specs, start):
+        """
+        run transfer job and write results into shared memory
+        
+        Parameters
+        ----------
+        func [obj, 0d]: function returns sequences of features
+        args [tuple, 1d]: parameters of function
+        specs [tuple, 2d]: name, shape and dtype of shared blocks
+        start [int, 0d]: start row of this job
+        
+        Returns
+        ----------
+        num [int, 0d]: number of written rows
+        """
+        results = func(*args)
+        for (name, shape, dtype), seq in zip(specs, results):
+            #forked workers share resource tracker, blocks are unlinked by parent
+            block = shared_memory.SharedMemory(name=name)
+            try:
+                rows = np.concatenate(seq)
+                array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+                array[start:start+len(rows)] = rows
+                num = len(rows)
+                del array
+            finally:
+                block.close()
+        return num
+    
+    def get_gnn_input_shared(self, func, args_list, atom_pos, fea_len):
+        """
+        collect input of GNN from workers by shared memory
+        
+        Parameters
+        ----------
+        func [obj, 0d]: function returns sequences of features
+        args_list [list:tuple, 1d]: parameters of parallel jobs
+        atom_pos [int, 2d]: position of atoms
+        fea_len [int, 0d]: length of atom feature
+        
+        Returns
+        ----------
+        atom_fea_bh [float, 3d]: batch atom feature
+        nbr_fea_bh [float, 3d]: batch neighbor distance
+        nbr_idx_bh [int, 3d]: batch near index
+        """
+        #atom offsets of samples and jobs
+        atom_num = [len(i) for i in atom_pos]
+        job_num = [sum([len(i) for i in args[0]]) for args in args_list]
+        job_start = np.concatenate(([0], np.cumsum(job_num)))
+        total = int(np.sum(atom_num))
+        shapes = [((total, fea_len), 'float32'), ((total, self.nbr), 'float32'), ((total, self.nbr), 'int64')]
+        #preallocate packed blocks, released before return
+        blocks, specs = [], []
+        try:
+            for shape, dtype in shapes:
+                size = max(1, int(np.prod(shape))*np.dtype(dtype).itemsize)
+                block = shared_memory.SharedMemory(create=True, size=size)
+                blocks.append(block)
+                specs.append((block.name, shape, dtype))
+            jobs = [(func, args, specs, job_start[i]) for i, args in enumerate(args_list)]
+            for _ in self.map_jobs(self.write_shared, jobs):
+                pass
+            #one copy of each packed array, no view of blocks is kept
+            arrays = [np.ndarray(shape, dtype=dtype, buffer=block.buf).copy()
+                      for block, (shape, dtype) in zip(blocks, shapes)]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+        split = np.cumsum(atom_num)[:-1]
+        atom_fea_bh, nbr_fea_bh, nbr_idx_bh = [np.split(array, split) for array in arrays]
+        return atom_fea_bh, nbr_fea_bh, nbr_idx_bh
+    
     def sort_by_grid_sg(self, grid, sg):
         """
         sort pos, type, symm in order of grid and space group
@@ -465,7 +603,7 @@ class MultiGridTransfer(Transfer):
         idx = np.array(order)[:, 0]
         return np.array(idx, dtype=int)
     
-    def get_gnn_input_batch_general(self, atom_pos, atom_type, grid_name, grid_ratio, space_group, limit=20):
+    def get_gnn_input_batch_general(self, atom_pos, atom_type, grid_name, grid_ratio, space_group, chunk_size=20):
         """
         get input of GNN in different grids in multi-cores
         
@@ -476,7 +614,7 @@ class MultiGridTransfer(Transfer):
         grid_name [int, 1d]: name of grids
         grid_ratio [float, 1d]: ratio of grids
         space_group [int, 1d]: space group number
-        limit [int, 0d]: limit of cores
+        chunk_size [int, 0d]: number of structures per job
         
         Returns
         ----------
@@ -486,38 +624,33 @@ class MultiGridTransfer(Transfer):
         """
         #multi-cores
         elem_embed = self.import_data('elem')
-        cores = max(1, min(limit, int(.5*pythonmp.cpu_count())))
-        with pythonmp.get_context('fork').Pool(processes=cores) as pool:
-            #initialize
-            last_grid = grid_name[0]
-            i, atom_fea_bh, nbr_fea_bh, nbr_idx_bh = 0, [], [], []
-            #get input of gnn under different grids
-            args_list = []
-            for j, grid in enumerate(grid_name):
-                if not grid == last_grid:
-                    #divide jobs
-                    latt_vec = self.import_data('latt', grid=last_grid)
-                    args_list = self.divide_jobs_gnn_general(args_list, i, j, atom_pos, atom_type,
-                                                             last_grid, grid_ratio, space_group, latt_vec, elem_embed)
-                    last_grid = grid
-                    i = j
-            #divide jobs
-            end = len(grid_name)
-            latt_vec = self.import_data('latt', grid=last_grid)
-            args_list = self.divide_jobs_gnn_general(args_list, i, end, atom_pos, atom_type,
-                                                     last_grid, grid_ratio, space_group, latt_vec, elem_embed)
-            #put atoms into grid with symmetry constrain
-            jobs = [pool.apply_async(self.get_gnn_input_seq_general, args) for args in args_list]
-            pool.close()
-            pool.join()
-            #get results
-            jobs_pool = [p.get() for p in jobs]
-            for atom_fea_seq, nbr_fea_seq, nbr_idx_seq in jobs_pool:
+        #initialize
+        last_grid = grid_name[0]
+        i, atom_fea_bh, nbr_fea_bh, nbr_idx_bh = 0, [], [], []
+        #get input of gnn under different grids
+        args_list = []
+        for j, grid in enumerate(grid_name):
+            if not grid == last_grid:
+                #divide jobs
+                latt_vec = self.import_data('latt', grid=last_grid)
+                args_list = self.divide_jobs_gnn_general(args_list, i, j, atom_pos, atom_type,
+                                                         last_grid, grid_ratio, space_group, latt_vec, elem_embed, chunk_size)
+                last_grid = grid
+                i = j
+        #divide jobs
+        end = len(grid_name)
+        latt_vec = self.import_data('latt', grid=last_grid)
+        args_list = self.divide_jobs_gnn_general(args_list, i, end, atom_pos, atom_type,
+                                                 last_grid, grid_ratio, space_group, latt_vec, elem_embed, chunk_size)
+        #put atoms into grid with symmetry constrain
+        if Transfer_Shared_Memory:
+            atom_fea_bh, nbr_fea_bh, nbr_idx_bh = \
+                self.get_gnn_input_shared(self.get_gnn_input_seq_general, args_list, atom_pos, elem_embed.shape[1])
+        else:
+            for atom_fea_seq, nbr_fea_seq, nbr_idx_seq in self.map_jobs(self.get_gnn_input_seq_general, args_list):
                 atom_fea_bh += atom_fea_seq
                 nbr_fea_bh += nbr_fea_seq
                 nbr_idx_bh += nbr_idx_seq
-        pool.close()
-        del pool
         return atom_fea_bh, nbr_fea_bh, nbr_idx_bh
     
     def divide_jobs_gnn_general(self, args_list, start, end,
@@ -557,7 +690,7 @@ class MultiGridTransfer(Transfer):
         args_list.append(args)
         return args_list
     
-    def get_gnn_input_batch_template(self, atom_pos, atom_type, grid_name, grid_ratio, space_group, limit=20):
+    def get_gnn_input_batch_template(self, atom_pos, atom_type, grid_name, grid_ratio, space_group, chunk_size=20):
         """
         get input of GNN in different grids in multi-cores
         
@@ -568,7 +701,7 @@ class MultiGridTransfer(Transfer):
         grid_name [int, 1d]: name of grids
         grid_ratio [float, 1d]: ratio of grids
         space_group [int, 1d]: space group number
-        limit [int, 0d]: limit of cores
+        chunk_size [int, 0d]: number of structures per job
         
         Returns
         ----------
@@ -576,37 +709,32 @@ class MultiGridTransfer(Transfer):
         nbr_fea_bh [float, 4d]: batch bond feature
         nbr_fea_idx_bh [int, 3d]: batch near index
         """
-        #multi-cores
-        cores = min(limit, pythonmp.cpu_count())
-        with pythonmp.get_context('fork').Pool(processes=cores) as pool:
-            #initialize
-            last_grid = grid_name[0]
-            i, atom_fea_bh, nbr_fea_bh, nbr_fea_idx_bh = 0, [], [], []
-            #get input of gnn under different grids
-            args_list = []
-            for j, grid in enumerate(grid_name):
-                if not grid == last_grid:
-                    #divide jobs
-                    args_list = self.divide_jobs_gnn_template(args_list, i, j, atom_pos, atom_type,
-                                                              last_grid, grid_ratio, space_group)
-                    last_grid = grid
-                    i = j
-            #divide jobs
-            end = len(grid_name)
-            args_list = self.divide_jobs_gnn_template(args_list, i, end, atom_pos, atom_type,
-                                                      last_grid, grid_ratio, space_group)
-            #put atoms into grid with symmetry constrain
-            jobs = [pool.apply_async(self.get_gnn_input_seq_template, args) for args in args_list]
-            pool.close()
-            pool.join()
-            #get results
-            jobs_pool = [p.get() for p in jobs]
-            for atom_fea_seq, nbr_fea_seq, nbr_fea_idx_seq in jobs_pool:
+        #initialize
+        last_grid = grid_name[0]
+        i, atom_fea_bh, nbr_fea_bh, nbr_fea_idx_bh = 0, [], [], []
+        #get input of gnn under different grids
+        args_list = []
+        for j, grid in enumerate(grid_name):
+            if not grid == last_grid:
+                #divide jobs
+                args_list = self.divide_jobs_gnn_template(args_list, i, j, atom_pos, atom_type,
+                                                          last_grid, grid_ratio, space_group, chunk_size)
+                last_grid = grid
+                i = j
+        #divide jobs
+        end = len(grid_name)
+        args_list = self.divide_jobs_gnn_template(args_list, i, end, atom_pos, atom_type,
+                                                  last_grid, grid_ratio, space_group, chunk_size)
+        #put atoms into grid with symmetry constrain
+        if Transfer_Shared_Memory:
+            elem_embed = self.import_data('elem')
+            atom_fea_bh, nbr_fea_bh, nbr_fea_idx_bh = \
+                self.get_gnn_input_shared(self.get_gnn_input_seq_template, args_list, atom_pos, elem_embed.shape[1])
+        else:
+            for atom_fea_seq, nbr_fea_seq, nbr_fea_idx_seq in self.map_jobs(self.get_gnn_input_seq_template, args_list):
                 atom_fea_bh += atom_fea_seq
                 nbr_fea_bh += nbr_fea_seq
                 nbr_fea_idx_bh += nbr_fea_idx_seq
-        pool.close()
-        del pool
         return atom_fea_bh, nbr_fea_bh, nbr_fea_idx_bh
     
     def divide_jobs_gnn_template(self, args_list, start, end,
@@ -678,7 +806,7 @@ class MultiGridTransfer(Transfer):
         stru_bh += stru_seq
         return stru_bh
     
-    def get_stru_batch_parallel(self, atom_pos, atom_type, grid_name, grid_ratio, space_group, angles, thicks, limit=0):
+    def get_stru_batch_parallel(self, atom_pos, atom_type, grid_name, grid_ratio, space_group, angles, thicks):
         """
         get strucutre object in different grids
         
@@ -691,45 +819,32 @@ class MultiGridTransfer(Transfer):
         space_group [int, 1d]: space group number
         angles [int, 2d]: cluster rotation angles
         thicks [int, 2d]: atom displacement in z-direction
-        limit [int, 0d]: limit of core number
         
         Returns
         ----------
         stru_bh [obj, 1d]: batch structure objects
         """
-        if limit == 0:
-            cores = pythonmp.cpu_count()
-        else:
-            cores = min(limit, pythonmp.cpu_count())
-        with pythonmp.get_context('fork').Pool(processes=cores) as pool:
-            #initialize
-            last_grid = grid_name[0]
-            i, stru_bh = 0, []
-            #get input of gnn under different grids
-            args_list = []
-            for j, grid in enumerate(grid_name):
-                if not grid == last_grid:
-                    #divide jobs
-                    latt_vec = self.import_data('latt', grid=last_grid)
-                    args_list = self.divide_jobs_stru_general(args_list, i, j, atom_pos, atom_type,
-                                                              last_grid, grid_ratio, space_group, angles, thicks, latt_vec)
-                    last_grid = grid
-                    i = j
-            #divide jobs
-            end = len(grid_name)
-            latt_vec = self.import_data('latt', grid=last_grid)
-            args_list = self.divide_jobs_stru_general(args_list, i, end, atom_pos, atom_type,
-                                                      last_grid, grid_ratio, space_group, angles, thicks, latt_vec)
-            #put atoms into grid with symmetry constrain
-            jobs = [pool.apply_async(self.get_stru_seq, args) for args in args_list]
-            pool.close()
-            pool.join()
-            #get results
-            jobs_pool = [p.get() for p in jobs]
-            for stru_seq in jobs_pool:
-                stru_bh += stru_seq
-        pool.close()
-        del pool
+        #initialize
+        last_grid = grid_name[0]
+        i, stru_bh = 0, []
+        #get input of gnn under different grids
+        args_list = []
+        for j, grid in enumerate(grid_name):
+            if not grid == last_grid:
+                #divide jobs
+                latt_vec = self.import_data('latt', grid=last_grid)
+                args_list = self.divide_jobs_stru_general(args_list, i, j, atom_pos, atom_type,
+                                                          last_grid, grid_ratio, space_group, angles, thicks, latt_vec)
+                last_grid = grid
+                i = j
+        #divide jobs
+        end = len(grid_name)
+        latt_vec = self.import_data('latt', grid=last_grid)
+        args_list = self.divide_jobs_stru_general(args_list, i, end, atom_pos, atom_type,
+                                                  last_grid, grid_ratio, space_group, angles, thicks, latt_vec)
+        #put atoms into grid with symmetry constrain
+        for stru_seq in self.map_jobs(self.get_stru_seq, args_list):
+            stru_bh += stru_seq
         return stru_bh
     
     def divide_jobs_stru_general(self, args_list, start, end,
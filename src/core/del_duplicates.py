@@ -1,6 +1,5 @@
 import os, sys
 import numpy as np
-import multiprocessing as pythonmp
 
 from sklearn.decomposition import KernelPCA
 from sklearn.cluster import KMeans
@@ -381,37 +380,29 @@ class DeleteDuplicates(MultiGridTransfer, SampleClustering):
         last_sg = space_group[0]
         base, base_store = 0, []
         counter = 0
-        cores = pythonmp.cpu_count()
-        with pythonmp.get_context('fork').Pool(processes=cores) as pool:
-            args_list = []
-            for i, sg in enumerate(space_group):
-                counter += 1
-                if sg != last_sg:
+        args_list = []
+        for i, sg in enumerate(space_group):
+            counter += 1
+            if sg != last_sg:
+                args_list.append((crys_vec[base:i], energys[base:i]))
+                base_store.append(base)
+                base = i
+                last_sg = sg
+                counter = 0
+            else:
+                if np.mod(counter, limit) == 0:
                     args_list.append((crys_vec[base:i], energys[base:i]))
                     base_store.append(base)
                     base = i
-                    last_sg = sg
                     counter = 0
-                else:
-                    if np.mod(counter, limit) == 0:
-                        args_list.append((crys_vec[base:i], energys[base:i]))
-                        base_store.append(base)
-                        base = i
-                        counter = 0
-            if counter > 0:
-                args_list.append((crys_vec[base:], energys[base:]))
-                base_store.append(base)
-            #start parallel jobs
-            jobs = [pool.apply_async(self.delete_duplicates_crys_vec, args) for args in args_list]
-            pool.close()
-            pool.join()
-            #get results
-            jobs_pool = [p.get() for p in jobs]
-            idx = []
-            for base, uniq_idx in zip(base_store, jobs_pool):
-                idx += np.add(base, uniq_idx).tolist()
-        pool.close()
-        del pool
+        if counter > 0:
+            args_list.append((crys_vec[base:], energys[base:]))
+            base_store.append(base)
+        #start parallel jobs
+        jobs_pool = self.map_jobs(self.delete_duplicates_crys_vec, args_list)
+        idx = []
+        for base, uniq_idx in zip(base_store, jobs_pool):
+            idx += np.add(base, uniq_idx).tolist()
         idx = np.unique(idx)
         return idx
     
@@ -433,30 +424,22 @@ class DeleteDuplicates(MultiGridTransfer, SampleClustering):
         num = len(energys)
         base, base_store = 0, []
         counter = 0
-        cores = pythonmp.cpu_count()
-        with pythonmp.get_context('fork').Pool(processes=cores) as pool:
-            args_list = []
-            for i in range(num):
-                counter += 1
-                if np.mod(counter, limit) == 0:
-                    args_list.append((crys_vec[base:i], energys[base:i]))
-                    base_store.append(base)
-                    base = i
-                    counter = 0
-            if counter > 0:
-                args_list.append((crys_vec[base:], energys[base:]))
+        args_list = []
+        for i in range(num):
+            counter += 1
+            if np.mod(counter, limit) == 0:
+                args_list.append((crys_vec[base:i], energys[base:i]))
                 base_store.append(base)
-            #start parallel jobs
-            jobs = [pool.apply_async(self.delete_duplicates_crys_vec, args) for args in args_list]
-            pool.close()
-            pool.join()
-            #get results
-            jobs_pool = [p.get() for p in jobs]
-            idx = []
-            for base, uniq_idx in zip(base_store, jobs_pool):
-                idx += np.add(base, uniq_idx).tolist()
-        pool.close()
-        del pool
+                base = i
+                counter = 0
+        if counter > 0:
+            args_list.append((crys_vec[base:], energys[base:]))
+            base_store.append(base)
+        #start parallel jobs
+        jobs_pool = self.map_jobs(self.delete_duplicates_crys_vec, args_list)
+        idx = []
+        for base, uniq_idx in zip(base_store, jobs_pool):
+            idx += np.add(base, uniq_idx).tolist()
         idx = np.unique(idx)
         return idx
     
@@ -526,19 +509,11 @@ class DeleteDuplicates(MultiGridTransfer, SampleClustering):
         strus_num = len(strus)
         args_list = self.divide_duplicates_jobs(args_list, 0, strus_num, strus, energys)
         #delete duplicates in parallel
-        cores = pythonmp.cpu_count()
-        with pythonmp.get_context('fork').Pool(processes=cores) as pool:
-            #start parallel jobs
-            jobs = [pool.apply_async(self.delete_duplicates_pymatgen, args) for args in args_list]
-            pool.close()
-            pool.join()
-            #get results
-            jobs_pool = [p.get() for p in jobs]
-            idx = []
-            for i in jobs_pool:
-                idx += i
-        pool.close()
-        del pool
+        #start parallel jobs
+        jobs_pool = self.map_jobs(self.delete_duplicates_pymatgen, args_list)
+        idx = []
+        for i in jobs_pool:
+            idx += i
         all_idx = np.arange(strus_num)
         idx = np.unique(idx)
         idx = np.setdiff1d(all_idx, idx)
@@ -575,19 +550,11 @@ class DeleteDuplicates(MultiGridTransfer, SampleClustering):
         end = len(space_group)
         args_list = self.divide_duplicates_jobs(args_list, i, end, strus, energys)
         #delete duplicates in parallel
-        cores = pythonmp.cpu_count()
-        with pythonmp.get_context('fork').Pool(processes=cores) as pool:
-            #start parallel jobs
-            jobs = [pool.apply_async(self.delete_duplicates_pymatgen, args) for args in args_list]
-            pool.close()
-            pool.join()
-            #get results
-            jobs_pool = [p.get() for p in jobs]
-            idx = []
-            for i in jobs_pool:
-                idx += i
-        pool.close()
-        del pool
+        #start parallel jobs
+        jobs_pool = self.map_jobs(self.delete_duplicates_pymatgen, args_list)
+        idx = []
+        for i in jobs_pool:
+            idx += i
         #unique idx
         all_idx = np.arange(len(grid_name))
         idx = np.unique(idx)
@@ -710,32 +677,24 @@ class DeleteDuplicates(MultiGridTransfer, SampleClustering):
         """
         #multi-cores
         base, counter = 0, 0
-        cores = pythonmp.cpu_count()
-        with pythonmp.get_context('fork').Pool(processes=cores) as pool:
-            args_list = []
-            for i, vec_1 in enumerate(vecs_1):
-                energy_1 = energys_1[i]
-                for j in range(len(vecs_2)):
-                    energy_2 = energys_2[j]
-                    if np.abs(energy_1-energy_2) < energy_tol:
-                        counter += 1
-                        if np.mod(counter, limit) == 0:
-                            args_list.append((i, vec_1, energy_1, vecs_2[base:j], energys_2[base:j]))
-                            base = j
-                            counter = 0
-                if counter > 0:
-                    args_list.append((i, vec_1, energy_1, vecs_2[base:], energys_2[base:]))
-            #start parallel jobs
-            jobs = [pool.apply_async(self.delete_selected_crys_vec, args) for args in args_list]
-            pool.close()
-            pool.join()
-            #get results
-            jobs_pool = [p.get() for p in jobs]
-            idx = []
-            for del_idx in jobs_pool:
-                idx += del_idx
-        pool.close()
-        del pool
+        args_list = []
+        for i, vec_1 in enumerate(vecs_1):
+            energy_1 = energys_1[i]
+            for j in range(len(vecs_2)):
+                energy_2 = energys_2[j]
+                if np.abs(energy_1-energy_2) < energy_tol:
+                    counter += 1
+                    if np.mod(counter, limit) == 0:
+                        args_list.append((i, vec_1, energy_1, vecs_2[base:j], energys_2[base:j]))
+                        base = j
+                        counter = 0
+            if counter > 0:
+                args_list.append((i, vec_1, energy_1, vecs_2[base:], energys_2[base:]))
+        #start parallel jobs
+        jobs_pool = self.map_jobs(self.delete_selected_crys_vec, args_list)
+        idx = []
+        for del_idx in jobs_pool:
+            idx += del_idx
         all_idx = np.arange(len(vecs_1))
         idx = np.unique(idx)
         idx = np.setdiff1d(all_idx, idx)
@@ -793,22 +752,14 @@ class DeleteDuplicates(MultiGridTransfer, SampleClustering):
         """
         #multi-cores
         args_list = []
-        cores = pythonmp.cpu_count()
-        with pythonmp.get_context('fork').Pool(processes=cores) as pool:
-            for stru in strus_1:
-                args_list.append((stru, strus_2))
-            #put atoms into grid with symmetry constrain
-            jobs = [pool.apply_async(self.compare_pymatgen, args) for args in args_list]
-            pool.close()
-            pool.join()
-            #get results
-            jobs_pool = [p.get() for p in jobs]
-            idx = []
-            for i, flag in enumerate(jobs_pool):
-                if flag:
-                    idx.append(i)
-        pool.close()
-        del pool
+        for stru in strus_1:
+            args_list.append((stru, strus_2))
+        #put atoms into grid with symmetry constrain
+        jobs_pool = self.map_jobs(self.compare_pymatgen, args_list)
+        idx = []
+        for i, flag in enumerate(jobs_pool):
+            if flag:
+                idx.append(i)
         all_idx = np.arange(len(strus_1))
         idx = np.setdiff1d(all_idx, idx)
         return idx
@@ -7,7 +7,6 @@ from collections import Counter
 from pymatgen.core.periodic_table import Element
 from pymatgen.core.lattice import Lattice
 from pymatgen.core.structure import Structure
-from pymatgen.symmetry.groups import SpaceGroup
 
 sys.path.append(f'{os.getcwd()}/src')
 from core.log_print import *
@@ -687,14 +686,7 @@ class GridGenerate(Neighbors, LatticePrediction):
         mapping = []
         all_grid = dau_grid.copy()
         if len(dau_grid) > 0:
-            spg = SpaceGroup.from_int_number(sg)
-            for i, point in enumerate(dau_grid):
-                coords = spg.get_orbit(point)
-                equal_coords = self.get_equal_coords(point, coords)
-                start = len(all_grid)
-                end = start + len(equal_coords)
-                mapping.append([i] + [j for j in range(start, end)])
-                all_grid += equal_coords
+            all_grid, mapping = self.get_orbit_points(sg, dau_grid)
         return np.array(all_grid), mapping
     
     def get_grid_points_3d(self, sg, grain, latt, atom_num):
@@ -735,14 +727,7 @@ class GridGenerate(Neighbors, LatticePrediction):
         mapping = []
         all_grid = dau_grid.copy()
         if len(dau_grid) > 0:
-            spg = SpaceGroup.from_int_number(sg)
-            for i, point in enumerate(dau_grid):
-                coords = spg.get_orbit(point)
-                equal_coords = self.get_equal_coords(point, coords)
-                start = len(all_grid)
-                end = start + len(equal_coords)
-                mapping.append([i] + [j for j in range(start, end)])
-                all_grid += equal_coords
+            all_grid, mapping = self.get_orbit_points(sg, dau_grid)
         return np.array(all_grid), mapping
     
     def dau_grid_sampling_2d(self, atom_num, sg, grid):
@@ -760,8 +745,8 @@ class GridGenerate(Neighbors, LatticePrediction):
         sparse_grid [float, 2d]: coordinates of symmetry sites
         """
         #group by symmetry
-        spg = SpaceGroup.from_int_number(sg)
-        symm = [len(spg.get_orbit(i)) for i in grid]
+        _, unique = self.get_orbit_batch(sg, grid)
+        symm = np.sum(unique, axis=1).tolist()
         index = np.arange(0, len(grid))
         order = np.argsort(symm)
         symm = np.array(symm)[order]
@@ -799,9 +784,13 @@ class GridGenerate(Neighbors, LatticePrediction):
         ----------
         sparse_grid [float, 2d]: coordinates of symmetry sites
         """
+        #orbits of candidate sites are generated once
+        images, keep = self.get_equal_coords_batch(sg, grid)
+        image_num = np.sum(keep, axis=1).tolist()
+        orbit_offset = np.concatenate(([0], np.cumsum(image_num)))
+        grid_images = images[keep].reshape(-1, 3)
         #group by symmetry
-        spg = SpaceGroup.from_int_number(sg)
-        symm = [len(spg.get_orbit(i)) for i in grid]
+        symm = [i+1 for i in image_num]
         index = np.arange(0, len(grid))
         order = np.argsort(symm)
         symm = np.array(symm)[order]
@@ -822,7 +811,7 @@ class GridGenerate(Neighbors, LatticePrediction):
             #generate jobs
             args_list = []
             for _ in range(repeat):
-                args_list.append((sg, total_n, grid, latt_vec, symm_site, cutoff))
+                args_list.append((sg, total_n, grid, latt_vec, symm_site, cutoff, grid_images, orbit_offset))
             #multi-cores
             cores = limit
             with pythonmp.get_context('fork').Pool(processes=cores) as pool:
@@ -841,7 +830,7 @@ class GridGenerate(Neighbors, LatticePrediction):
             dau_grid = []
         return dau_grid
     
-    def discretize_space(self, sg, total_n, grid, latt_vec, symm_site, cutoff):
+    def discretize_space(self, sg, total_n, grid, latt_vec, symm_site, cutoff, grid_images=None, orbit_offset=None):
         """
         discretize space into grid
         
@@ -853,19 +842,27 @@ class GridGenerate(Neighbors, LatticePrediction):
         latt_vec [float, 2d, np]: lattice vector
         symm_site [dict, int]: index of symmetry sites
         cutoff [float, 0d]: cutoff distance 
+        grid_images [float, 2d, np]: images of grid points
+        orbit_offset [int, 1d, np]: offset of images for each grid point
 
         Returns
         ----------
         un [float, 0d]: uniformity of grid points 
         """
         #sampling on different symmetry
-        sample_coords = []
+        sample_coords, sample_images = [], []
         sampling_num = self.get_symm_sampling_num(total_n, symm_site)
         for mul, idx in symm_site.items():
             sample_idx = self.sample_uniform_index(idx, sampling_num[mul], grid, latt_vec)
             sample_coords += grid[sample_idx].tolist()
+            if grid_images is not None:
+                for i in sample_idx:
+                    sample_images += grid_images[orbit_offset[i]:orbit_offset[i+1]].tolist()
         #calculate uniformity
-        un = self.calculate_uniformity(sg, latt_vec, sample_coords, cutoff)
+        if grid_images is None:
+            un = self.calculate_uniformity(sg, latt_vec, sample_coords, cutoff)
+        else:
+            un = self.calculate_uniformity(sg, latt_vec, sample_coords, cutoff, image_coords=sample_images)
         return un, sample_coords
         
     def sample_uniform_index(self, idx, num, grid, latt_vec):
@@ -984,7 +981,7 @@ class GridGenerate(Neighbors, LatticePrediction):
                     sampling_num[mul] = 1
         return sampling_num
     
-    def calculate_uniformity(self, sg, latt_vec, dau_coords, cutoff=1):
+    def calculate_uniformity(self, sg, latt_vec, dau_coords, cutoff=1, image_coords=None):
         """
         get uniformity of DAU grid
         
@@ -994,6 +991,7 @@ class GridGenerate(Neighbors, LatticePrediction):
         latt_vec [float, 2d, np]: lattice vector
         dau_coords [float, 2d]: coordinates in DAU 
         cutoff [float, 0d]: cutoff distance
+        image_coords [float, 2d]: precomputed images of DAU coordinates
         
         Returns
         ----------
@@ -1002,16 +1000,13 @@ class GridGenerate(Neighbors, LatticePrediction):
         #get all grid points in unit cell
         dau_atom_num = len(dau_coords)
         all_grid = dau_coords.copy()
-        if len(dau_coords) > 0:
-            spg = SpaceGroup.from_int_number(sg)
-            for point in dau_coords:
-                coords = spg.get_orbit(point)
-                equal_coords = self.get_equal_coords(point, coords)
-                all_grid += equal_coords
+        if image_coords is not None:
+            all_grid += image_coords
+        elif len(dau_coords) > 0:
+            images, keep = self.get_equal_coords_batch(sg, dau_coords)
+            all_grid += images[keep].tolist()
         #neighbor index and distance of DAU
-        atoms = [1 for _ in range(len(all_grid))]
-        stru = Structure(latt_vec, atoms, all_grid)
-        distances = stru.get_neighbor_list(cutoff, sites=stru.sites[:dau_atom_num])[-1]
+        distances = self.get_neighbor_list(latt_vec, all_grid, cutoff, center_num=dau_atom_num)[-1]
         #calculate uniformity
         near_num = len(distances)
         if near_num > 0:
@@ -1259,14 +1254,18 @@ class GridGenerate(Neighbors, LatticePrediction):
         cutoff [float, 0d]: neighbor cutoff distance
         mapping [int, 2d]: DAU mapping relationship 
         """
-        atoms = [1 for _ in range(len(coords))]
-        stru = Structure(latt_vec, atoms, coords)
         #export neighbor index and distance in DAU
-        nbr_idx, nbr_dis = self.get_neighbors_DAU(stru, cutoff, mapping)
+        nbr_idx, nbr_dis = self.get_neighbors_DAU(latt_vec, coords, cutoff, mapping)
         self.write_list2d(f'{head}_nbr_idx_{sg}.bin', 
                         nbr_idx, binary=True)
         self.write_list2d(f'{head}_nbr_dis_{sg}.bin', 
                         nbr_dis, binary=True)
+        #export distance table of all images within dmax
+        image_idx, image_dis = self.get_neighbors_DAU(latt_vec, coords, self.dmax, mapping)
+        self.write_list2d(f'{head}_image_idx_{sg}.bin', 
+                        image_idx, binary=True)
+        self.write_list2d(f'{head}_image_dis_{sg}.bin', 
+                        image_dis, binary=True)
     
     def get_grid_sg(self, grid):
         """
@@ -15,6 +15,25 @@ Pressure = 0
 #Model
 Use_Pretrain_Model = [True if 'NOPRE' == 'PRE' else False][0]
 Update_ML_Model = True
+GNN_JIT_Inference = False
+GNN_Precision = 'float32'
+Precision_MAE_Threshold = 0.01
+Batch_Atom_Budget = 0
+Batch_Bucket_Size = 50
+Warm_Start_Training = False
+Warm_Start_Epochs = 60
+Early_Stop_Patience = 10
+Replay_Ratio = 2
+Frozen_Trunk = False
+Ensemble_Heads = 0
+Ensemble_Ridge = 1e-3
+Distributed_Training = False
+Dist_Procs_per_Node = 4
+Dist_Nodes = []
+Dist_Port = 29500
+Dist_Seed = 0
+Checkpoint_Interval = 0
+Checkpoint_Background = False
 
 #Recycling
 Num_Recycle = 1
@@ -52,10 +71,29 @@ Exploitation_Num = 10
 SA_Steps = 75
 SA_Decay = .97
 SA_Path_Ratio = 0.2
+SA_Batch_Chains = False
+SA_Incremental_GNN = False
+SA_Worker_Daemon = False
+SA_Cache_Size = 20000
+#Adaptive annealing
+Adaptive_SA = False
+SA_Target_Accept = 0.4
+SA_Adapt_Window = 5
+SA_Adapt_Gain = 2
+SA_Patience = 20
+#Parallel tempering
+Parallel_Tempering = False
+PT_Replicas = 8
+PT_Swap_Interval = 5
+
+#Transfer
+Transfer_Cores = 0
+Transfer_Shared_Memory = False
 
 #Sample select
 Num_Clusters_per_Node = 20
 SA_Energy_Ratio = 0.5
+Uncertainty_Weight = 0
 
 #Energy calculate
 Energy_Method = 'VASP'
@@ -2,6 +2,10 @@ import os, sys, time
 import argparse
 import itertools
 import torch
+import queue
+import traceback
+import multiprocessing as pythonmp
+from collections import OrderedDict
 import numpy as np
 
 sys.path.append(f'{os.getcwd()}/src')
@@ -209,6 +213,25 @@ class ParallelWorkers(SSHTools, DeleteDuplicates):
                         mv tmp_record.dat {job_file}
                         rm tmp_finish.dat
                         '''
+        daemon_script = f'''
+                         #!/bin/bash --login
+                         {SCCOP_Env}
+                         
+                         cd {SCCOP_Path}/
+                         {update_script}
+                         python src/core/multi_SA.py --flag 2 --iteration {iteration[0]} --node {node} --jobs {job_file} --limit {job_limit} --wait {wait_time} >> log
+                         rm log {job_file}
+                         
+                         python src/core/multi_SA.py --flag 1 --iteration {iteration[0]}
+                         
+                         cd {self.sh_save_path}
+                         rm RUNNING_*
+                         touch FINISH-{node}
+                         scp search-{node}.tar.gz FINISH-{node} {Host_Node}:{local_sh_save_path}
+                         '''
+        if SA_Worker_Daemon:
+            self.ssh_node(daemon_script, node)
+            return
         shell_script = f'''
                         #!/bin/bash --login
                         {SCCOP_Env}
@@ -660,6 +683,7 @@ class ActionSpace(ListRWTools):
         self.max_bond = bond_dict['max_bond']
         self.ele_types = bond_dict['ele_types']
         self.bond_list = bond_dict['bond_list']
+        self.bond_matrix = np.array(self.bond_list)
         
     def action_filter(self, idx, pos, type, symm, symm_site,
                       ratio, grid_idx, grid_dis, move=True, limit=10):
@@ -683,113 +707,59 @@ class ActionSpace(ListRWTools):
         ----------
         allow [int, 1d]: allowable actions
         """
-        if move:
-            obstacle = np.delete(pos, idx, axis=0).tolist()
-        else:
-            obstacle = pos
-        #get forbidden sites
-        equal_symm = np.abs(symm).tolist()
-        symm_slt = equal_symm[idx]
-        sites = symm_site[symm_slt]
-        if len(obstacle) > 0:
-            forbid = self.get_forbid(obstacle, type, ratio, grid_idx, grid_dis)
-            occupy = self.get_occupy(symm_slt, pos, equal_symm)
-        else:
-            forbid, occupy = [], []
-        #get available sites
-        forbid = np.intersect1d(sites, forbid)
-        vacancy = np.setdiff1d(sites, occupy)
-        available = np.setdiff1d(vacancy, forbid)
-        #check distance of self-symmetry sites
+        allow = self.legal_sites(idx, pos, type, symm, symm_site,
+                                 ratio, grid_idx, grid_dis, move=move)
         np.random.seed()
-        np.random.shuffle(available)
-        available = available[:limit]
-        center_idx = self.ele_types.index(type[idx])
-        nbr_cutoff = self.bond_list[center_idx][center_idx]
-        allow = self.check_self_symm_site(available, ratio, grid_idx, grid_dis, nbr_cutoff)
+        np.random.shuffle(allow)
+        allow = allow[:limit].tolist()
         return allow
     
-    def get_forbid(self, points, type, ratio, grid_idx, grid_dis):
-        """
-        get position of forbidden area
-        
-        Parameters
-        ----------
-        points [int, 1d]: occupied points
-        type [int, 1d]: type of target atoms
-        ratio [float, 0d]: grid ratio
-        grid_idx [int, 2d, np]: neighbor index of grid
-        grid_dis [float, 2d, np]: neighbor distance of grid
-
-        Returns
-        ----------
-        forbid [int, 1d, np]: forbidden area
-        """
-        nbr_idx = grid_idx[points]
-        nbr_dis = grid_dis[points]*ratio
-        actions = []
-        for i, item in enumerate(nbr_dis):
-            #get distance cutoff
-            center_idx = self.ele_types.index(type[i])
-            nbr_cutoff = np.min(self.bond_list[center_idx])
-            #get forbidden area
-            for j, dis in enumerate(item):
-                if nbr_cutoff < dis:
-                    break
-            point_nbr_idx = nbr_idx[i]
-            actions.append(point_nbr_idx[:j])
-        forbid = np.unique(np.concatenate(actions))
-        return forbid
-    
-    def get_occupy(self, symm_slt, atom_pos, atom_symm):
-        """
-        get occupied position by symmetry
-        
-        Parameters
-        ----------
-        symm_slt [int, 0d]: select symmetry
-        atom_pos [int, 1d]: position of atoms
-        atom_symm [int, 1d]: symmetry of atoms
-
-        Returns
-        ----------
-        occupy [int, 1d]: position of occupied sites
-        """
-        occupy = []
-        for i, pos in enumerate(atom_pos):
-            if symm_slt == atom_symm[i]:
-                occupy.append(pos)
-        return occupy
-    
-    def check_self_symm_site(self, points, ratio, grid_idx, grid_dis, nbr_cutoff):
+    def legal_sites(self, idx, pos, type, symm, symm_site,
+                    ratio, grid_idx, grid_dis, move=True):
         """
-        get allowable sites by checking self-symmetry sites
+        get all legal sites of select atom by masks over grid points
         
         Parameters
         ----------
-        points [int, 1d]: potential allowable sites
+        idx [int, 0d]: index of select atom
+        pos [int, 1d]: position of atoms
+        type [int, 1d]: type of atoms
+        symm [int, 1d]: symmetry of atoms
+        symm_site [dict, int:list]: site position grouped by symmetry
         ratio [float, 0d]: grid ratio
         grid_idx [int, 2d, np]: neighbor index of grid
         grid_dis [float, 2d, np]: neighbor distance of grid
-        nbr_cutoff [float, 0d]: cutoff distance of neighbors
+        move [bool, 0d]: move atom or add atom
         
         Returns
         ----------
-        allow [int, 1d]: allowable sites
+        allow [int, 1d, np]: legal sites
         """
-        allow = []
-        for point in points:
-            nbr_idx = grid_idx[point]
-            nbr_dis = grid_dis[point]*ratio
-            #get forbidden sites
-            tmp_idx = []
-            for i, dis in enumerate(nbr_dis):
-                if dis < nbr_cutoff:
-                    tmp_idx.append(nbr_idx[i])
-            #check neighbor sites
-            atom_idx = np.where(np.array(tmp_idx)==point)[-1]
-            if len(atom_idx) == 0:
-                allow.append(point)
+        grid_num = len(grid_idx)
+        sites = np.array(symm_site[abs(symm[idx])], dtype=int)
+        center_idx = self.ele_types.index(type[idx])
+        if move:
+            obstacle_idx = [i for i in range(len(pos)) if i != idx]
+        else:
+            obstacle_idx = [i for i in range(len(pos))]
+        #occupancy mask
+        occupy = np.zeros(grid_num, dtype=bool)
+        occupy[np.array(pos, dtype=int)] = True
+        #forbidden mask by bond length of element pairs
+        forbid = np.zeros(grid_num, dtype=bool)
+        if len(obstacle_idx) > 0:
+            obstacle = np.array(pos, dtype=int)[obstacle_idx]
+            obstacle_ele = [self.ele_types.index(type[i]) for i in obstacle_idx]
+            radius = self.bond_matrix[center_idx, obstacle_ele]
+            nbr_idx = grid_idx[obstacle]
+            nbr_dis = grid_dis[obstacle]*ratio
+            forbid[nbr_idx[nbr_dis < radius[:, None]]] = True
+        #self-symmetry sites too close to their images
+        nbr_idx = grid_idx[sites]
+        nbr_dis = grid_dis[sites]*ratio
+        self_radius = self.bond_matrix[center_idx, center_idx]
+        self_forbid = np.any((nbr_idx == sites[:, None]) & (nbr_dis < self_radius), axis=1)
+        allow = sites[~occupy[sites] & ~forbid[sites] & ~self_forbid]
         return allow
     
     def exchange_action(self, idx, type, symm):
@@ -919,6 +889,11 @@ class Search(ActionSpace, GridGenerate, GNNPredict):
         self.iteration = f'{iteration:02.0f}'
         self.sh_save_path = f'{Search_Path}/ml_{self.iteration}'
         self.model_save_path = f'{Model_Path}/{self.iteration}'
+        self.model_loaded = False
+        self.grid_buffer = {}
+        self.state_cache = OrderedDict()
+        self.cache_hit, self.cache_miss = 0, 0
+        self.sa_record = []
     
     def gnn_SA_general(self, pos, type, symm, grid, ratio, sg, angle, thick, path, node, nbr_num=30, sample_limit=100):
         """
@@ -940,34 +915,38 @@ class Search(ActionSpace, GridGenerate, GNNPredict):
         sample_limit [int, 0d]: limit of SA samples
         """
         np.random.seed()
-        #load GNN model
-        self.load_vec_out_model()
-        #import embeddings and lattice vectors
-        self.elem_embed = self.import_data('elem')
-        self.latt_vec = self.import_data('latt', grid)
-        self.grid_coords = self.import_data('frac', grid, sg)
-        self.grid_idx, self.grid_dis = self.import_data('grid', grid, sg)
-        #import cluster and angles
-        self.cluster_angles, self.property_dict = [], []
-        if Cluster_Search:
-            self.cluster_angles = self.import_data('angles')
-            self.property_dict = self.import_data('property')
-        self.angles_num = len(self.cluster_angles)
-        #group sites by symmetry
-        mapping = self.import_data('mapping', grid, sg)
-        self.symm_site = self.group_symm_sites(mapping)
+        #load GNN model and grid data
+        self.load_search_data(grid, sg)
         #initialize buffer
         atom_fea_gnn = self.get_atom_fea(type, self.elem_embed)
-        self.nbr_idx, self.nbr_dis = self.get_nbr_general(pos, ratio, sg, self.latt_vec, self.grid_coords, nbr_num=nbr_num)
+        if self.image_idx is None:
+            self.nbr_idx, self.nbr_dis = self.get_nbr_general(pos, ratio, sg, self.latt_vec, self.grid_coords, nbr_num=nbr_num, orbit=self.orbit)
+        else:
+            self.nbr_idx, self.nbr_dis = self.get_nbr_by_table(pos, ratio, self.image_idx, self.image_dis, nbr_num=nbr_num)
         nbr_idx_gnn, nbr_dis_gnn = self.cut_pad_neighbors(self.nbr_idx, self.nbr_dis, self.nbr)
-        nbr_fea_gnn = self.expand(nbr_dis_gnn)
+        nbr_fea_gnn = nbr_dis_gnn
         energy, vec = self.predict_single(symm, atom_fea_gnn, nbr_fea_gnn, nbr_idx_gnn)
+        self.cache_hit, self.cache_miss = 0, 0
+        self.sa_record = []
+        self.cache_update(grid, sg, ratio, pos, type, energy, vec)
         atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group = [pos], [type], [symm], [grid], [ratio], [sg]
         angles, thicks, energys, crys_vec = [angle], [thick], [energy], [vec]
         #optimize position
-        for _ in range(Restart_Times):
-            tmp_pos, tmp_type, tmp_symm, tmp_grid, tmp_ratio, tmp_sg, tmp_angle, tmp_thick, tmp_energy, tmp_vec = \
-                self.explore_pos_general(pos, type, symm, grid, ratio, sg, angle, thick, energy, vec)
+        if Parallel_Tempering or (SA_Batch_Chains and not SA_Incremental_GNN):
+            restart_times = 1
+        else:
+            restart_times = Restart_Times
+        for _ in range(restart_times):
+            if Parallel_Tempering:
+                steps = max(1, Restart_Times*SA_Steps//PT_Replicas)
+                tmp_pos, tmp_type, tmp_symm, tmp_grid, tmp_ratio, tmp_sg, tmp_angle, tmp_thick, tmp_energy, tmp_vec = \
+                    self.explore_pos_general_pt(pos, type, symm, grid, ratio, sg, angle, thick, energy, vec, PT_Replicas, steps)
+            elif SA_Batch_Chains and not SA_Incremental_GNN:
+                tmp_pos, tmp_type, tmp_symm, tmp_grid, tmp_ratio, tmp_sg, tmp_angle, tmp_thick, tmp_energy, tmp_vec = \
+                    self.explore_pos_general_batch(pos, type, symm, grid, ratio, sg, angle, thick, energy, vec, Restart_Times)
+            else:
+                tmp_pos, tmp_type, tmp_symm, tmp_grid, tmp_ratio, tmp_sg, tmp_angle, tmp_thick, tmp_energy, tmp_vec = \
+                    self.explore_pos_general(pos, type, symm, grid, ratio, sg, angle, thick, energy, vec)
             atom_pos += tmp_pos
             atom_type += tmp_type
             atom_symm += tmp_symm
@@ -1062,6 +1041,11 @@ class Search(ActionSpace, GridGenerate, GNNPredict):
                                     grid_name, grid_ratio, space_group, angles, thicks)
             energys = energys[idx]
             crys_vec = crys_vec[idx]
+        system_echo(f'SA path {path} on {node}: cache hit {self.cache_hit}, miss {self.cache_miss}')
+        if len(self.sa_record) > 0:
+            steps = ' '.join([f'{i}' for i, _ in self.sa_record])
+            reasons = ', '.join([f'{j}' for _, j in self.sa_record])
+            system_echo(f'SA path {path} on {node}: steps {steps}, stop {reasons}')
         self.save(atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks, energys, crys_vec, path, node)
     
     def explore_pos_general(self, pos, type, symm, grid, ratio, sg, angle, thick, energy, vec, T=1):
@@ -1101,34 +1085,83 @@ class Search(ActionSpace, GridGenerate, GNNPredict):
         nbr_idx_2, nbr_dis_2 = nbr_idx_1, nbr_dis_1
         energy_2, vec_2 = energy_1, vec_1
         nbr_idx_gnn, nbr_dis_gnn = self.cut_pad_neighbors(self.nbr_idx, self.nbr_dis, self.nbr)
-        nbr_fea_gnn = self.expand(nbr_dis_gnn)
+        nbr_fea_gnn = nbr_dis_gnn
+        #cache atom features of each layer
+        if SA_Incremental_GNN:
+            atom_fea_gnn = self.get_atom_fea(type_1, self.elem_embed)
+            _, _, layer_fea_1 = self.predict_single_cache(symm, atom_fea_gnn, nbr_fea_gnn, nbr_idx_gnn)
+            layer_fea_2 = layer_fea_1
+            nbr_idx_gnn_1, nbr_dis_gnn_1 = nbr_idx_gnn, nbr_dis_gnn
         #optimize order of atoms
         atom_pos, atom_type, energys, crys_vec = [pos], [type], [energy], [vec]
-        for _ in range(SA_Steps):
+        accept_num, last_accept, best_energy, best_step = 0, 0, energy_1, 0
+        steps, reason = SA_Steps, 'max steps'
+        for step in range(SA_Steps):
             pos_2, type_2, point = self.atom_step_general(pos_1, type_1, symm, self.symm_site, ratio, self.grid_idx, self.grid_dis)
             #move atom
             if point >= 0:
                 atom_fea_gnn = self.get_atom_fea(type_2, self.elem_embed)
-                nbr_idx_2, nbr_dis_2 = self.update_neighbors(pos_1, pos_2, nbr_idx_1, nbr_dis_1, ratio, sg, self.latt_vec, self.grid_coords)
+                nbr_idx_2, nbr_dis_2 = self.update_neighbors_SA(pos_1, pos_2, nbr_idx_1, nbr_dis_1, ratio, sg)
                 nbr_idx_gnn, nbr_dis_gnn = self.cut_pad_neighbors(nbr_idx_2, nbr_dis_2, self.nbr)
-                nbr_fea_gnn = self.expand(nbr_dis_gnn)
-                energy_2, vec_2 = self.predict_single(symm, atom_fea_gnn, nbr_fea_gnn, nbr_idx_gnn)
+                nbr_fea_gnn = nbr_dis_gnn
+                cache = self.cache_lookup(grid, sg, ratio, pos_2, type_2)
+                if cache is not None:
+                    energy_2, vec_2 = cache
+                    layer_fea_2 = None
+                elif SA_Incremental_GNN:
+                    changed = self.get_changed_atoms(type_1, type_2, nbr_idx_gnn_1, nbr_dis_gnn_1, nbr_idx_gnn, nbr_dis_gnn)
+                    energy_2, vec_2, layer_fea_2 = self.predict_single_cache(symm, atom_fea_gnn, nbr_fea_gnn, nbr_idx_gnn, layer_fea_1, changed)
+                else:
+                    energy_2, vec_2 = self.predict_single(symm, atom_fea_gnn, nbr_fea_gnn, nbr_idx_gnn)
+                self.cache_update(grid, sg, ratio, pos_2, type_2, energy_2, vec_2)
             #exchange atoms
             elif point == -1:
                 atom_fea_gnn = self.get_atom_fea(type_2, self.elem_embed)
-                energy_2, vec_2 = self.predict_single(symm, atom_fea_gnn, nbr_fea_gnn, nbr_idx_gnn)
+                cache = self.cache_lookup(grid, sg, ratio, pos_2, type_2)
+                nbr_idx_2, nbr_dis_2 = nbr_idx_1, nbr_dis_1
+                if SA_Incremental_GNN:
+                    nbr_idx_gnn, nbr_dis_gnn = nbr_idx_gnn_1, nbr_dis_gnn_1
+                else:
+                    nbr_idx_gnn, nbr_dis_gnn = self.cut_pad_neighbors(nbr_idx_1, nbr_dis_1, self.nbr)
+                nbr_fea_gnn = nbr_dis_gnn
+                if cache is not None:
+                    energy_2, vec_2 = cache
+                    layer_fea_2 = None
+                elif SA_Incremental_GNN:
+                    changed = self.get_changed_atoms(type_1, type_2, nbr_idx_gnn_1, nbr_dis_gnn_1, nbr_idx_gnn, nbr_dis_gnn)
+                    energy_2, vec_2, layer_fea_2 = self.predict_single_cache(symm, atom_fea_gnn, nbr_fea_gnn, nbr_idx_gnn, layer_fea_1, changed)
+                else:
+                    energy_2, vec_2 = self.predict_single(symm, atom_fea_gnn, nbr_fea_gnn, nbr_idx_gnn)
+                self.cache_update(grid, sg, ratio, pos_2, type_2, energy_2, vec_2)
             #keep atoms
             elif point == -2:
                 pass
-            #metropolis criterion
-            if self.metropolis(energy_1, energy_2, sa_T):
+            #metropolis criterion, no proposal when atoms are kept
+            if point != -2 and self.metropolis(energy_1, energy_2, sa_T):
                 pos_1, type_1, energy_1, vec_1 = pos_2, type_2, energy_2, vec_2
                 nbr_idx_1, nbr_dis_1 = nbr_idx_2, nbr_dis_2
+                if SA_Incremental_GNN:
+                    layer_fea_1 = layer_fea_2
+                    nbr_idx_gnn_1, nbr_dis_gnn_1 = nbr_idx_gnn, nbr_dis_gnn
                 atom_pos.append(pos_1)
                 atom_type.append(type_1)
                 energys.append(energy_1)
                 crys_vec.append(vec_1)
-            sa_T *= SA_Decay
+                accept_num += 1
+                last_accept = step
+                if energy_1 < best_energy:
+                    best_energy, best_step = energy_1, step
+            #adaptive schedule and early stop
+            if Adaptive_SA:
+                sa_T, accept_num = self.adapt_temperature(step, sa_T, accept_num)
+                reason = self.check_early_stop(step, last_accept, best_step)
+                if reason is not None:
+                    steps = step + 1
+                    break
+                reason = 'max steps'
+            else:
+                sa_T *= SA_Decay
+        self.sa_record.append((steps, reason))
         #get search results
         num = len(atom_pos)
         atom_symm = [symm for _ in range(num)] 
@@ -1146,6 +1179,429 @@ class Search(ActionSpace, GridGenerate, GNNPredict):
         energys = np.array(energys)[idx].tolist()
         crys_vec = np.array(crys_vec)[idx].tolist()
         return atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks, energys, crys_vec
+
+    def adapt_temperature(self, step, T, accept_num, steps=None, chains=1):
+        """
+        tune temperature toward target acceptance rate in each window
+        target rate decreases linearly to zero during annealing
+        
+        Parameters
+        ----------
+        step [int, 0d]: current step
+        T [float, 0d]: annealing temperature, or ladder of replicas
+        accept_num [int, 0d]: accepted moves in current window
+        steps [int, 0d]: number of steps, SA_Steps if None
+        chains [int, 0d]: number of chains sharing accepted moves
+        
+        Returns
+        ----------
+        T [float, 0d]: tuned temperature
+        accept_num [int, 0d]: accepted moves after tuning
+        """
+        if steps is None:
+            steps = SA_Steps
+        if np.mod(step+1, SA_Adapt_Window) == 0:
+            rate = accept_num/(SA_Adapt_Window*chains)
+            target = SA_Target_Accept*(1-(step+1)/steps)
+            T *= np.exp(SA_Adapt_Gain*(target-rate))
+            accept_num = 0
+        return T, accept_num
+    
+    def check_early_stop(self, step, last_accept, best_step):
+        """
+        stop chain without accepted move or energy improvement
+        
+        Parameters
+        ----------
+        step [int, 0d]: current step
+        last_accept [int, 0d]: step of last accepted move
+        best_step [int, 0d]: step of last energy improvement
+        
+        Returns
+        ----------
+        reason [str, 0d]: stop reason, None if continue
+        """
+        reason = None
+        if step - last_accept >= SA_Patience:
+            reason = 'frozen'
+        elif step - best_step >= SA_Patience:
+            reason = 'no improvement'
+        return reason
+    
+    def cache_lookup(self, grid, sg, ratio, pos, type):
+        """
+        look up energy and crystal vector of visited state
+        
+        Parameters
+        ----------
+        grid [int, 0d]: grid name
+        sg [int, 0d]: space group number
+        ratio [float, 0d]: grid ratio
+        pos [int, 1d]: position of atoms
+        type [int, 1d]: type of atoms
+        
+        Returns
+        ----------
+        cache [tuple]: energy and crystal vector, None if missed
+        """
+        key = (grid, sg, ratio, tuple(pos), tuple(type))
+        cache = self.state_cache.get(key)
+        if cache is None:
+            self.cache_miss += 1
+        else:
+            self.cache_hit += 1
+            self.state_cache.move_to_end(key)
+        return cache
+    
+    def cache_update(self, grid, sg, ratio, pos, type, energy, vec):
+        """
+        store energy and crystal vector, drop least recently used state
+        
+        Parameters
+        ----------
+        grid [int, 0d]: grid name
+        sg [int, 0d]: space group number
+        ratio [float, 0d]: grid ratio
+        pos [int, 1d]: position of atoms
+        type [int, 1d]: type of atoms
+        energy [float, 0d]: prediction energy
+        vec [float, 1d, np]: crystal vector
+        """
+        key = (grid, sg, ratio, tuple(pos), tuple(type))
+        self.state_cache[key] = (energy, vec)
+        self.state_cache.move_to_end(key)
+        if len(self.state_cache) > SA_Cache_Size:
+            self.state_cache.popitem(last=False)
+    
+    def update_neighbors_SA(self, pos_1, pos_2, nbr_idx_1, nbr_dis_1, ratio, sg, nbr_num=30):
+        """
+        update neighbors by distance table of grid if exists
+        
+        Parameters
+        ----------
+        pos_1 [int, 1d]: old atom position
+        pos_2 [int, 1d]: new atom position 
+        nbr_idx_1 [int, 2d]: index of neighbors
+        nbr_dis_1 [float, 2d]: distance of neighbors
+        ratio [float, 0d]: grid ratio
+        sg [int, 0d]: space group number
+        nbr_num [int, 0d]: number of neighbors
+        
+        Returns
+        ----------
+        nbr_idx_2 [int, 2d]: updated neighbor index
+        nbr_dis_2 [float, 2d]: updated neighbor distance
+        """
+        if self.image_idx is None:
+            nbr_idx_2, nbr_dis_2 = self.update_neighbors(pos_1, pos_2, nbr_idx_1, nbr_dis_1, ratio, sg, 
+                                                         self.latt_vec, self.grid_coords, orbit=self.orbit)
+        else:
+            nbr_idx_2, nbr_dis_2 = self.update_neighbors_by_table(pos_1, pos_2, nbr_idx_1, nbr_dis_1, ratio, 
+                                                                  self.image_idx, self.image_dis, nbr_num=nbr_num)
+        return nbr_idx_2, nbr_dis_2
+    
+    def get_changed_atoms(self, type_1, type_2, nbr_idx_1, nbr_dis_1, nbr_idx_2, nbr_dis_2):
+        """
+        get atoms whose type or neighbors are changed by one action
+        
+        Parameters
+        ----------
+        type_1 [int, 1d]: type of atoms before action
+        type_2 [int, 1d]: type of atoms after action
+        nbr_idx_1 [int, 2d, np]: neighbor index before action
+        nbr_dis_1 [float, 2d, np]: neighbor distance before action
+        nbr_idx_2 [int, 2d, np]: neighbor index after action
+        nbr_dis_2 [float, 2d, np]: neighbor distance after action
+        
+        Returns
+        ----------
+        changed [int, 1d, np]: index of changed atoms
+        """
+        type_diff = np.array(type_1) != np.array(type_2)
+        idx_diff = np.any(nbr_idx_1 != nbr_idx_2, axis=1)
+        dis_diff = np.any(nbr_dis_1 != nbr_dis_2, axis=1)
+        changed = np.where(type_diff | idx_diff | dis_diff)[0]
+        return changed
+    
+    def explore_pos_general_batch(self, pos, type, symm, grid, ratio, sg, angle, thick, energy, vec, chains, T=1):
+        """
+        simulated annealing for general search with chains advanced in lockstep
+
+        Parameters
+        ----------
+        pos [int, 1d]: position of atoms
+        type [int, 1d]: type of atoms
+        symm [int, 1d]: symmetry of atoms
+        grid [int, 0d]: grid name
+        ratio [float, 0d]: grid ratio
+        sg [int, 0d]: space group number
+        angle [int, 1d]: cluster angles
+        thick [int, 1d]: displacement in z-direction
+        energy [float, 0d]: prediction energy
+        vec [float, 1d, np]: crystal vector
+        chains [int, 0d]: number of SA chains
+        T [float, 0d]: initial SA temperature
+
+        Returns
+        ----------
+        atom_pos [int, 2d]: position of atoms
+        atom_type [int, 2d]: type of atoms
+        atom_symm [int, 2d]: symmetry of atoms
+        grid_name [int, 1d]: grid name
+        grid_ratio [float, 1d]: ratio of grids
+        space_group [int, 1d]: space group number
+        angles [int, 2d]: cluster rotation angles
+        thicks [int, 2d]: atom displacement in z-direction
+        energys [float, 1d]: prediction energys
+        crys_vec [float, 2d]: crystal vectors
+        """
+        sa_T = T
+        #state of each chain
+        pos_1, type_1 = [pos for _ in range(chains)], [type for _ in range(chains)]
+        energy_1, vec_1 = [energy for _ in range(chains)], [vec for _ in range(chains)]
+        nbr_idx_1, nbr_dis_1 = [self.nbr_idx for _ in range(chains)], [self.nbr_dis for _ in range(chains)]
+        #optimize order of atoms
+        atom_pos, atom_type, energys, crys_vec = [pos], [type], [energy], [vec]
+        sa_T = [sa_T for _ in range(chains)]
+        accept_num, last_accept = [0 for _ in range(chains)], [0 for _ in range(chains)]
+        best_energy, best_step = energy_1.copy(), [0 for _ in range(chains)]
+        steps, reason = [SA_Steps for _ in range(chains)], ['max steps' for _ in range(chains)]
+        active = [i for i in range(chains)]
+        for step in range(SA_Steps):
+            pos_2, type_2, energy_2, vec_2, nbr_idx_2, nbr_dis_2, proposed = \
+                self.propose_chains(pos_1, type_1, energy_1, vec_1, nbr_idx_1, nbr_dis_1, symm, grid, ratio, sg, active)
+            #metropolis criterion, no proposal when atoms are kept
+            for i in active:
+                if proposed[i] and self.metropolis(energy_1[i], energy_2[i], sa_T[i]):
+                    pos_1[i], type_1[i], energy_1[i], vec_1[i] = pos_2[i], type_2[i], energy_2[i], vec_2[i]
+                    nbr_idx_1[i], nbr_dis_1[i] = nbr_idx_2[i], nbr_dis_2[i]
+                    atom_pos.append(pos_1[i])
+                    atom_type.append(type_1[i])
+                    energys.append(energy_1[i])
+                    crys_vec.append(vec_1[i])
+                    accept_num[i] += 1
+                    last_accept[i] = step
+                    if energy_1[i] < best_energy[i]:
+                        best_energy[i], best_step[i] = energy_1[i], step
+            #adaptive schedule and early stop of each chain
+            if Adaptive_SA:
+                for i in active.copy():
+                    sa_T[i], accept_num[i] = self.adapt_temperature(step, sa_T[i], accept_num[i])
+                    stop = self.check_early_stop(step, last_accept[i], best_step[i])
+                    if stop is not None:
+                        steps[i], reason[i] = step + 1, stop
+                        active.remove(i)
+                if len(active) == 0:
+                    break
+            else:
+                sa_T = [i*SA_Decay for i in sa_T]
+        self.sa_record += [(i, j) for i, j in zip(steps, reason)]
+        #get search results
+        num = len(atom_pos)
+        atom_symm = [symm for _ in range(num)]
+        grid_name = [grid for _ in range(num)]
+        grid_ratio = [ratio for _ in range(num)]
+        space_group = [sg for _ in range(num)]
+        angles = [angle for _ in range(num)]
+        thicks = [thick for _ in range(num)]
+        #delete same structures
+        idx = self.delete_duplicates(atom_pos, atom_type, atom_symm,
+                                     grid_name, grid_ratio, space_group, angles, thicks)
+        atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks = \
+            self.filter_samples(idx, atom_pos, atom_type, atom_symm,
+                                grid_name, grid_ratio, space_group, angles, thicks)
+        energys = np.array(energys)[idx].tolist()
+        crys_vec = np.array(crys_vec)[idx].tolist()
+        return atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks, energys, crys_vec
+
+    def explore_pos_general_pt(self, pos, type, symm, grid, ratio, sg, angle, thick, energy, vec, replicas, steps, T=1):
+        """
+        parallel tempering for general search, replicas on a temperature ladder
+        swap states periodically and are scored in one forward
+        
+        Parameters
+        ----------
+        pos [int, 1d]: position of atoms
+        type [int, 1d]: type of atoms
+        symm [int, 1d]: symmetry of atoms
+        grid [int, 0d]: grid name
+        ratio [float, 0d]: grid ratio
+        sg [int, 0d]: space group number
+        angle [int, 1d]: cluster angles
+        thick [int, 1d]: displacement in z-direction
+        energy [float, 0d]: prediction energy
+        vec [float, 1d, np]: crystal vector
+        replicas [int, 0d]: number of replicas
+        steps [int, 0d]: number of steps
+        T [float, 0d]: highest temperature
+        
+        Returns
+        ----------
+        atom_pos [int, 2d]: position of atoms
+        atom_type [int, 2d]: type of atoms
+        atom_symm [int, 2d]: symmetry of atoms
+        grid_name [int, 1d]: grid name
+        grid_ratio [float, 1d]: ratio of grids
+        space_group [int, 1d]: space group number
+        angles [int, 2d]: cluster rotation angles
+        thicks [int, 2d]: atom displacement in z-direction
+        energys [float, 1d]: prediction energys
+        crys_vec [float, 2d]: crystal vectors
+        """
+        #geometric temperature ladder between initial and final SA temperature
+        T_min = T*SA_Decay**SA_Steps
+        ladder = T*(T_min/T)**(np.arange(replicas)/max(1, replicas-1))
+        #state of each replica
+        pos_1, type_1 = [pos for _ in range(replicas)], [type for _ in range(replicas)]
+        energy_1, vec_1 = [energy for _ in range(replicas)], [vec for _ in range(replicas)]
+        nbr_idx_1, nbr_dis_1 = [self.nbr_idx for _ in range(replicas)], [self.nbr_dis for _ in range(replicas)]
+        #optimize order of atoms
+        atom_pos, atom_type, energys, crys_vec = [pos], [type], [energy], [vec]
+        accept_num, last_accept, best_energy, best_step = 0, 0, energy, 0
+        stop_step, reason = steps, 'max steps'
+        for step in range(steps):
+            pos_2, type_2, energy_2, vec_2, nbr_idx_2, nbr_dis_2, proposed = \
+                self.propose_chains(pos_1, type_1, energy_1, vec_1, nbr_idx_1, nbr_dis_1, symm, grid, ratio, sg)
+            #metropolis criterion at temperature of each replica
+            for i in range(replicas):
+                if proposed[i] and self.metropolis(energy_1[i], energy_2[i], ladder[i]):
+                    pos_1[i], type_1[i], energy_1[i], vec_1[i] = pos_2[i], type_2[i], energy_2[i], vec_2[i]
+                    nbr_idx_1[i], nbr_dis_1[i] = nbr_idx_2[i], nbr_dis_2[i]
+                    atom_pos.append(pos_1[i])
+                    atom_type.append(type_1[i])
+                    energys.append(energy_1[i])
+                    crys_vec.append(vec_1[i])
+                    accept_num += 1
+                    last_accept = step
+                    if energy_1[i] < best_energy:
+                        best_energy, best_step = energy_1[i], step
+            #swap states of neighboring temperatures
+            if np.mod(step+1, PT_Swap_Interval) == 0:
+                pos_1, type_1, energy_1, vec_1, nbr_idx_1, nbr_dis_1 = \
+                    self.swap_replicas(step, ladder, pos_1, type_1, energy_1, vec_1, nbr_idx_1, nbr_dis_1)
+            #scale whole ladder by acceptance of all replicas and stop together
+            if Adaptive_SA:
+                ladder, accept_num = self.adapt_temperature(step, ladder, accept_num, steps, replicas)
+                stop = self.check_early_stop(step, last_accept, best_step)
+                if stop is not None:
+                    stop_step, reason = step + 1, stop
+                    break
+        self.sa_record.append((stop_step, reason))
+        #get search results
+        num = len(atom_pos)
+        atom_symm = [symm for _ in range(num)]
+        grid_name = [grid for _ in range(num)]
+        grid_ratio = [ratio for _ in range(num)]
+        space_group = [sg for _ in range(num)]
+        angles = [angle for _ in range(num)]
+        thicks = [thick for _ in range(num)]
+        #delete same structures
+        idx = self.delete_duplicates(atom_pos, atom_type, atom_symm,
+                                     grid_name, grid_ratio, space_group, angles, thicks)
+        atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks = \
+            self.filter_samples(idx, atom_pos, atom_type, atom_symm,
+                                grid_name, grid_ratio, space_group, angles, thicks)
+        energys = np.array(energys)[idx].tolist()
+        crys_vec = np.array(crys_vec)[idx].tolist()
+        return atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks, energys, crys_vec
+    
+    def swap_replicas(self, step, ladder, pos_1, type_1, energy_1, vec_1, nbr_idx_1, nbr_dis_1):
+        """
+        swap states of neighboring temperatures, even and odd pairs alternate
+        
+        Parameters
+        ----------
+        step [int, 0d]: current step
+        ladder [float, 1d, np]: temperature of each replica
+        pos_1 [int, 2d]: position of atoms in each replica
+        type_1 [int, 2d]: type of atoms in each replica
+        energy_1 [float, 1d]: energy of each replica
+        vec_1 [float, 2d]: crystal vector of each replica
+        nbr_idx_1 [int, 3d]: neighbor index of each replica
+        nbr_dis_1 [float, 3d]: neighbor distance of each replica
+        
+        Returns
+        ----------
+        pos_1 [int, 2d]: swapped position of atoms
+        type_1 [int, 2d]: swapped type of atoms
+        energy_1 [float, 1d]: swapped energys
+        vec_1 [float, 2d]: swapped crystal vectors
+        nbr_idx_1 [int, 3d]: swapped neighbor index
+        nbr_dis_1 [float, 3d]: swapped neighbor distance
+        """
+        start = np.mod((step+1)//PT_Swap_Interval, 2)
+        for i in range(start, len(ladder)-1, 2):
+            j = i + 1
+            delta = (1/ladder[i] - 1/ladder[j])*(energy_1[i] - energy_1[j])
+            if np.exp(min(0, delta)) > np.random.rand():
+                pos_1[i], pos_1[j] = pos_1[j], pos_1[i]
+                type_1[i], type_1[j] = type_1[j], type_1[i]
+                energy_1[i], energy_1[j] = energy_1[j], energy_1[i]
+                vec_1[i], vec_1[j] = vec_1[j], vec_1[i]
+                nbr_idx_1[i], nbr_idx_1[j] = nbr_idx_1[j], nbr_idx_1[i]
+                nbr_dis_1[i], nbr_dis_1[j] = nbr_dis_1[j], nbr_dis_1[i]
+        return pos_1, type_1, energy_1, vec_1, nbr_idx_1, nbr_dis_1
+    
+    def propose_chains(self, pos_1, type_1, energy_1, vec_1, nbr_idx_1, nbr_dis_1, symm, grid, ratio, sg, active=None):
+        """
+        propose one action for each chain and score all proposals in one forward
+        
+        Parameters
+        ----------
+        pos_1 [int, 2d]: position of atoms in each chain
+        type_1 [int, 2d]: type of atoms in each chain
+        energy_1 [float, 1d]: energy of each chain
+        vec_1 [float, 2d]: crystal vector of each chain
+        nbr_idx_1 [int, 3d]: neighbor index of each chain
+        nbr_dis_1 [float, 3d]: neighbor distance of each chain
+        symm [int, 1d]: symmetry of atoms
+        grid [int, 0d]: grid name
+        ratio [float, 0d]: grid ratio
+        sg [int, 0d]: space group number
+        active [int, 1d]: index of chains to propose, all chains if None
+        
+        Returns
+        ----------
+        pos_2 [int, 2d]: proposed position of atoms
+        type_2 [int, 2d]: proposed type of atoms
+        energy_2 [float, 1d]: proposed energys
+        vec_2 [float, 2d]: proposed crystal vectors
+        nbr_idx_2 [int, 3d]: proposed neighbor index
+        nbr_dis_2 [float, 3d]: proposed neighbor distance
+        proposed [bool, 1d]: whether chain proposed an action
+        """
+        if active is None:
+            active = [i for i in range(len(pos_1))]
+        pos_2, type_2, energy_2, vec_2 = pos_1.copy(), type_1.copy(), energy_1.copy(), vec_1.copy()
+        nbr_idx_2, nbr_dis_2 = nbr_idx_1.copy(), nbr_dis_1.copy()
+        proposed = [False for _ in pos_1]
+        score_idx, atom_fea_batch, nbr_fea_batch, nbr_idx_batch = [], [], [], []
+        for i in active:
+            pos_2[i], type_2[i], point = self.atom_step_general(pos_1[i], type_1[i], symm, self.symm_site, ratio, self.grid_idx, self.grid_dis)
+            #keep atoms
+            if point == -2:
+                continue
+            proposed[i] = True
+            #move atom
+            if point >= 0:
+                nbr_idx_2[i], nbr_dis_2[i] = self.update_neighbors_SA(pos_1[i], pos_2[i], nbr_idx_1[i], nbr_dis_1[i], ratio, sg)
+            cache = self.cache_lookup(grid, sg, ratio, pos_2[i], type_2[i])
+            if cache is not None:
+                energy_2[i], vec_2[i] = cache
+                continue
+            nbr_idx_gnn, nbr_dis_gnn = self.cut_pad_neighbors(nbr_idx_2[i], nbr_dis_2[i], self.nbr)
+            score_idx.append(i)
+            atom_fea_batch.append(self.get_atom_fea(type_2[i], self.elem_embed))
+            nbr_fea_batch.append(nbr_dis_gnn)
+            nbr_idx_batch.append(nbr_idx_gnn)
+        #score all proposals in one forward
+        if len(score_idx) > 0:
+            symm_batch = [symm for _ in score_idx]
+            tmp_energy, tmp_vec = self.predict_multiple(symm_batch, atom_fea_batch, nbr_fea_batch, nbr_idx_batch)
+            for j, i in enumerate(score_idx):
+                energy_2[i], vec_2[i] = tmp_energy[j], tmp_vec[j]
+                self.cache_update(grid, sg, ratio, pos_2[i], type_2[i], energy_2[i], vec_2[i])
+        return pos_2, type_2, energy_2, vec_2, nbr_idx_2, nbr_dis_2, proposed
     
     def explore_thick_general(self, pos, type, symm, grid, ratio, sg, angle, thick, T=1):
         """
@@ -1317,14 +1773,8 @@ class Search(ActionSpace, GridGenerate, GNNPredict):
         node [int, 0d]: node number
         """
         np.random.seed()
-        #load GNN model
-        self.load_vec_out_model()
-        #import embeddings and lattice vectors
-        self.elem_embed = self.import_data('elem')
-        self.grid_idx, self.grid_dis = self.import_data('grid', grid, sg)
-        #group sites by symmetry
-        mapping = self.import_data('mapping', grid, sg)
-        self.symm_site = self.group_symm_sites(mapping)
+        #load GNN model and grid data
+        self.load_search_data(grid, sg)
         #initialize buffer
         energy, vec = self.gnn_template(pos, type, symm, ratio, self.grid_idx, self.grid_dis)
         atom_pos, energys, crys_vec = [pos], [energy], [vec]
@@ -1623,17 +2073,48 @@ class Search(ActionSpace, GridGenerate, GNNPredict):
         else:
             return False
     
+    def load_search_data(self, grid, sg):
+        """
+        load GNN model and grid data once, grids are buffered by (grid, sg)
+        
+        Parameters
+        ----------
+        grid [int, 0d]: grid name
+        sg [int, 0d]: space group number
+        """
+        if not self.model_loaded:
+            self.load_vec_out_model()
+            #import embeddings
+            self.elem_embed = self.import_data('elem')
+            #import cluster and angles
+            self.cluster_angles, self.property_dict = [], []
+            if Cluster_Search:
+                self.cluster_angles = self.import_data('angles')
+                self.property_dict = self.import_data('property')
+            self.angles_num = len(self.cluster_angles)
+            self.model_loaded = True
+        key = (grid, sg)
+        if key not in self.grid_buffer:
+            #import lattice vectors and grid
+            latt_vec = self.import_data('latt', grid)
+            grid_coords = self.import_data('frac', grid, sg)
+            grid_idx, grid_dis = self.import_data('grid', grid, sg)
+            #group sites by symmetry
+            mapping = self.import_data('mapping', grid, sg)
+            symm_site = self.group_symm_sites(mapping)
+            #orbit table of grid
+            orbit = self.import_data('orbit', grid, sg)
+            #distance table of full-cell images
+            image_idx, image_dis = self.import_data('image', grid, sg)
+            self.grid_buffer[key] = (latt_vec, grid_coords, grid_idx, grid_dis, symm_site, orbit, image_idx, image_dis)
+        self.latt_vec, self.grid_coords, self.grid_idx, self.grid_dis, self.symm_site, self.orbit, \
+            self.image_idx, self.image_dis = self.grid_buffer[key]
+    
     def load_vec_out_model(self):
         """
         load feature extraction and readout model
         """
-        self.vec_model = FeatureExtractNet()
-        self.out_model = ReadoutNet()
-        paras = torch.load(f'{self.model_save_path}/model_best.pth.tar', 
-                           map_location=self.device)
-        self.vec_model.load_state_dict(paras['state_dict'])
-        self.out_model.load_state_dict(paras['state_dict'])
-        self.normalizer.load_state_dict(paras['normalizer'])
+        self.load_session(f'{self.model_save_path}/model_best.pth.tar')
     
     def gnn_template(self, pos, type, symm, ratio, grid_idx, grid_dis):
         """
@@ -1734,6 +2215,189 @@ class Search(ActionSpace, GridGenerate, GNNPredict):
                         echo {self.iteration} {path} {node} >> record.dat
                         '''
         os.system(shell_script)
+
+
+class SearchDaemon(ListRWTools):
+    #long-lived SA workers on one node
+    def __init__(self, iteration, node):
+        self.iteration = iteration
+        self.node = node
+        self.sh_save_path = f'{Search_Path}/ml_{iteration:02.0f}'
+    
+    def run(self, job_file, job_limit=100, wait_time=60, retry=1):
+        """
+        load model and grids once per worker and feed path jobs by queue
+        failed or stalled paths are queued again, all paths share one deadline
+        
+        Parameters
+        ----------
+        job_file [str, 0d]: file of search jobs
+        job_limit [int, 0d]: limit of parallel workers
+        wait_time [float, 0d]: total waiting time of all paths
+        retry [int, 0d]: times of queueing a path again
+        """
+        jobs = self.read_jobs(job_file)
+        cores = max(1, min(job_limit, pythonmp.cpu_count(), len(jobs)))
+        ctx = pythonmp.get_context('fork')
+        job_queue, result_queue = ctx.Queue(), ctx.Queue()
+        for job in jobs:
+            os.system(f'touch {self.sh_save_path}/RUNNING_{job.path}')
+            job_queue.put(job)
+        workers = {}
+        for _ in range(cores):
+            self.start_worker(ctx, workers, job_queue, result_queue)
+        #stream results back until deadline of the shell watchdog
+        job_dict = {job.path: job for job in jobs}
+        tries = {job.path: 1 for job in jobs}
+        running, left = {}, set(job_dict.keys())
+        #every try of a path gets an equal share of the budget
+        deadline, stall_time = time.time() + wait_time, wait_time/(retry+1)
+        while len(left) > 0:
+            now = time.time()
+            if now > deadline:
+                system_echo(f'SA daemon on {self.node} timeout, {len(left)} paths left')
+                break
+            #replace workers stuck on one path
+            for path, (pid, begin) in list(running.items()):
+                if now - begin > stall_time:
+                    worker = workers.pop(pid)
+                    worker.kill()
+                    worker.join()
+                    del running[path]
+                    self.start_worker(ctx, workers, job_queue, result_queue)
+                    self.retry_path(job_dict[path], tries, left, job_queue, retry, 'timeout')
+            try:
+                path, pid, error = result_queue.get(timeout=min(1, deadline-now))
+            except queue.Empty:
+                continue
+            if error == 'start':
+                running[path] = (pid, time.time())
+                continue
+            running.pop(path, None)
+            if error is None:
+                left.discard(path)
+                self.remove_flag(path)
+            else:
+                system_echo(f'SA path {path} failed on {self.node}\n{error}')
+                self.retry_path(job_dict[path], tries, left, job_queue, retry, 'failed')
+        #retried paths are queued behind, so stop signals go last
+        for _ in workers:
+            job_queue.put(None)
+        for worker in workers.values():
+            if len(left) > 0 and worker.is_alive():
+                worker.terminate()
+            worker.join()
+        for path in left:
+            self.remove_flag(path)
+    
+    def start_worker(self, ctx, workers, job_queue, result_queue):
+        """
+        start one worker process
+        
+        Parameters
+        ----------
+        ctx [obj, 0d]: multiprocessing context
+        workers [dict, int:obj]: worker processes by pid
+        job_queue [obj, 0d]: queue of path jobs
+        result_queue [obj, 0d]: queue of finished paths and errors
+        """
+        worker = ctx.Process(target=self.worker, args=(job_queue, result_queue))
+        worker.start()
+        workers[worker.pid] = worker
+    
+    def retry_path(self, job, tries, left, job_queue, retry, reason):
+        """
+        queue path again or give up after retries
+        
+        Parameters
+        ----------
+        job [obj, 0d]: arguments of path
+        tries [dict, int:int]: tries of each path
+        left [set, int]: unfinished paths
+        job_queue [obj, 0d]: queue of path jobs
+        retry [int, 0d]: times of queueing a path again
+        reason [str, 0d]: reason of retry
+        """
+        if tries[job.path] <= retry:
+            tries[job.path] += 1
+            job_queue.put(job)
+            system_echo(f'SA path {job.path} {reason} on {self.node}, queued again')
+        else:
+            left.discard(job.path)
+            self.remove_flag(job.path)
+            system_echo(f'SA path {job.path} {reason} on {self.node}, give up')
+    
+    def remove_flag(self, path):
+        """
+        remove running flag of path
+        
+        Parameters
+        ----------
+        path [int, 0d]: path number
+        """
+        if os.path.exists(f'{self.sh_save_path}/RUNNING_{path}'):
+            os.remove(f'{self.sh_save_path}/RUNNING_{path}')
+    
+    def worker(self, job_queue, result_queue):
+        """
+        search paths until receiving stop signal
+        
+        Parameters
+        ----------
+        job_queue [obj, 0d]: queue of path jobs
+        result_queue [obj, 0d]: queue of started, finished paths and errors
+        """
+        torch.set_num_threads(1)
+        search = Search(self.iteration)
+        pid = os.getpid()
+        while True:
+            job = job_queue.get()
+            if job is None:
+                break
+            result_queue.put((job.path, pid, 'start'))
+            try:
+                if General_Search or Cluster_Search:
+                    search.gnn_SA_general(job.pos, job.type, job.symm, job.grid, job.ratio, job.sg,
+                                          job.angle, job.thick, job.path, self.node)
+                elif Template_Search:
+                    search.gnn_SA_template(job.pos, job.type, job.symm, job.grid, job.ratio, job.sg,
+                                           job.angle, job.thick, job.path, self.node)
+                result_queue.put((job.path, pid, None))
+            except Exception:
+                result_queue.put((job.path, pid, traceback.format_exc()))
+    
+    def read_jobs(self, job_file):
+        """
+        parse search jobs written by sampling_with_ssh
+        
+        Parameters
+        ----------
+        job_file [str, 0d]: file of search jobs
+        
+        Returns
+        ----------
+        jobs [obj, 1d]: arguments of each path
+        """
+        parser = argparse.ArgumentParser()
+        parser.add_argument('--pos', type=int, nargs='+')
+        parser.add_argument('--type', type=int, nargs='+')
+        parser.add_argument('--symm', type=int, nargs='+')
+        parser.add_argument('--grid', type=int)
+        parser.add_argument('--ratio', type=float)
+        parser.add_argument('--sg', type=int)
+        parser.add_argument('--angle', type=int, nargs='+')
+        parser.add_argument('--thick', type=int, nargs='+')
+        parser.add_argument('--iteration', type=int)
+        parser.add_argument('--path', type=int)
+        parser.add_argument('--node', type=str)
+        with open(job_file, 'r') as f:
+            ct = f.readlines()
+        jobs = []
+        for line in ct:
+            item = line.split()
+            if len(item) > 1:
+                jobs.append(parser.parse_args(item[1:]))
+        return jobs
         
 
 if __name__ == '__main__':
@@ -1752,6 +2416,9 @@ if __name__ == '__main__':
     parser.add_argument('--path', type=int)
     parser.add_argument('--node', type=str)
     parser.add_argument('--flag', type=int, default=0)
+    parser.add_argument('--jobs', type=str)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--wait', type=float, default=60)
     args = parser.parse_args()
     
     flag = args.flag
@@ -1787,4 +2454,8 @@ if __name__ == '__main__':
     
     elif flag == 1:
         worker = ParallelWorkers()
-        worker.collect_path(iteration)
\ No newline at end of file
+        worker.collect_path(iteration)
+    
+    elif flag == 2:
+        daemon = SearchDaemon(iteration, args.node)
+        daemon.run(args.jobs, job_limit=args.limit, wait_time=args.wait)
\ No newline at end of file
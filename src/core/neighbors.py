@@ -4,7 +4,6 @@ import numpy as np
 from pymatgen.core.structure import Structure
 from pymatgen.core.periodic_table import Element
 from pymatgen.symmetry.groups import SpaceGroup
-from pymatgen.util.coord import pbc_diff
 
 sys.path.append(f'{os.getcwd()}/src')
 from core.log_print import *
@@ -13,6 +12,9 @@ from core.utils import *
 
 class Neighbors(ListRWTools):
     #Neighbors related functions
+    #affine operations of space groups, shared by all instances
+    symm_ops = {}
+    
     def __init__(self, nbr=12, dmin=0, dmax=8, step=0.2, var=0.2):
         self.nbr = nbr
         self.var = var
@@ -126,9 +128,7 @@ class Neighbors(ListRWTools):
         """
         center_idx = ele_types.index(center_type)
         points_idx = [ele_types.index(i) for i in nbr_types]
-        nbr_bond_list = []
-        for idx in points_idx:
-            nbr_bond_list.append(bond_list[center_idx][idx])
+        nbr_bond_list = np.array(bond_list[center_idx])[points_idx]
         return nbr_bond_list
     
     def get_nbr_cutoff(self, center_type, ele_types, bond_list):
@@ -172,21 +172,15 @@ class Neighbors(ListRWTools):
         """
         point_idx = grid_idx[center_pos]
         point_dis = grid_dis[center_pos]*ratio
-        #get sites within cutoff
-        tmp_idx, tmp_dis = [], []
-        for i, dis in enumerate(point_dis):
-            if dis < cutoff:
-                tmp_idx.append(point_idx[i])
-                tmp_dis.append(point_dis[i])
+        #get sites within cutoff, distances are sorted
+        num = np.searchsorted(point_dis, cutoff)
+        tmp_idx, tmp_dis = point_idx[:num], point_dis[:num]
         #find neighbor atoms
-        pos = np.array(atom_pos)[:, None]
-        idx = np.where(tmp_idx==pos)[-1]
+        idx = np.where(np.isin(tmp_idx, atom_pos))[0]
         #get type and distance of neighbors
         if len(idx) > 0:
-            order = np.argsort(idx)
-            idx = idx[order]
-            center_nbr_pos = np.array(tmp_idx)[idx][:limit]
-            center_nbr_dis = np.array(tmp_dis)[idx][:limit]
+            center_nbr_pos = tmp_idx[idx][:limit]
+            center_nbr_dis = tmp_dis[idx][:limit]
             center_nbr_type = self.get_neighbor_type(atom_pos, atom_type, center_nbr_pos)[:limit]
         else:
             center_nbr_pos, center_nbr_type, center_nbr_dis = [], [], []
@@ -228,21 +222,87 @@ class Neighbors(ListRWTools):
         """
         flag = True
         if len(nbr_dis) > 0:
-            for dis, bond in zip(nbr_dis, nbr_bond_list):
-                if dis < bond:
-                    flag = False
-                    break
+            flag = not np.any(np.array(nbr_dis) < np.array(nbr_bond_list))
         return flag
 
-    def get_neighbors_DAU(self, stru, cutoff, mapping):
+    def get_neighbor_list(self, latt_vec, frac_coords, cutoff, center_num=None, tol=1e-8):
         """
-        index and distance of near grid points in DAU
+        periodic neighbor list by linked cells, consistent with pymatgen
         
         Parameters
         ----------
-        stru [obj, 0d]: structure object in pymatgen
+        latt_vec [float, 2d, np]: lattice vector
+        frac_coords [float, 2d]: fraction coordinates of points
         cutoff [float, 0d]: cutoff distance
+        center_num [int, 0d]: first center_num points are centers
+        tol [float, 0d]: tolerance of self point
+        
+        Returns
+        ----------
+        centers [int, 1d, np]: index of center atoms
+        points [int, 1d, np]: index of neighbor atoms
+        dis [float, 1d, np]: distance of neighbor atoms
+        """
+        latt_vec = np.array(latt_vec, dtype=float)
+        frac = np.mod(np.array(frac_coords, dtype=float).reshape(-1, 3), 1)
+        frac[frac>=1] = 0
+        if center_num is None:
+            center_num = len(frac)
+        if center_num == 0 or len(frac) == 0:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+        #thickness of cell in each direction
+        volume = np.abs(np.linalg.det(latt_vec))
+        cross = np.cross(latt_vec[[1, 2, 0]], latt_vec[[2, 0, 1]])
+        heights = volume/np.linalg.norm(cross, axis=1)
+        #cells are thicker than cutoff, search range covers cutoff
+        cell_num = np.maximum(1, np.floor(heights/cutoff)).astype(int)
+        search = np.ceil(cutoff*cell_num/heights).astype(int)
+        #sort points by cell
+        cell = np.minimum(np.floor(frac*cell_num).astype(int), cell_num-1)
+        key = np.ravel_multi_index(cell.T, cell_num)
+        order = np.argsort(key, kind='stable')
+        cell_count = np.bincount(key, minlength=np.prod(cell_num))
+        cell_start = np.cumsum(cell_count)-cell_count
+        center_cell = cell[:center_num]
+        center_frac = frac[:center_num]
+        center_all = np.arange(center_num)
+        offsets = np.stack(np.meshgrid(*[np.arange(-i, i+1) for i in search], indexing='ij'), axis=-1).reshape(-1, 3)
+        centers, points, dis = [], [], []
+        for offset in offsets:
+            #neighbor cell and periodic image
+            nbr_cell = center_cell+offset
+            shift = np.floor_divide(nbr_cell, cell_num)
+            nbr_key = np.ravel_multi_index((nbr_cell-shift*cell_num).T, cell_num)
+            count = cell_count[nbr_key]
+            total = np.sum(count)
+            if total == 0:
+                continue
+            center_idx = np.repeat(center_all, count)
+            local = np.arange(total)-np.repeat(np.cumsum(count)-count, count)
+            point_idx = order[np.repeat(cell_start[nbr_key], count)+local]
+            vec = frac[point_idx]+np.repeat(shift, count, axis=0)-center_frac[center_idx]
+            distance = np.linalg.norm(np.dot(vec, latt_vec), axis=1)
+            #exclude self point
+            keep = (distance<=cutoff)&~((center_idx==point_idx)&(distance<=tol))
+            centers.append(center_idx[keep])
+            points.append(point_idx[keep])
+            dis.append(distance[keep])
+        if len(centers) == 0:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+        centers, points, dis = np.concatenate(centers), np.concatenate(points), np.concatenate(dis)
+        #group by center atoms
+        order = np.argsort(centers, kind='stable')
+        return centers[order], points[order], dis[order]
+    
+    def get_neighbors_DAU(self, latt_vec, coords, cutoff, mapping):
+        """
+        index and distance of near grid points in DAU
         
+        Parameters
+        ----------
+        latt_vec [float, 2d, np]: lattice vector
+        coords [float, 2d, np]: fraction coordinates of grid
+        cutoff [float, 0d]: cutoff distance
         mapping [int, 2d]: mapping between DAU and all grid
         
         Returns
@@ -252,85 +312,78 @@ class Neighbors(ListRWTools):
         """
         #neighbor index and distance of DAU
         dau_atom_num = len(mapping)
-        centers, points, _, dis = stru.get_neighbor_list(cutoff, sites=stru.sites[:dau_atom_num])
-        if len(centers) > 0:
-            nbr_idx, nbr_dis = self.divide_neighbors(centers, points, dis)
-            nbr_idx, nbr_dis = self.fill_neighbors(dau_atom_num, centers, nbr_idx, nbr_dis, self.dmax)
-        else:
-            nbr_idx = [[i] for i in range(dau_atom_num)]
-            nbr_dis = [[self.dmax] for _ in range(dau_atom_num)]
+        centers, points, dis = self.get_neighbor_list(latt_vec, coords, cutoff, center_num=dau_atom_num)
         #padding neighbors
-        max_nbr_num = max(map(lambda x: len(x), nbr_idx))
-        nbr_idx_pad = self.pad_neighbors(nbr_idx, max_nbr_num, 'index')
-        nbr_dis_pad = self.pad_neighbors(nbr_dis, max_nbr_num, 'distance')
-        nbr_idx, nbr_dis = self.reduce_to_DAU(nbr_idx_pad, nbr_dis_pad, mapping)
+        nbr_idx, nbr_dis = self.get_dense_neighbors(dau_atom_num, centers, points, dis, mapping=mapping)
         return nbr_idx, nbr_dis
     
-    def divide_neighbors(self, centers, points, dis, ratio=1):
+    def get_dense_neighbors(self, atom_num, centers, points, dis, nbr_num=None, ratio=1, mapping=None):
         """
-        get neighbors of center atoms
+        sort, cut and pad flat neighbor list into dense matrix
         
         Parameters
         ----------
+        atom_num [int, 0d]: number of center atoms
         centers [int, 1d, np]: index of center atoms
         points [int, 1d, np]: index of neighbor atoms
-        dis [float, 1d]: distance of neighbor atoms
-        ratio [float, 0d]: grid ratio 
+        dis [float, 1d, np]: distance of neighbor atoms
+        nbr_num [int, 0d]: number of neighbors, default is maximum
+        ratio [float, 0d]: grid ratio
+        mapping [int, 2d]: mapping between DAU and all grid
         
         Returns
         ----------
-        nbr_idx [int, 2d]: neighbor index of each atom
-        nbr_dis [float, 2d]: neighbor distance of each atom
-        """
-        nbr_idx, nbr_dis = [], []
-        tmp_idx, tmp_dis = [], []
-        last = centers[0]
-        for i, center in enumerate(centers):
-            if center == last:
-                tmp_dis.append(dis[i])
-                tmp_idx.append(points[i])
-            else:
-                order = np.argsort(tmp_dis)
-                tmp_idx = np.array(tmp_idx)[order]
-                tmp_dis = ratio*np.array(tmp_dis)[order]
-                nbr_idx.append(tmp_idx)
-                nbr_dis.append(tmp_dis)
-                tmp_idx = [points[i]]
-                tmp_dis = [dis[i]]
-                last = center
-        order = np.argsort(tmp_dis)
-        tmp_idx = np.array(tmp_idx)[order]
-        tmp_dis = ratio*np.array(tmp_dis)[order]
-        nbr_idx.append(tmp_idx)
-        nbr_dis.append(tmp_dis)
+        nbr_idx [int, 2d, np]: neighbor index of each atom
+        nbr_dis [float, 2d, np]: neighbor distance of each atom
+        """
+        centers = np.array(centers, dtype=int)
+        points = np.array(points, dtype=int)
+        dis = ratio*np.array(dis, dtype=float)
+        #sort by center and distance
+        order = np.lexsort((dis, centers))
+        centers, points, dis = centers[order], points[order], dis[order]
+        #rank of neighbors in each segment
+        count = np.bincount(centers, minlength=atom_num)
+        offsets = np.cumsum(count)-count
+        rank = np.arange(len(centers))-np.repeat(offsets, count)
+        if nbr_num is None:
+            nbr_num = max(1, np.max(count))
+        keep = rank<nbr_num
+        nbr_idx = np.zeros((atom_num, nbr_num), dtype=int)
+        nbr_dis = np.full((atom_num, nbr_num), self.dmax+1, dtype=float)
+        nbr_idx[centers[keep], rank[keep]] = points[keep]
+        nbr_dis[centers[keep], rank[keep]] = dis[keep]
+        #atom without neighbors takes itself at maximum distance
+        atom_idx = np.arange(atom_num)
+        lack = count==0
+        nbr_idx[lack, 0] = atom_idx[lack]
+        nbr_dis[lack, 0] = self.dmax
+        #pad index by the last neighbor
+        last = np.maximum(np.minimum(count, nbr_num)-1, 0)
+        pad = np.arange(nbr_num)>last[:, None]
+        nbr_idx = np.where(pad, nbr_idx[atom_idx, last][:, None], nbr_idx)
+        if mapping is not None:
+            nbr_idx, nbr_dis = self.reduce_to_DAU(nbr_idx, nbr_dis, mapping)
         return nbr_idx, nbr_dis
     
-    def fill_neighbors(self, atom_num, centers, nbr_idx, nbr_dis, dmax):
+    def get_DAU_lookup(self, mapping):
         """
-        ensure each atom has neighbors
+        lookup array from all grid to DAU
         
         Parameters
         ----------
-        atom_num [int, 0d]: number of atoms in DAU
-        centers [int, 1d]: index of center atoms
-        nbr_idx [int, 2d]: index of near neighbor 
-        nbr_dis [float, 2d]: distance of near neighbor 
-        dmax [float, 0d]: maximum distance
+        mapping [int, 2d]: mapping between DAU and all grid
         
         Returns
         ----------
-        nbr_idx [int, 2d]: neighbor index of each atom
-        nbr_dis [float, 2d]: neighbor distance of each atom
+        lookup [int, 1d, np]: DAU index of each grid point
         """
-        uni_atom = np.unique(centers)
-        if atom_num > len(uni_atom):
-            atom_idx = np.arange(atom_num)
-            lack_idx = np.setdiff1d(atom_idx, uni_atom)
-            lack_idx = lack_idx[::-1]
-            for i in lack_idx:
-                nbr_idx.insert(i, [i])
-                nbr_dis.insert(i, [dmax])
-        return nbr_idx, nbr_dis
+        lengths = [len(line) for line in mapping]
+        full_idx = np.concatenate(mapping).astype(int)
+        dau_idx = np.repeat([line[0] for line in mapping], lengths)
+        lookup = np.arange(np.max(full_idx)+1)
+        lookup[full_idx] = dau_idx
+        return lookup
     
     def reduce_to_DAU(self, nbr_idx, nbr_dis, mapping):
         """
@@ -347,14 +400,11 @@ class Neighbors(ListRWTools):
         nbr_idx [int, 2d, np]: index of near neighbor in DAU
         nbr_dis [float, 2d, np]: distance of near neighbor in DAU
         """
-        nbr_idx = np.array(nbr_idx)
+        nbr_idx = np.array(nbr_idx, dtype=int)
         nbr_dis = np.array(nbr_dis)
-        #reduce to min area
-        for line in mapping:
-            if len(line) > 1:
-                dau_atom = line[0]
-                for atom in line[1:]:
-                    nbr_idx[nbr_idx==atom] = dau_atom
+        lookup = self.get_DAU_lookup(mapping)
+        inside = nbr_idx<len(lookup)
+        nbr_idx[inside] = lookup[nbr_idx[inside]]
         return nbr_idx, nbr_dis
     
     def get_nbr_stru(self, stru, ratio=1):
@@ -371,15 +421,13 @@ class Neighbors(ListRWTools):
         nbr_idx [int, 2d, np]: neighbor index of atoms
         nbr_dis [float, 2d, np]: neighbor distance of atoms
         """
-        centers, points, _, dis = stru.get_neighbor_list(self.dmax)
-        nbr_idx, nbr_dis = self.divide_neighbors(centers, points, dis, ratio=ratio)
+        centers, points, dis = self.get_neighbor_list(stru.lattice.matrix, stru.frac_coords, self.dmax)
         #get neighbor index and distance
         atom_num = len(stru.atomic_numbers)
-        nbr_idx, nbr_dis = self.fill_neighbors(atom_num, centers, nbr_idx, nbr_dis, self.dmax)
-        nbr_idx, nbr_dis = self.cut_pad_neighbors(nbr_idx, nbr_dis, self.nbr)
+        nbr_idx, nbr_dis = self.get_dense_neighbors(atom_num, centers, points, dis, self.nbr, ratio=ratio)
         return nbr_idx, nbr_dis
     
-    def get_nbr_general(self, atom_pos, ratio, sg, latt_vec, grid_coords, nbr_num=12):
+    def get_nbr_general(self, atom_pos, ratio, sg, latt_vec, grid_coords, nbr_num=12, orbit=None):
         """
         get neighbor distance and index
         
@@ -391,58 +439,171 @@ class Neighbors(ListRWTools):
         latt_vec [float, 2d, np]: lattice vector
         grid_coords [float, 2d, np]: fraction coordinates of grid
         nbr_num [int, 0d]: number of neighbors
+        orbit [int, 2d, np]: orbit table of grid
         
         Returns
         ----------
         nbr_idx [int, 2d, np]: neighbor index of atoms
         nbr_dis [float, 2d, np]: neighbor distance of atoms
         """
-        mapping = []
-        dau_coords = grid_coords[atom_pos]
-        dau_atom_num = len(dau_coords)
-        all_points = dau_coords.tolist()
-        spg = SpaceGroup.from_int_number(sg)
+        dau_atom_num = len(atom_pos)
         #get all equivalent sites and mapping relationship
-        for i, point in enumerate(dau_coords):
-            coords = spg.get_orbit(point)
-            equal_coords = self.get_equal_coords(point, coords)
-            start = len(all_points)
-            end = start + len(equal_coords)
-            mapping.append([i] + [j for j in range(start, end)])
-            all_points += equal_coords
+        if orbit is None:
+            all_points, mapping = self.get_orbit_points(sg, grid_coords[atom_pos])
+        else:
+            all_points, mapping = self.expand_by_orbit(atom_pos, grid_coords, orbit)
         #get neighbor index and distance of sites in DAU
-        atom_type = [1 for _ in range(len(all_points))]
-        stru = Structure(latt_vec, atom_type, all_points)
-        centers, points, _, dis = stru.get_neighbor_list(self.dmax, sites=stru.sites[:dau_atom_num])
-        nbr_idx, nbr_dis = self.divide_neighbors(centers, points, dis, ratio=ratio)
+        centers, points, dis = self.get_neighbor_list(latt_vec, all_points, self.dmax, center_num=dau_atom_num)
         #cutting and padding neighbors
-        nbr_idx, nbr_dis = self.fill_neighbors(dau_atom_num, centers, nbr_idx, nbr_dis, self.dmax)
-        nbr_idx, nbr_dis = self.cut_pad_neighbors(nbr_idx, nbr_dis, nbr_num)
-        nbr_idx, nbr_dis = self.reduce_to_DAU(nbr_idx, nbr_dis, mapping)
+        nbr_idx, nbr_dis = self.get_dense_neighbors(dau_atom_num, centers, points, dis, nbr_num, ratio=ratio, mapping=mapping)
         return nbr_idx, nbr_dis
     
-    def get_equal_coords(self, point, coords):
+    def get_symm_ops(self, sg):
         """
-        get equivalent coordinates
+        get cached affine operations of space group
         
         Parameters
         ----------
-        point [float, 1d]: point in minimum area
-        coords [float, 2d]: all symmetry coordinates
-
+        sg [int, 0d]: space group number
+        
         Returns
         ----------
-        equal_coords [float, 2d]: equivalent coordinates
+        rot [float, 3d, np]: rotation matrices
+        trans [float, 2d, np]: translation vectors
         """
-        equal_coords = coords.copy()
-        for i, coord in enumerate(equal_coords):
-            vec = pbc_diff(point, coord)
-            if np.linalg.norm(vec) < 1e-5:
-                del equal_coords[i]
-                break
-        return equal_coords
+        if sg not in self.symm_ops:
+            spg = SpaceGroup.from_int_number(sg)
+            ops = list(spg.symmetry_ops)
+            rot = np.array([op.rotation_matrix for op in ops])
+            trans = np.array([op.translation_vector for op in ops])
+            self.symm_ops[sg] = (rot, trans)
+        return self.symm_ops[sg]
     
-    def get_nbr_fea_general(self, atom_pos, ratio, sg, latt_vec, grid_coords):
+    def get_orbit_batch(self, sg, coords, tol=1e-5):
+        """
+        expand coordinates into orbits by symmetry operations, same as get_orbit in pymatgen
+        
+        Parameters
+        ----------
+        sg [int, 0d]: space group number
+        coords [float, 2d]: fraction coordinates
+        tol [float, 0d]: tolerance of same image
+        
+        Returns
+        ----------
+        images [float, 3d, np]: images of each point, [n, ops, 3]
+        unique [bool, 2d, np]: first occurrence of each image
+        """
+        rot, trans = self.get_symm_ops(sg)
+        coords = np.array(coords, dtype=float).reshape(-1, 3)
+        images = np.einsum('oij,nj->noi', rot, coords)+trans
+        images = np.mod(np.round(images, decimals=10), 1)
+        #compare with previous images, chunked to bound memory
+        op_num = len(rot)
+        previous = np.tril(np.ones((op_num, op_num), dtype=bool), -1)
+        unique = np.ones(images.shape[:2], dtype=bool)
+        step = max(1, 2**20//op_num**2)
+        for i in range(0, len(images), step):
+            chunk = images[i:i+step]
+            same = np.sum(np.abs(chunk[:, :, None]-chunk[:, None]), axis=-1)<tol
+            unique[i:i+step] = ~np.any(same&previous, axis=-1)
+        return images, unique
+    
+    def get_equal_coords_batch(self, sg, coords, tol=1e-5):
+        """
+        get equivalent images of coordinates except themselves
+        
+        Parameters
+        ----------
+        sg [int, 0d]: space group number
+        coords [float, 2d]: fraction coordinates
+        tol [float, 0d]: tolerance of same point
+        
+        Returns
+        ----------
+        images [float, 3d, np]: images of each point, [n, ops, 3]
+        keep [bool, 2d, np]: equivalent images except the point itself
+        """
+        coords = np.array(coords, dtype=float).reshape(-1, 3)
+        images, keep = self.get_orbit_batch(sg, coords)
+        #exclude the first image equal to point
+        diff = images-coords[:, None]
+        diff -= np.round(diff)
+        is_self = keep&(np.linalg.norm(diff, axis=-1)<tol)
+        has_self = np.any(is_self, axis=1)
+        first = np.argmax(is_self, axis=1)
+        keep[np.where(has_self)[0], first[has_self]] = False
+        return images, keep
+    
+    def get_orbit_points(self, sg, dau_coords):
+        """
+        get all equivalent sites by symmetry operations
+        
+        Parameters
+        ----------
+        sg [int, 0d]: space group number
+        dau_coords [float, 2d, np]: coordinates in DAU
+        
+        Returns
+        ----------
+        all_points [float, 2d, np]: coordinates in unit cell
+        mapping [int, 2d]: mapping between DAU and all points
+        """
+        dau_coords = np.array(dau_coords, dtype=float).reshape(-1, 3)
+        dau_atom_num = len(dau_coords)
+        images, keep = self.get_equal_coords_batch(sg, dau_coords)
+        image_num = np.sum(keep, axis=1)
+        all_points = np.concatenate((dau_coords, images[keep]))
+        end = dau_atom_num + np.cumsum(image_num)
+        start = end - image_num
+        mapping = [[i] + [j for j in range(start[i], end[i])] for i in range(dau_atom_num)]
+        return all_points, mapping
+    
+    def get_orbit_table(self, mapping):
+        """
+        convert mapping into orbit table padded by -1
+        
+        Parameters
+        ----------
+        mapping [int, 2d]: mapping between DAU and all grid
+        
+        Returns
+        ----------
+        orbit [int, 2d, np]: grid index of DAU point and its images
+        """
+        mul = max([len(i) for i in mapping])
+        orbit = -np.ones((len(mapping), mul), dtype=int)
+        for i, line in enumerate(mapping):
+            orbit[i, :len(line)] = line
+        return orbit
+    
+    def expand_by_orbit(self, atom_pos, grid_coords, orbit):
+        """
+        get all equivalent sites by indexing orbit table
+        
+        Parameters
+        ----------
+        atom_pos [int, 1d]: position of atoms
+        grid_coords [float, 2d, np]: fraction coordinates of grid
+        orbit [int, 2d, np]: orbit table of grid
+        
+        Returns
+        ----------
+        all_points [float, 2d, np]: coordinates in unit cell
+        mapping [int, 2d]: mapping between DAU and all points
+        """
+        dau_atom_num = len(atom_pos)
+        images = orbit[atom_pos, 1:]
+        bool_filter = images > -1
+        image_num = np.sum(bool_filter, axis=1)
+        all_idx = np.concatenate((atom_pos, images[bool_filter]))
+        all_points = grid_coords[all_idx]
+        end = dau_atom_num + np.cumsum(image_num)
+        start = end - image_num
+        mapping = [[i] + [j for j in range(start[i], end[i])] for i in range(dau_atom_num)]
+        return all_points, mapping
+    
+    def get_nbr_fea_general(self, atom_pos, ratio, sg, latt_vec, grid_coords, orbit=None):
         """
         neighbor bond features and index are cutoff by 12 atoms
         
@@ -453,15 +614,16 @@ class Neighbors(ListRWTools):
         sg [int, 0d]: space group number
         latt_vec [float, 2d, np]: lattice vector
         grid_coords [float, 2d, np]: fraction coordinates of grid
+        orbit [int, 2d, np]: orbit table of grid
         
         Returns
         ----------
-        nbr_fea [float, 3d, np]: neighbor feature of atoms
+        nbr_fea [float, 2d, np]: neighbor distance of atoms
         nbr_idx [int, 2d, np]: neighbor index of atoms
         """
-        nbr_idx, nbr_dis = self.get_nbr_general(atom_pos, ratio, sg, latt_vec, grid_coords)
-        #get bond features
-        nbr_fea = self.expand(nbr_dis)
+        nbr_idx, nbr_dis = self.get_nbr_general(atom_pos, ratio, sg, latt_vec, grid_coords, nbr_num=self.nbr, orbit=orbit)
+        #bond features are expanded inside GNN
+        nbr_fea = nbr_dis
         return nbr_fea, nbr_idx
     
     def get_atom_fea(self, atom_type, elem_embed):
@@ -495,42 +657,6 @@ class Neighbors(ListRWTools):
         return np.exp(-(distances[:, :, np.newaxis] - self.filter)**2 /
                       self.var**2)
     
-    def pad_neighbors(self, neighbors, nbr_num, pattern):
-        """
-        pad index or distance of neighbors
-        
-        Parameters
-        ----------
-        neighbors [int/float, 2d]: neighbors of atoms
-        nbr_num [int, 0d]: number of neighbors
-        pattern [str, 0d]: padding index or distance
-        
-        Returns
-        ----------
-        neighbors [int/float, 2d]: neighbors after padding
-        """
-        if pattern == 'index':
-            neighbors = [np.pad(i, (0, nbr_num-len(i)), constant_values=i[-1]) for i in neighbors]
-        elif pattern == 'distance':
-            neighbors = [np.pad(i, (0, nbr_num-len(i)), constant_values=self.dmax+1) for i in neighbors]
-        return neighbors
-    
-    def cut_neighbors(self, neighbors, nbr_num):
-        """
-        cut index or distance of neighbors
-
-        Parameters
-        ----------
-        neighbors [int/float, 2d]: neighbors of atoms
-        nbr_num [int, 0d]: number of neighbors
-
-        Returns
-        ----------
-        neighbors [int/float, 2d]: neighbors after cutting
-        """
-        neighbors = map(lambda x: x[:nbr_num], neighbors)
-        return neighbors
-    
     def cut_pad_neighbors(self, nbr_idx, nbr_dis, nbr_num):
         """
         cut and pad neighbors
@@ -546,14 +672,13 @@ class Neighbors(ListRWTools):
         nbr_idx_new [int, 2d, np]: neighbor index after cutting and padding
         nbr_dis_new [float, 2d, np]: neighbor distance after cutting and padding
         """
-        nbr_idx_cut = self.cut_neighbors(nbr_idx, nbr_num)
-        nbr_dis_cut = self.cut_neighbors(nbr_dis, nbr_num)
-        nbr_idx_pad = self.pad_neighbors(nbr_idx_cut, nbr_num, 'index')
-        nbr_dis_pad = self.pad_neighbors(nbr_dis_cut, nbr_num, 'distance')
-        nbr_idx_new, nbr_dis_new = np.array(nbr_idx_pad, dtype=int), np.array(nbr_dis_pad)
+        lengths = [len(i) for i in nbr_idx]
+        centers = np.repeat(np.arange(len(lengths)), lengths)
+        points, dis = np.concatenate(nbr_idx), np.concatenate(nbr_dis)
+        nbr_idx_new, nbr_dis_new = self.get_dense_neighbors(len(lengths), centers, points, dis, nbr_num)
         return nbr_idx_new, nbr_dis_new
     
-    def update_neighbors(self, pos_1, pos_2, nbr_idx_1, nbr_dis_1, ratio, sg, latt_vec, grid_coords):
+    def update_neighbors(self, pos_1, pos_2, nbr_idx_1, nbr_dis_1, ratio, sg, latt_vec, grid_coords, orbit=None):
         """
         update neighbors by last step neighbors
         
@@ -567,6 +692,7 @@ class Neighbors(ListRWTools):
         sg [int, 0d]: space group number
         latt_vec [float, 2d, np]: lattice vector
         grid_coords [float, 2d, np]: fraction coordinates of grid
+        orbit [int, 2d, np]: orbit table of grid
 
         Returns
         ----------
@@ -580,30 +706,25 @@ class Neighbors(ListRWTools):
             dau_coords = grid_coords[pos_2]
             dau_atom_num = len(pos_2)
             diff_idx = np.where(diff!=0)[-1][0]
-            all_points = dau_coords.tolist()
             #get all equivalent sites and mapping relationship
-            mapping = []
-            spg = SpaceGroup.from_int_number(sg)
-            for i, point in enumerate(dau_coords):
-                coords = spg.get_orbit(point)
-                equal_coords = self.get_equal_coords(point, coords)
-                start = len(all_points)
-                end = start + len(equal_coords)
-                mapping.append([i] + [j for j in range(start, end)])
-                all_points += equal_coords
+            if orbit is None:
+                all_points, mapping = self.get_orbit_points(sg, dau_coords)
+            else:
+                all_points, mapping = self.expand_by_orbit(pos_2, grid_coords, orbit)
             #get neighbor index and distance for new site in DAU
-            atom_type = [1 for _ in range(len(all_points))]
-            stru = Structure(latt_vec, atom_type, all_points)
-            site_in_DAU = [stru.sites[diff_idx]]
-            centers, points, _, dis = stru.get_neighbor_list(self.dmax, sites=site_in_DAU)
-            dau_nbr_idx, dau_nbr_dis = self.divide_neighbors(centers, points, dis, ratio=ratio)
+            all_points = np.array(all_points)
+            centers, points, dis = self.get_neighbor_list(latt_vec, np.concatenate(([all_points[diff_idx]], all_points)), self.dmax, center_num=1)
+            #drop duplicated center and self point
+            points = points-1
+            keep = (points>=0)&~((points==diff_idx)&(dis<=1e-8))
+            centers, points, dis = centers[keep], points[keep], dis[keep]
+            dau_nbr_idx, dau_nbr_dis = self.get_dense_neighbors(1, centers, points, dis, ratio=ratio)
             dau_nbr_idx, dau_nbr_dis = dau_nbr_idx[0], dau_nbr_dis[0]
             dau_nbr_idx, dau_nbr_dis = self.exclude_self(diff_idx, dau_nbr_idx, dau_nbr_dis)
             dau_nbr_idx, dau_nbr_dis = self.reduce_to_DAU(dau_nbr_idx, dau_nbr_dis, mapping)
             #get neighbor index and distance for same sites in DAU
             symm_idx_all = mapping[diff_idx]
             symm_coords = np.array(all_points)[symm_idx_all]
-            atom_type = [1 for _ in range(len(symm_coords)+1)]
             update_nbr_idx, update_nbr_dis = [], []
             for i in range(dau_atom_num):
                 if i == diff_idx:
@@ -611,11 +732,9 @@ class Neighbors(ListRWTools):
                     update_nbr_dis.append(dau_nbr_dis)
                 else:
                     tmp_points = np.concatenate(([dau_coords[i]], symm_coords))
-                    stru = Structure(latt_vec, atom_type, tmp_points)
-                    site_in_DAU = [stru.sites[0]]
-                    centers, points, _, dis = stru.get_neighbor_list(self.dmax, sites=site_in_DAU)
+                    centers, points, dis = self.get_neighbor_list(latt_vec, tmp_points, self.dmax, center_num=1)
                     if len(centers) > 0:
-                        fix_nbr_idx, fix_nbr_dis = self.divide_neighbors(centers, points, dis, ratio=ratio)
+                        fix_nbr_idx, fix_nbr_dis = self.get_dense_neighbors(1, centers, points, dis, ratio=ratio)
                         fix_nbr_idx, fix_nbr_dis = fix_nbr_idx[0], fix_nbr_dis[0]
                         #exclude self point
                         fix_nbr_idx, fix_nbr_dis = self.exclude_self(0, fix_nbr_idx, fix_nbr_dis)
@@ -632,6 +751,78 @@ class Neighbors(ListRWTools):
             nbr_idx_new, nbr_dis_new = self.adjust_neighbors(diff_idx, nbr_idx_del, nbr_dis_del, update_nbr_idx, update_nbr_dis)
         return nbr_idx_new, nbr_dis_new
     
+    def update_neighbors_by_table(self, pos_1, pos_2, nbr_idx_1, nbr_dis_1, ratio, image_idx, image_dis, nbr_num=30):
+        """
+        update neighbors by grid-to-grid distance table of full-cell images
+        
+        Parameters
+        ----------
+        pos_1 [int, 1d]: old atom position
+        pos_2 [int, 1d]: new atom position 
+        nbr_idx_1 [int, 2d]: index of neighbors
+        nbr_dis_1 [float, 2d]: distance of neighbors
+        ratio [float, 0d]: grid ratio
+        image_idx [int, 2d, np]: DAU index of images near each grid point
+        image_dis [float, 2d, np]: distance of images near each grid point
+        nbr_num [int, 0d]: number of neighbors
+
+        Returns
+        ----------
+        nbr_idx_new [int, 2d, np]: updated neighbor index
+        nbr_dis_new [float, 2d, np]: updated neighbor distance
+        """
+        diff = np.subtract(pos_1, pos_2)
+        if np.sum(np.abs(diff)) == 0:
+            nbr_idx_new, nbr_dis_new = nbr_idx_1, nbr_dis_1
+        else:
+            nbr_idx_new, nbr_dis_new = self.get_nbr_by_table(pos_2, ratio, image_idx, image_dis, nbr_num)
+        return nbr_idx_new, nbr_dis_new
+    
+    def get_nbr_by_table(self, atom_pos, ratio, image_idx, image_dis, nbr_num=30):
+        """
+        get neighbor distance and index of atoms from grid distance table
+        
+        Parameters
+        ----------
+        atom_pos [int, 1d]: position of atoms
+        ratio [float, 0d]: grid ratio
+        image_idx [int, 2d, np]: DAU index of images near each grid point
+        image_dis [float, 2d, np]: distance of images near each grid point
+        nbr_num [int, 0d]: number of neighbors
+        
+        Returns
+        ----------
+        nbr_idx [int, 2d, np]: neighbor index of atoms
+        nbr_dis [float, 2d, np]: neighbor distance of atoms
+        """
+        atom_num = len(atom_pos)
+        #atom index of occupied grid points
+        site_atom = -np.ones(len(image_idx), dtype=int)
+        site_atom[atom_pos] = np.arange(atom_num)
+        row_idx = site_atom[image_idx[atom_pos]]
+        row_dis = image_dis[atom_pos]
+        bool_filter = (row_idx > -1) & (row_dis <= self.dmax)
+        if row_idx.shape[1] < nbr_num:
+            pad_num = nbr_num - row_idx.shape[1]
+            row_idx = np.pad(row_idx, ((0, 0), (0, pad_num)), constant_values=-1)
+            row_dis = np.pad(row_dis, ((0, 0), (0, pad_num)), constant_values=self.dmax+1)
+            bool_filter = np.pad(bool_filter, ((0, 0), (0, pad_num)), constant_values=False)
+        #keep occupied images in order of distance
+        order = np.argsort(~bool_filter, axis=1, kind='stable')[:, :nbr_num]
+        nbr_idx = np.take_along_axis(row_idx, order, axis=1)
+        nbr_dis = ratio*np.take_along_axis(row_dis, order, axis=1)
+        #pad index by last neighbor and distance by dmax+1
+        valid_num = np.minimum(np.sum(bool_filter, axis=1), nbr_num)
+        last_idx = np.take_along_axis(nbr_idx, np.maximum(valid_num-1, 0)[:, None], axis=1)
+        pad_filter = np.arange(nbr_num)[None, :] >= valid_num[:, None]
+        nbr_idx = np.where(pad_filter, last_idx, nbr_idx)
+        nbr_dis = np.where(pad_filter, self.dmax+1, nbr_dis)
+        #atoms without neighbors
+        lack_idx = np.where(valid_num == 0)[0]
+        nbr_idx[lack_idx] = lack_idx[:, None]
+        nbr_dis[lack_idx, 0] = self.dmax
+        return nbr_idx, nbr_dis
+    
     def delete_neighbors(self, diff_idx, nbr_idx, nbr_dis):
         """
         delete different site index from neighbors
@@ -727,7 +918,7 @@ class Neighbors(ListRWTools):
         
         Returns
         ----------
-        nbr_fea [float, 3d, np]: neighbor feature of atoms
+        nbr_fea [float, 2d, np]: neighbor distance of atoms
         nbr_idx [int, 2d, np]: neighbor index of atoms
         """
         #get index and distance of points
@@ -758,8 +949,8 @@ class Neighbors(ListRWTools):
                 nbr_idx[i] = point_idx[i, atom_idx]
                 nbr_dis[i] = point_dis[i, atom_idx]
         nbr_idx, nbr_dis = np.array(nbr_idx, dtype=int), np.array(nbr_dis)
-        #get bond features
-        nbr_fea = self.expand(nbr_dis)
+        #bond features are expanded inside GNN
+        nbr_fea = nbr_dis
         nbr_idx = self.idx_transfer(atom_pos, nbr_idx)
         return nbr_fea, nbr_idx
     
@@ -68,6 +68,7 @@ Recyc_Store_Path = 'data/grid/store'
 SCCOP_Out_Path = 'data/poscar/SCCOP'
 Optim_Strus_Path = 'data/poscar/optim_strus'
 Init_Strus_Path = 'data/poscar/initial_strus'
+Vector_Store_Path = 'data/vector_store'
 
 #File
 Log_File = 'data/log.sccop'
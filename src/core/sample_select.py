@@ -29,6 +29,10 @@ class Select(SSHTools, GNNSlice):
         #import searching data
         atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks, energys, crys_vec = self.import_search_data()
         train_pos, train_type, train_symm, train_grid, train_ratio, train_sg, train_angles, train_thicks, gnn_energys, train_vec = self.import_train_set()
+        #lower confidence bound trades off energy and uncertainty
+        scores = energys
+        if Uncertainty_Weight > 0:
+            scores = energys - Uncertainty_Weight*self.get_uncertainty(crys_vec)
         #delect selected samples
         idx = self.delete_same_selected(atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks,
                                         train_pos, train_type, train_symm, train_grid, train_ratio, train_sg, train_angles, train_thicks)
@@ -36,13 +40,15 @@ class Select(SSHTools, GNNSlice):
             self.filter_samples(idx, atom_pos, atom_type, atom_symm, 
                                 grid_name, grid_ratio, space_group, angles, thicks)
         energys = energys[idx]
+        scores = scores[idx]
         crys_vec = crys_vec[idx]
-        #sorted by energy
-        idx = np.argsort(energys)[:limit]
+        #sorted by score
+        idx = np.argsort(scores)[:limit]
         atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks = \
             self.filter_samples(idx, atom_pos, atom_type, atom_symm, 
                                 grid_name, grid_ratio, space_group, angles, thicks)
         energys = energys[idx]
+        scores = scores[idx]
         crys_vec = crys_vec[idx]
         #delect selected samples by crystal vectors
         if Use_ML_Clustering:
@@ -54,6 +60,7 @@ class Select(SSHTools, GNNSlice):
                 self.filter_samples(idx, atom_pos, atom_type, atom_symm, 
                                     grid_name, grid_ratio, space_group, angles, thicks)
             energys = energys[idx]
+            scores = scores[idx]
             crys_vec = crys_vec[idx]
         #select samples
         samples_num = Num_Clusters_per_Node*self.work_nodes_num
@@ -61,25 +68,25 @@ class Select(SSHTools, GNNSlice):
             idx = np.arange(len(energys))
             #delete duplicates by crystal vectors
             idx_del = self.delete_duplicates_crys_vec_parallel(crys_vec, energys)
-            energys_del = energys[idx_del]
+            scores_del = scores[idx_del]
             crys_vec_del = crys_vec[idx_del]
             idx = idx[idx_del]
             system_echo(f'Delete duplicates --- sample number: {len(idx)}')
-            #filter by energy
-            num = int(max(samples_num, SA_Energy_Ratio*len(energys_del)))
-            order = np.argsort(energys_del)[:num]
-            energys_filter = energys_del[order]
+            #filter by score
+            num = int(max(samples_num, SA_Energy_Ratio*len(scores_del)))
+            order = np.argsort(scores_del)[:num]
+            scores_filter = scores_del[order]
             crys_vec_filter = crys_vec_del[order]
             idx = idx[order]
             if num > samples_num:
                 #reduce dimension and clustering
                 crys_embedded = self.reduce(crys_vec_filter)
                 clusters = self.cluster(samples_num, crys_embedded)
-                idx_slt = self.min_in_cluster(idx, energys_filter, clusters)
+                idx_slt = self.min_in_cluster(idx, scores_filter, clusters)
             else:
                 idx_slt = idx
         else:
-            idx_slt = np.argsort(energys)[:samples_num]
+            idx_slt = np.argsort(scores)[:samples_num]
         #export POSCAR
         atom_pos, atom_type, atom_symm, grid_name, grid_ratio, space_group, angles, thicks = \
             self.filter_samples(idx_slt, atom_pos, atom_type, atom_symm, 
@@ -303,6 +303,28 @@ class ListRWTools:
             grid_coords = self.import_list2d(
                 f'{head}_frac_coords_{sg}.bin', float, binary=True)
             return grid_coords
+        #import distance table of full-cell images
+        if task == 'image':
+            idx_file = f'{head}_image_idx_{sg}.bin'
+            dis_file = f'{head}_image_dis_{sg}.bin'
+            if os.path.exists(idx_file) and os.path.exists(dis_file):
+                image_idx = np.array(self.import_list2d(idx_file, int, binary=True), dtype=int)
+                image_dis = np.array(self.import_list2d(dis_file, float, binary=True))
+            else:
+                image_idx, image_dis = None, None
+            return image_idx, image_dis
+        #import orbit table of grid
+        if task == 'orbit':
+            orbit_file = f'{head}_orbit_{sg}.bin'
+            if os.path.exists(orbit_file):
+                orbit = self.import_list2d(orbit_file, int, binary=True)
+            else:
+                mapping = self.import_list2d(
+                    f'{head}_mapping_{sg}.bin', int, binary=True)
+                orbit = -np.ones((len(mapping), max([len(i) for i in mapping])), dtype=int)
+                for i, line in enumerate(mapping):
+                    orbit[i, :len(line)] = line
+            return np.array(orbit, dtype=int)
         
 
 class SSHTools:
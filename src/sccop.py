@@ -425,9 +425,6 @@ class CrystalOptimization(ListRWTools, UpdateNodes):
         if len(train_pos) == 0:
             train_atom_fea, train_symm_tmp, train_nbr_fea, train_nbr_fea_idx, train_energy_tmp = [], [], [], [], []
             valid_atom_fea, valid_symm, valid_nbr_fea, valid_nbr_fea_idx, valid_energy = [], [], [], [], []
-        else:
-            train_atom_fea, train_nbr_fea, train_nbr_fea_idx = \
-                self.transfer.get_gnn_input_batch_general(train_pos, train_type, train_grid, train_ratio, train_sg)
         #get gnn input from optimzied samples
         optim_file = [i for i in os.listdir(POSCAR_Path) if i.startswith('optim')]
         if len(optim_file) > 0:
@@ -446,18 +443,36 @@ class CrystalOptimization(ListRWTools, UpdateNodes):
             add_num = int(train_valid_ratio*num)
             train_idx = idx[:add_num]
             valid_idx = idx[add_num:]
+            #replay part of old samples when warm start
+            warm_model = f'{Model_Path}/{iteration:02.0f}/model_best.pth.tar'
+            if Warm_Start_Training and os.path.exists(warm_model):
+                new_num = int(train_valid_ratio*len(energy))
+                train_idx = train_idx[:Replay_Ratio*new_num]
+                valid_idx = valid_idx[:Replay_Ratio*(len(energy)-new_num)]
+            #featurize kept old samples only
+            keep_idx = np.sort(np.concatenate((train_idx, valid_idx)))
+            keep_atom_fea, keep_nbr_fea, keep_nbr_fea_idx = [], [], []
+            if len(keep_idx) > 0:
+                keep_atom_fea, keep_nbr_fea, keep_nbr_fea_idx = \
+                    self.transfer.get_gnn_input_batch_general([train_pos[i] for i in keep_idx], [train_type[i] for i in keep_idx],
+                                                              [train_grid[i] for i in keep_idx], [train_ratio[i] for i in keep_idx],
+                                                              [train_sg[i] for i in keep_idx])
+            keep_symm = [train_symm[i] for i in keep_idx]
+            keep_energy = [train_energy[i] for i in keep_idx]
+            train_idx = np.searchsorted(keep_idx, train_idx)
+            valid_idx = np.searchsorted(keep_idx, valid_idx)
             #validation set
-            valid_atom_fea = np.array(train_atom_fea, dtype=object)[valid_idx].tolist()
-            valid_symm = np.array(train_symm, dtype=object)[valid_idx].tolist()
-            valid_nbr_fea = np.array(train_nbr_fea, dtype=object)[valid_idx].tolist()
-            valid_nbr_fea_idx = np.array(train_nbr_fea_idx, dtype=object)[valid_idx].tolist()
-            valid_energy = np.array(train_energy, dtype=object)[valid_idx].tolist()
+            valid_atom_fea = np.array(keep_atom_fea, dtype=object)[valid_idx].tolist()
+            valid_symm = np.array(keep_symm, dtype=object)[valid_idx].tolist()
+            valid_nbr_fea = np.array(keep_nbr_fea, dtype=object)[valid_idx].tolist()
+            valid_nbr_fea_idx = np.array(keep_nbr_fea_idx, dtype=object)[valid_idx].tolist()
+            valid_energy = np.array(keep_energy, dtype=object)[valid_idx].tolist()
             #train set
-            train_atom_fea = np.array(train_atom_fea, dtype=object)[train_idx].tolist()
-            train_symm_tmp = np.array(train_symm, dtype=object)[train_idx].tolist()
-            train_nbr_fea = np.array(train_nbr_fea, dtype=object)[train_idx].tolist()
-            train_nbr_fea_idx = np.array(train_nbr_fea_idx, dtype=object)[train_idx].tolist()
-            train_energy_tmp = np.array(train_energy, dtype=object)[train_idx].tolist()
+            train_atom_fea = np.array(keep_atom_fea, dtype=object)[train_idx].tolist()
+            train_symm_tmp = np.array(keep_symm, dtype=object)[train_idx].tolist()
+            train_nbr_fea = np.array(keep_nbr_fea, dtype=object)[train_idx].tolist()
+            train_nbr_fea_idx = np.array(keep_nbr_fea_idx, dtype=object)[train_idx].tolist()
+            train_energy_tmp = np.array(keep_energy, dtype=object)[train_idx].tolist()
         #divide searched samples
         num = len(energy)
         idx = np.arange(num)
@@ -500,7 +515,13 @@ class CrystalOptimization(ListRWTools, UpdateNodes):
         valid_data = GNNData(valid_atom_fea, valid_symm, valid_nbr_fea,
                              valid_nbr_fea_idx, valid_energy)
         gnn = GNNTrain(iteration+1, train_data, valid_data, valid_data, train_batchsize=batchsize)
-        gnn.train_epochs()
+        if Distributed_Training and Job_Queue == 'CPU':
+            gnn.train_epochs_distributed()
+        else:
+            gnn.train_epochs()
+        model = f'{Model_Path}/{iteration+1:02.0f}/model_best.pth.tar'
+        self.slice.fit_ensemble(model, train_data)
+        self.slice.check_precision(model, train_data)
         #update train set
         self.update_dataset(atom_pos, atom_type, atom_symm,
                             grid_name, grid_ratio, space_group, angles, thicks, energy,
@@ -616,5 +637,9 @@ if __name__ == '__main__':
     recycle = args.recyc
     
     sccop = CrystalOptimization()
-    sccop.main(recycle)
+    #os._exit skips exit handlers, close worker pool here
+    try:
+        sccop.main(recycle)
+    finally:
+        sccop.transfer.close_worker_pool()
     os._exit(0)
\ No newline at end of file
@@ -0,0 +1,43 @@
+import os, sys
+
+import pytest
+
+sys.path.append(f'{os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}/src')
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    #relative paths of log and models point into temporary directory
+    os.makedirs(f'{tmp_path}/data/gnn_model')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def search(workdir):
+    #search on a small P1 grid with a random model, no grid files needed
+    pytest.importorskip('torch')
+    pytest.importorskip('pymatgen')
+    from collections import OrderedDict
+    import numpy as np
+    import torch
+    from core.multi_SA import Search
+    from core.neighbors import Neighbors
+    search = Search.__new__(Search)
+    Neighbors.__init__(search)
+    search.ele_types, search.bond_list = [6, 8], [[1.8, 1.8], [1.8, 1.8]]
+    search.bond_matrix = np.array(search.bond_list)
+    search.device, search.session = torch.device('cpu'), None
+    torch.manual_seed(0)
+    search.load_session('random')
+    search.elem_embed = np.random.RandomState(0).rand(10, 92).astype(np.float32)
+    search.latt_vec = np.eye(3)*8
+    axis = np.arange(4)/4
+    search.grid_coords = np.array([[i, j, k] for i in axis for j in axis for k in axis])
+    mapping = [[i] for i in range(len(search.grid_coords))]
+    search.grid_idx, search.grid_dis = search.get_neighbors_DAU(search.latt_vec, search.grid_coords, 6, mapping)
+    search.image_idx, search.image_dis = search.get_neighbors_DAU(search.latt_vec, search.grid_coords, search.dmax, mapping)
+    search.symm_site, search.orbit = search.group_symm_sites(mapping), None
+    search.state_cache = OrderedDict()
+    search.cache_hit, search.cache_miss = 0, 0
+    search.sa_record = []
+    return search
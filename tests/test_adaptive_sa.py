@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import core.multi_SA as multi_SA
+
+
+@pytest.fixture
+def adaptive(monkeypatch):
+    for name, value in [('Adaptive_SA', True), ('SA_Steps', 60), ('SA_Target_Accept', .4),
+                        ('SA_Adapt_Window', 5), ('SA_Adapt_Gain', 2), ('SA_Patience', 10)]:
+        monkeypatch.setattr(multi_SA, name, value)
+
+def start_state(search):
+    pos, type, symm = [0, 21, 42, 63, 10, 53], [6, 6, 6, 8, 8, 8], [1 for _ in range(6)]
+    search.nbr_idx, search.nbr_dis = search.get_nbr_by_table(pos, 1, search.image_idx, search.image_dis, nbr_num=30)
+    nbr_idx, nbr_dis = search.cut_pad_neighbors(search.nbr_idx, search.nbr_dis, search.nbr)
+    energy, vec = search.predict_single(symm, search.get_atom_fea(type, search.elem_embed), nbr_dis, nbr_idx)
+    return pos, type, symm, 0, 1, 1, [], [], energy, vec
+
+def test_temperature_tuned_at_window_end(search, adaptive):
+    #first window targets rate .4*(1-5/60)
+    target = .4*(1-5/60)
+    for accept_num in range(6):
+        T, num = search.adapt_temperature(4, 1., accept_num)
+        assert np.isclose(T, np.exp(2*(target-accept_num/5)))
+        assert num == 0
+    assert search.adapt_temperature(3, 1., 2) == (1., 2)
+    #ladder is scaled by acceptance of all chains
+    ladder, num = search.adapt_temperature(9, np.array([1., .1]), 4, steps=20, chains=2)
+    assert np.allclose(ladder, np.array([1., .1])*np.exp(2*(.4*(1-10/20)-4/10)))
+    assert num == 0
+
+def test_early_stop_reasons(search, adaptive):
+    assert search.check_early_stop(15, 5, 5) == 'frozen'
+    assert search.check_early_stop(15, 14, 5) == 'no improvement'
+    assert search.check_early_stop(15, 14, 6) is None
+
+@pytest.mark.parametrize('mode', ['single', 'batch', 'pt'])
+def test_frozen_chains_stop_and_are_recorded(search, adaptive, mode):
+    #no move is legal with long bonds, chains freeze after patience
+    search.bond_list = [[3.5, 3.5], [3.5, 3.5]]
+    search.bond_matrix = np.array(search.bond_list)
+    search.sa_record = []
+    state = start_state(search)
+    if mode == 'single':
+        search.explore_pos_general(*state)
+    elif mode == 'batch':
+        search.explore_pos_general_batch(*state, 3)
+    else:
+        search.explore_pos_general_pt(*state, 4, 60)
+    assert len(search.sa_record) == (3 if mode == 'batch' else 1)
+    for steps, reason in search.sa_record:
+        assert steps < 60
+        assert reason in ['frozen', 'no improvement']
+
+def test_chains_run_all_steps_without_adaptive(search, adaptive, monkeypatch):
+    monkeypatch.setattr(multi_SA, 'Adaptive_SA', False)
+    search.sa_record = []
+    state = start_state(search)
+    search.explore_pos_general(*state)
+    search.explore_pos_general_pt(*state, 4, 30)
+    assert search.sa_record == [(60, 'max steps'), (30, 'max steps')]
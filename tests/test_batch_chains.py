@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import core.multi_SA as multi_SA
+
+
+def run_sa(search, batch, seed, chains=1):
+    #np.random.seed is disabled, it would reseed from the system inside the search
+    np.random.set_state(np.random.RandomState(seed).get_state())
+    search.state_cache.clear()
+    search.sa_record = []
+    pos, type, symm = [0, 21, 42, 63, 10, 53], [6, 6, 6, 8, 8, 8], [1 for _ in range(6)]
+    search.nbr_idx, search.nbr_dis = search.get_nbr_by_table(pos, 1, search.image_idx, search.image_dis, nbr_num=30)
+    nbr_idx, nbr_dis = search.cut_pad_neighbors(search.nbr_idx, search.nbr_dis, search.nbr)
+    energy, vec = search.predict_single(symm, search.get_atom_fea(type, search.elem_embed), nbr_dis, nbr_idx)
+    args = (pos, type, symm, 0, 1, 1, [], [], energy, vec)
+    if batch:
+        return search.explore_pos_general_batch(*args, chains)
+    return search.explore_pos_general(*args)
+
+@pytest.fixture
+def fixed_seed(monkeypatch):
+    monkeypatch.setattr(np.random, 'seed', lambda *args: None)
+    monkeypatch.setattr(multi_SA, 'SA_Steps', 40)
+    monkeypatch.setattr(multi_SA, 'SA_Incremental_GNN', False)
+
+@pytest.mark.parametrize('adaptive', [False, True])
+@pytest.mark.parametrize('bond', [1.8, 3.5])
+def test_single_batched_chain_matches_sequential(search, fixed_seed, monkeypatch, adaptive, bond):
+    #long bonds reject many moves, so chains keep atoms
+    search.bond_list = [[bond, bond], [bond, bond]]
+    search.bond_matrix = np.array(search.bond_list)
+    monkeypatch.setattr(multi_SA, 'Adaptive_SA', adaptive)
+    monkeypatch.setattr(multi_SA, 'SA_Patience', 10)
+    for i in range(3):
+        result_1 = run_sa(search, False, i)
+        record_1 = search.sa_record
+        result_2 = run_sa(search, True, i)
+        record_2 = search.sa_record
+        assert len(result_1[0]) > 1 or bond > 3
+        for item_1, item_2 in zip(result_1[:8], result_2[:8]):
+            assert item_1 == item_2
+        assert np.allclose(result_1[8], result_2[8], atol=1e-5)
+        assert np.allclose(result_1[9], result_2[9], atol=1e-5)
+        assert record_1 == record_2
+
+def test_batched_scores_match_single_forward(search, fixed_seed):
+    atom_pos, atom_type, atom_symm, _, _, _, _, _, energys, crys_vec = run_sa(search, True, 0, chains=4)
+    assert len(search.sa_record) == 4
+    for pos, type, symm, energy, vec in zip(atom_pos, atom_type, atom_symm, energys, crys_vec):
+        nbr_idx, nbr_dis = search.get_nbr_by_table(pos, 1, search.image_idx, search.image_dis, nbr_num=30)
+        nbr_idx, nbr_dis = search.cut_pad_neighbors(nbr_idx, nbr_dis, search.nbr)
+        energy_single, vec_single = search.predict_single(symm, search.get_atom_fea(type, search.elem_embed), nbr_dis, nbr_idx)
+        assert np.isclose(energy, energy_single, atol=1e-5)
+        assert np.allclose(vec, vec_single, atol=1e-5)
@@ -0,0 +1,57 @@
+import os, time
+
+import pytest
+
+torch = pytest.importorskip('torch')
+import core.GNN_model as GNN_model
+from core.GNN_model import GNNTrain
+
+
+@pytest.fixture
+def trainer(tmp_path, monkeypatch):
+    #slow writer records order of start and end of writes
+    events, save = [], torch.save
+    def slow_save(state, filename):
+        events.append(('start', os.path.basename(filename)))
+        time.sleep(.05)
+        save(state, filename)
+        events.append(('end', os.path.basename(filename)))
+    monkeypatch.setattr(torch, 'save', slow_save)
+    monkeypatch.setattr(GNN_model, 'Checkpoint_Interval', 2)
+    gnn = GNNTrain.__new__(GNNTrain)
+    gnn.model_save_path, gnn.save_thread = str(tmp_path), None
+    return gnn, events
+
+def make_state(value):
+    return {'state_dict': {'w': torch.full((3,), float(value))},
+            'normalizer': {'mean': torch.tensor(0.), 'std': torch.tensor(1.)}}
+
+@pytest.mark.parametrize('background', [False, True])
+def test_checkpoints_are_written_in_order(trainer, monkeypatch, background):
+    monkeypatch.setattr(GNN_model, 'Checkpoint_Background', background)
+    gnn, events = trainer
+    best = [True, True, False, True, False, False]
+    for epoch, is_best in enumerate(best):
+        state = make_state(epoch)
+        gnn.save_checkpoint(epoch, state, is_best)
+        #later updates of the model do not reach the written copy
+        state['state_dict']['w'] += 100
+    gnn.wait_checkpoint()
+    names = ['model_best', 'model_best', 'checkpoint-001', 'model_best', 'checkpoint-003', 'checkpoint-005']
+    names = [f'{i}.pth.tar' for i in names]
+    #one write at a time, in call order
+    assert events == [(j, i) for i in names for j in ['start', 'end']]
+    assert torch.equal(gnn.best_state['state_dict']['w'], torch.full((3,), 3.))
+    params = torch.load(f'{gnn.model_save_path}/model_best.pth.tar', weights_only=True)
+    assert torch.equal(params['state_dict']['w'], torch.full((3,), 3.))
+    params = torch.load(f'{gnn.model_save_path}/checkpoint-005.pth.tar', weights_only=True)
+    assert torch.equal(params['state_dict']['w'], torch.full((3,), 5.))
+
+def test_background_write_returns_before_file_is_written(trainer, monkeypatch):
+    monkeypatch.setattr(GNN_model, 'Checkpoint_Background', True)
+    gnn, events = trainer
+    gnn.save_checkpoint(0, make_state(0), True)
+    assert ('end', 'model_best.pth.tar') not in events
+    gnn.wait_checkpoint()
+    assert events[-1] == ('end', 'model_best.pth.tar')
+    assert gnn.save_thread is None
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from core.neighbors import Neighbors
+
+
+#reference implementation before vectorization
+def old_divide_neighbors(centers, points, dis, ratio=1):
+    nbr_idx, nbr_dis = [], []
+    tmp_idx, tmp_dis = [], []
+    last = centers[0]
+    for i, center in enumerate(centers):
+        if center == last:
+            tmp_dis.append(dis[i])
+            tmp_idx.append(points[i])
+        else:
+            order = np.argsort(tmp_dis)
+            nbr_idx.append(np.array(tmp_idx)[order])
+            nbr_dis.append(ratio*np.array(tmp_dis)[order])
+            tmp_idx, tmp_dis = [points[i]], [dis[i]]
+            last = center
+    order = np.argsort(tmp_dis)
+    nbr_idx.append(np.array(tmp_idx)[order])
+    nbr_dis.append(ratio*np.array(tmp_dis)[order])
+    return nbr_idx, nbr_dis
+
+def old_fill_neighbors(atom_num, centers, nbr_idx, nbr_dis, dmax):
+    uni_atom = np.unique(centers)
+    if atom_num > len(uni_atom):
+        lack_idx = np.setdiff1d(np.arange(atom_num), uni_atom)[::-1]
+        for i in lack_idx:
+            nbr_idx.insert(i, [i])
+            nbr_dis.insert(i, [dmax])
+    return nbr_idx, nbr_dis
+
+def old_cut_pad_neighbors(nbr_idx, nbr_dis, nbr_num, dmax):
+    nbr_idx = [np.pad(i[:nbr_num], (0, nbr_num-len(i[:nbr_num])), constant_values=i[:nbr_num][-1]) for i in nbr_idx]
+    nbr_dis = [np.pad(i[:nbr_num], (0, nbr_num-len(i[:nbr_num])), constant_values=dmax+1) for i in nbr_dis]
+    return np.array(nbr_idx, dtype=int), np.array(nbr_dis)
+
+def old_reduce_to_DAU(nbr_idx, nbr_dis, mapping):
+    nbr_idx = np.array(nbr_idx)
+    for line in mapping:
+        if len(line) > 1:
+            for atom in line[1:]:
+                nbr_idx[nbr_idx==atom] = line[0]
+    return nbr_idx, np.array(nbr_dis)
+
+def random_neighbor_list(rng, atom_num, point_num, lack=()):
+    count = rng.randint(1, 25, atom_num)
+    count[list(lack)] = 0
+    centers = np.repeat(np.arange(atom_num), count)
+    points = rng.randint(0, point_num, len(centers))
+    dis = rng.uniform(0.5, 8, len(centers))
+    return centers, points, dis
+
+@pytest.mark.parametrize('nbr_num', [1, 12, 30])
+@pytest.mark.parametrize('lack', [(), (3,)])
+def test_dense_neighbors_match_old_path(nbr_num, lack):
+    rng = np.random.RandomState(nbr_num)
+    nbr = Neighbors()
+    atom_num = 8
+    centers, points, dis = random_neighbor_list(rng, atom_num, 20, lack)
+    nbr_idx, nbr_dis = old_divide_neighbors(centers, points, dis, ratio=1.2)
+    nbr_idx, nbr_dis = old_fill_neighbors(atom_num, centers, nbr_idx, nbr_dis, nbr.dmax)
+    old_idx, old_dis = old_cut_pad_neighbors(nbr_idx, nbr_dis, nbr_num, nbr.dmax)
+    #input order of pairs does not matter
+    order = rng.permutation(len(centers))
+    new_idx, new_dis = nbr.get_dense_neighbors(atom_num, centers[order], points[order], dis[order], nbr_num, ratio=1.2)
+    assert np.array_equal(old_idx, new_idx)
+    assert np.allclose(old_dis, new_dis)
+    #ragged rows are cut and padded in the same way
+    new_idx, new_dis = nbr.cut_pad_neighbors(nbr_idx, nbr_dis, nbr_num)
+    assert np.array_equal(old_idx, new_idx)
+    assert np.allclose(old_dis, new_dis)
+
+def test_dense_neighbors_reduce_to_DAU():
+    rng = np.random.RandomState(5)
+    nbr = Neighbors()
+    atom_num = 4
+    mapping = [[0, 4, 5], [1], [2, 6, 7, 8], [3, 9]]
+    centers, points, dis = random_neighbor_list(rng, atom_num, 10)
+    nbr_idx, nbr_dis = old_divide_neighbors(centers, points, dis)
+    max_num = max(len(i) for i in nbr_idx)
+    nbr_idx, nbr_dis = old_cut_pad_neighbors(nbr_idx, nbr_dis, max_num, nbr.dmax)
+    old_idx, old_dis = old_reduce_to_DAU(nbr_idx, nbr_dis, mapping)
+    new_idx, new_dis = nbr.get_dense_neighbors(atom_num, centers, points, dis, mapping=mapping)
+    assert np.array_equal(old_idx, new_idx)
+    assert np.allclose(old_dis, new_dis)
+
+def test_several_atoms_without_neighbors():
+    rng = np.random.RandomState(6)
+    nbr = Neighbors()
+    atom_num = 6
+    centers, points, dis = random_neighbor_list(rng, atom_num, 10, lack=(1, 4))
+    new_idx, new_dis = nbr.get_dense_neighbors(atom_num, centers, points, dis, 12)
+    #atoms without neighbors take themselves, other rows keep their neighbors
+    for i in [1, 4]:
+        assert np.all(new_idx[i] == i)
+        assert new_dis[i, 0] == nbr.dmax
+        assert np.all(new_dis[i, 1:] == nbr.dmax+1)
+    for i in [0, 2, 3, 5]:
+        order = np.argsort(dis[centers==i])[:12]
+        num = len(order)
+        assert np.array_equal(new_idx[i, :num], points[centers==i][order])
+        assert np.allclose(new_dis[i, :num], dis[centers==i][order])
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('pymatgen')
+from core.GNN_model import CrystalGraphConvNet, GaussianExpand
+from core.neighbors import Neighbors
+
+
+def test_expansion_matches_neighbors_expand():
+    rng = np.random.RandomState(0)
+    distances = rng.uniform(0, 9, (10, 12))
+    nbr_fea = GaussianExpand()(torch.tensor(distances, dtype=torch.float32))
+    assert np.allclose(nbr_fea.numpy(), Neighbors().expand(distances), atol=1e-6)
+
+def test_model_expansion_matches_pre_expanded_input():
+    rng = np.random.RandomState(1)
+    torch.manual_seed(1)
+    model = CrystalGraphConvNet().eval()
+    atom_num, nbr = 9, 12
+    atom_fea = torch.tensor(rng.rand(atom_num, 92), dtype=torch.float32)
+    atom_symm = torch.tensor(rng.randint(1, 4, atom_num), dtype=torch.float32)
+    distances = rng.uniform(1, 7, (atom_num, nbr))
+    nbr_idx = torch.tensor(rng.randint(0, atom_num, (atom_num, nbr)))
+    crystal_idx = torch.tensor([0]*4 + [1]*5)
+    #old path expanded distances before batching
+    nbr_fea = torch.tensor(Neighbors().expand(distances), dtype=torch.float32)
+    with torch.no_grad():
+        out_1 = model(atom_fea, atom_symm, torch.tensor(distances, dtype=torch.float32), nbr_idx, crystal_idx)
+        out_2 = model(atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_idx)
+    assert torch.allclose(out_1, out_2, atol=1e-5)
+
+def test_old_checkpoint_loads():
+    model = CrystalGraphConvNet()
+    state = model.state_dict()
+    assert not any(k.startswith('expansion.') for k in state)
+    CrystalGraphConvNet().load_state_dict(state)
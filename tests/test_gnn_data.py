@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+from core.GNN_model import GNNData, GNNTrain, AtomBudgetSampler, collate_pool_cpu
+
+
+def random_arrays(num, seed=0):
+    rng = np.random.RandomState(seed)
+    atom_feas, atom_symm, nbr_feas, nbr_idxes, targets = [], [], [], [], []
+    for _ in range(num):
+        n = rng.randint(1, 7)
+        atom_feas.append(rng.rand(n, 4))
+        atom_symm.append(rng.randint(1, 4, n))
+        nbr_feas.append(rng.rand(n, 3))
+        nbr_idxes.append(rng.randint(0, n, (n, 3)))
+        targets.append(rng.rand())
+    return atom_feas, atom_symm, nbr_feas, nbr_idxes, targets
+
+def random_data(num, seed=0):
+    return GNNData(*random_arrays(num, seed))
+
+def test_items_match_samples():
+    arrays = random_arrays(9)
+    data = GNNData(*arrays)
+    for i in range(9):
+        atom_fea, atom_symm, nbr_fea, nbr_idx, target = data[i]
+        assert np.allclose(atom_fea.numpy(), arrays[0][i])
+        assert atom_symm == arrays[1][i].tolist()
+        assert np.allclose(nbr_fea.numpy(), arrays[2][i])
+        assert np.array_equal(nbr_idx.numpy(), arrays[3][i])
+        assert np.isclose(target.item(), arrays[4][i])
+
+def test_state_dict_loads_without_pickle(tmp_path):
+    data = random_data(9)
+    torch.save({'train': data.state_dict()}, f'{tmp_path}/data.pth.tar')
+    state = torch.load(f'{tmp_path}/data.pth.tar', weights_only=True)
+    rebuild = GNNData([], [], [], [], [])
+    rebuild.load_state_dict(state['train'])
+    assert len(rebuild) == len(data)
+    assert np.array_equal(rebuild.offsets, data.offsets)
+    for i in range(len(data)):
+        for x, y in zip(data[i], rebuild[i]):
+            assert torch.equal(torch.as_tensor(x), torch.as_tensor(y))
+
+@pytest.mark.parametrize('idx', [[0], [2, 3, 4], [5, 1, 7], [8, 0, 3, 3]])
+def test_packed_batch_matches_collate(idx):
+    data = random_data(9)
+    (atom_fea, atom_symm, nbr_fea, nbr_idx, crystal_idx), target = data[idx]
+    (atom_fea_2, atom_symm_2, nbr_fea_2, nbr_idx_2, crystal_idx_2), target_2 = \
+        collate_pool_cpu([data[i] for i in idx])
+    assert torch.equal(atom_fea, atom_fea_2)
+    assert torch.equal(atom_symm, atom_symm_2)
+    assert torch.equal(nbr_fea, nbr_fea_2)
+    assert torch.equal(nbr_idx, nbr_idx_2)
+    assert torch.equal(crystal_idx, crystal_idx_2)
+    assert torch.equal(target, target_2)
+
+def test_sampler_length_keeps_order():
+    data = random_data(40)
+    sampler_1 = AtomBudgetSampler(data, 4, shuffle=True)
+    sampler_2 = AtomBudgetSampler(data, 4, shuffle=True)
+    np.random.seed(1)
+    batches_1 = list(sampler_1)
+    np.random.seed(1)
+    num = len(sampler_2)
+    #length and iteration share batches, random state is used once
+    state = np.random.get_state()[1].copy()
+    assert len(sampler_2) == num
+    batches_2 = list(sampler_2)
+    assert np.array_equal(state, np.random.get_state()[1])
+    assert batches_1 == batches_2
+    assert len(batches_2) == num
+    #batches are kept in epoch and shuffled again in next epoch
+    assert list(sampler_2) == batches_2
+    sampler_2.set_epoch(1)
+    assert list(sampler_2) != batches_2
+
+def test_sampler_covers_samples_once():
+    data = random_data(40)
+    sampler = AtomBudgetSampler(data, 4, shuffle=True)
+    for epoch in range(3):
+        sampler.set_epoch(epoch)
+        idx = sorted(i for batch in sampler for i in batch)
+        assert idx == list(range(40))
+
+@pytest.mark.parametrize('num, world_size', [(40, 2), (40, 3), (3, 8), (1, 4)])
+def test_sampler_ranks_cover_samples(num, world_size):
+    data = random_data(num)
+    samplers = [AtomBudgetSampler(data, 4, shuffle=True, rank=i, world_size=world_size) for i in range(world_size)]
+    for sampler in samplers:
+        sampler.set_epoch(3)
+    #every rank steps the same number of times, at least once
+    assert len(set(len(sampler) for sampler in samplers)) == 1
+    assert len(samplers[0]) > 0
+    batches = [batch for sampler in samplers for batch in sampler]
+    assert sorted(set(i for batch in batches for i in batch)) == list(range(num))
+    #repeated batches only pad the last round
+    assert len(batches) - len(set(tuple(batch) for batch in batches)) < world_size
+
+def sync_worker(rank, port, queue):
+    import torch.distributed as dist
+    dist.init_process_group('gloo', init_method=f'tcp://127.0.0.1:{port}', rank=rank, world_size=2)
+    gnn = GNNTrain.__new__(GNNTrain)
+    #ranks disagree locally, decision of rank 0 is taken
+    if rank == 0:
+        result = gnn.sync_decision(torch.tensor(0.25), True, False)
+    else:
+        result = gnn.sync_decision(0.75, False, True)
+    queue.put((rank, result))
+    dist.destroy_process_group()
+
+def test_sync_decision_follows_rank_0():
+    import socket
+    import torch.multiprocessing as torchmp
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    ctx = torchmp.get_context('spawn')
+    queue = ctx.SimpleQueue()
+    torchmp.spawn(sync_worker, args=(port, queue), nprocs=2, join=True)
+    results = dict(queue.get() for _ in range(2))
+    assert results[0] == results[1] == (0.25, True, False)
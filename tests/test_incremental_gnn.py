@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+from core.GNN_tool import InferenceSession
+from core.multi_SA import Search
+
+
+def random_move(rng, type, nbr_idx, nbr_dis):
+    #change type of one atom and neighbors of two atoms
+    type, nbr_idx, nbr_dis = type.copy(), nbr_idx.copy(), nbr_dis.copy()
+    atom_num, nbr = nbr_idx.shape
+    type[rng.randint(atom_num)] = rng.randint(5)
+    for i in rng.choice(atom_num, 2, replace=False):
+        nbr_idx[i] = rng.randint(0, atom_num, nbr)
+        nbr_dis[i] = np.sort(rng.uniform(1, 5, nbr))
+    return type, nbr_idx, nbr_dis
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_incremental_matches_full_forward(workdir, seed):
+    rng = np.random.RandomState(seed)
+    session = InferenceSession(torch.device('cpu'))
+    session.load('random')
+    search = Search.__new__(Search)
+    atom_num, nbr = 16, 12
+    embed = rng.rand(5, 92).astype(np.float32)
+    symm = rng.randint(1, 4, atom_num)
+    type = rng.randint(0, 5, atom_num)
+    nbr_idx = rng.randint(0, atom_num, (atom_num, nbr))
+    nbr_dis = np.sort(rng.uniform(1, 5, (atom_num, nbr)), axis=1).astype(np.float32)
+    _, _, layer_fea = session.predict_cache(symm, embed[type], nbr_dis, nbr_idx)
+    #cached features stay exact along a chain of accepted moves
+    for _ in range(8):
+        type_2, nbr_idx_2, nbr_dis_2 = random_move(rng, type, nbr_idx, nbr_dis)
+        changed = search.get_changed_atoms(type, type_2, nbr_idx, nbr_dis, nbr_idx_2, nbr_dis_2)
+        energy_1, vec_1, layer_fea = session.predict_cache(symm, embed[type_2], nbr_dis_2, nbr_idx_2, layer_fea, changed)
+        energy_2, vec_2, layer_fea_full = session.predict_cache(symm, embed[type_2], nbr_dis_2, nbr_idx_2)
+        assert np.isclose(energy_1, energy_2, atol=1e-5)
+        assert np.allclose(vec_1, vec_2, atol=1e-5)
+        for fea_1, fea_2 in zip(layer_fea, layer_fea_full):
+            assert torch.allclose(fea_1, fea_2, atol=1e-5)
+        type, nbr_idx, nbr_dis = type_2, nbr_idx_2, nbr_dis_2
+
+def test_unchanged_state_gives_same_result(workdir):
+    rng = np.random.RandomState(3)
+    session = InferenceSession(torch.device('cpu'))
+    session.load('random')
+    symm = rng.randint(1, 4, 6)
+    atom_fea = rng.rand(6, 92).astype(np.float32)
+    nbr_idx = rng.randint(0, 6, (6, 12))
+    nbr_dis = rng.uniform(1, 5, (6, 12)).astype(np.float32)
+    energy_1, vec_1, layer_fea = session.predict_cache(symm, atom_fea, nbr_dis, nbr_idx)
+    energy_2, vec_2, _ = session.predict_cache(symm, atom_fea, nbr_dis, nbr_idx, layer_fea, np.zeros(0, dtype=int))
+    assert energy_1 == energy_2
+    assert np.array_equal(vec_1, vec_2)
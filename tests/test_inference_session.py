@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+from core.GNN_tool import InferenceSession
+
+
+def random_input(atom_num, nbr=12, seed=0):
+    rng = np.random.RandomState(seed)
+    symm = rng.randint(1, 4, atom_num)
+    atom_fea = rng.rand(atom_num, 92).astype(np.float32)
+    nbr_fea = rng.uniform(1, 4, (atom_num, nbr)).astype(np.float32)
+    nbr_idx = rng.randint(0, atom_num, (atom_num, nbr))
+    return symm, atom_fea, nbr_fea, nbr_idx
+
+@pytest.fixture
+def session(workdir):
+    session = InferenceSession(torch.device('cpu'))
+    session.load('random')
+    return session
+
+def test_buffers_shared_by_predict_and_cache(session):
+    #buffers are allocated by one path and refilled by the other
+    for atom_num in [3, 5, 12, 4]:
+        symm, atom_fea, nbr_fea, nbr_idx = random_input(atom_num, seed=atom_num)
+        energys, crys_vec = session.predict(symm, atom_fea, nbr_fea, nbr_idx, np.zeros(atom_num, dtype=int))
+        energy, vec, _ = session.predict_cache(symm, atom_fea, nbr_fea, nbr_idx)
+        assert np.isclose(energys[0], energy, atol=1e-5)
+        assert np.allclose(crys_vec[0], vec, atol=1e-5)
+    for atom_num in [40, 6]:
+        symm, atom_fea, nbr_fea, nbr_idx = random_input(atom_num, seed=atom_num)
+        energy, vec, _ = session.predict_cache(symm, atom_fea, nbr_fea, nbr_idx)
+        energys, crys_vec = session.predict(symm, atom_fea, nbr_fea, nbr_idx, np.zeros(atom_num, dtype=int))
+        assert np.isclose(energys[0], energy, atol=1e-5)
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('torch')
+from core.multi_SA import ActionSpace
+
+
+def action_space(bond_list):
+    action = ActionSpace.__new__(ActionSpace)
+    action.ele_types = list(range(len(bond_list)))
+    action.bond_list = bond_list
+    action.bond_matrix = np.array(bond_list)
+    return action
+
+def random_state(rng, ele_num, grid_num=60, nbr=12, atom_num=8):
+    #neighbor rows end beyond every bond so the old loops always break
+    grid_idx = rng.randint(0, grid_num, (grid_num, nbr))
+    grid_dis = np.sort(rng.uniform(.5, 3, (grid_num, nbr)), axis=1)
+    grid_dis[:, -1] = 5
+    symm_site = {1: list(range(0, 40)), 2: list(range(40, grid_num))}
+    symm = rng.choice([1, 2, -2], atom_num)
+    pos = [rng.choice(symm_site[abs(i)]) for i in symm]
+    type = rng.randint(0, ele_num, atom_num)
+    return pos, type, symm, symm_site, grid_idx, grid_dis
+
+def old_action_filter(action, idx, pos, type, symm, symm_site, ratio, grid_idx, grid_dis, move=True):
+    #per-row loops removed from ActionSpace, without the random limit
+    obstacle = np.delete(pos, idx, axis=0).tolist() if move else pos
+    equal_symm = np.abs(symm).tolist()
+    sites = symm_site[equal_symm[idx]]
+    forbid, occupy = [], []
+    if len(obstacle) > 0:
+        nbr_idx = grid_idx[obstacle]
+        nbr_dis = grid_dis[obstacle]*ratio
+        for i, item in enumerate(nbr_dis):
+            nbr_cutoff = np.min(action.bond_list[action.ele_types.index(type[i])])
+            for j, dis in enumerate(item):
+                if nbr_cutoff < dis:
+                    break
+            forbid.append(nbr_idx[i][:j])
+        forbid = np.unique(np.concatenate(forbid))
+        occupy = [p for i, p in enumerate(pos) if equal_symm[i] == equal_symm[idx]]
+    available = np.setdiff1d(np.setdiff1d(sites, occupy), np.intersect1d(sites, forbid))
+    center_idx = action.ele_types.index(type[idx])
+    nbr_cutoff = action.bond_list[center_idx][center_idx]
+    allow = []
+    for point in available:
+        close = grid_idx[point][grid_dis[point]*ratio < nbr_cutoff]
+        if point not in close:
+            allow.append(point)
+    return np.array(allow, dtype=int)
+
+def pair_action_filter(action, idx, pos, type, symm, symm_site, ratio, grid_idx, grid_dis, move=True):
+    #site by site check with the bond length of each element pair
+    allow = []
+    for site in symm_site[abs(symm[idx])]:
+        if site in pos:
+            continue
+        legal = True
+        for i, p in enumerate(pos):
+            if move and i == idx:
+                continue
+            radius = action.bond_list[type[idx]][type[i]]
+            close = grid_idx[p][grid_dis[p]*ratio < radius]
+            legal &= site not in close
+        close = grid_idx[site][grid_dis[site]*ratio < action.bond_list[type[idx]][type[idx]]]
+        legal &= site not in close
+        if legal:
+            allow.append(site)
+    return np.array(allow, dtype=int)
+
+@pytest.mark.parametrize('move', [True, False])
+def test_single_element_matches_old_loops(move):
+    rng = np.random.RandomState(0)
+    action = action_space([[1.6]])
+    for _ in range(20):
+        pos, type, symm, symm_site, grid_idx, grid_dis = random_state(rng, 1)
+        idx = rng.randint(len(pos))
+        args = (idx, pos, type, symm, symm_site, 1.1, grid_idx, grid_dis)
+        allow = action.legal_sites(*args, move=move)
+        assert np.array_equal(np.sort(allow), old_action_filter(action, *args, move=move))
+
+@pytest.mark.parametrize('move', [True, False])
+def test_element_pairs_match_site_by_site_check(move):
+    rng = np.random.RandomState(1)
+    action = action_space([[1.2, 1.8, 1.5], [1.8, 2.2, 1.4], [1.5, 1.4, 1.0]])
+    for _ in range(20):
+        pos, type, symm, symm_site, grid_idx, grid_dis = random_state(rng, 3)
+        idx = rng.randint(len(pos))
+        args = (idx, pos, type, symm, symm_site, 1.1, grid_idx, grid_dis)
+        allow = action.legal_sites(*args, move=move)
+        assert np.array_equal(np.sort(allow), pair_action_filter(action, *args, move=move))
+
+def test_action_filter_limits_legal_sites():
+    rng = np.random.RandomState(2)
+    action = action_space([[1.6]])
+    pos, type, symm, symm_site, grid_idx, grid_dis = random_state(rng, 1)
+    args = (0, pos, type, symm, symm_site, 1.1, grid_idx, grid_dis)
+    legal = action.legal_sites(*args)
+    allow = action.action_filter(*args, limit=3)
+    assert len(allow) == min(3, len(legal))
+    assert set(allow) <= set(legal.tolist())
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pymatgen')
+from pymatgen.core.structure import Structure
+from core.neighbors import Neighbors
+
+
+def sorted_pairs(centers, points, dis):
+    order = np.lexsort((dis, points, centers))
+    return np.array(centers)[order], np.array(points)[order], np.array(dis)[order]
+
+def assert_same_neighbors(latt_vec, coords, cutoff, center_num):
+    stru = Structure(latt_vec, [1 for _ in range(len(coords))], coords)
+    centers_1, points_1, _, dis_1 = stru.get_neighbor_list(cutoff, sites=stru.sites[:center_num])
+    centers_2, points_2, dis_2 = Neighbors().get_neighbor_list(latt_vec, coords, cutoff, center_num=center_num)
+    centers_1, points_1, dis_1 = sorted_pairs(centers_1, points_1, dis_1)
+    centers_2, points_2, dis_2 = sorted_pairs(centers_2, points_2, dis_2)
+    assert len(dis_1) > 0
+    assert np.array_equal(centers_1, centers_2)
+    assert np.array_equal(points_1, points_2)
+    assert np.allclose(dis_1, dis_2)
+
+@pytest.mark.parametrize('cutoff', [1.5, 3, 8])
+def test_orthogonal_cell(cutoff):
+    rng = np.random.RandomState(0)
+    latt_vec = np.diag([4., 5., 6.])
+    coords = rng.uniform(0, 1, (12, 3))
+    assert_same_neighbors(latt_vec, coords, cutoff, 12)
+
+@pytest.mark.parametrize('cutoff', [2, 5, 9])
+def test_skewed_cell(cutoff):
+    rng = np.random.RandomState(1)
+    #strongly sheared cell, heights are much smaller than lengths
+    latt_vec = np.array([[4., 0, 0], [3.6, 1.5, 0], [2.5, 1.2, 2.]])
+    coords = rng.uniform(-0.5, 1.5, (15, 3))
+    assert_same_neighbors(latt_vec, coords, cutoff, 5)
+
+@pytest.mark.parametrize('seed', [2, 3, 4])
+def test_cutoff_larger_than_cell(seed):
+    rng = np.random.RandomState(seed)
+    latt_vec = np.diag(rng.uniform(1.5, 3, 3))+rng.uniform(-0.5, 0.5, (3, 3))
+    coords = rng.uniform(0, 1, (4, 3))
+    assert_same_neighbors(latt_vec, coords, 7, 4)
+
+def test_no_centers():
+    centers, points, dis = Neighbors().get_neighbor_list(np.eye(3)*3, np.random.rand(4, 3), 3, center_num=0)
+    assert len(centers) == len(points) == len(dis) == 0
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pymatgen')
+from core.neighbors import Neighbors
+
+
+def sorted_rows(nbr_idx, nbr_dis, dmax):
+    #neighbors at equal distance may come in any order
+    rows = []
+    for idx, dis in zip(nbr_idx, nbr_dis):
+        valid = dis <= dmax
+        rows.append(sorted(zip(np.round(dis[valid], 6), idx[valid])))
+    return rows
+
+@pytest.mark.parametrize('sg, latt_vec', [(1, [[4, 0, 0], [1, 5, 0], [0.5, 0.5, 6]]),
+                                          (14, [[5, 0, 0], [0, 6, 0], [-1.5, 0, 7]]),
+                                          (225, np.eye(3)*6)])
+def test_table_neighbors_match_full_recompute(sg, latt_vec):
+    rng = np.random.RandomState(sg)
+    nbr = Neighbors()
+    latt_vec = np.array(latt_vec, dtype=float)
+    dau_grid = np.concatenate((rng.rand(12, 3), [[0, 0, 0], [.5, .5, .5]]))
+    grid_coords, mapping = nbr.get_orbit_points(sg, dau_grid)
+    image_idx, image_dis = nbr.get_neighbors_DAU(latt_vec, grid_coords, nbr.dmax, mapping)
+    for atom_num in [1, 3, 6]:
+        atom_pos = rng.choice(len(dau_grid), atom_num, replace=False)
+        nbr_idx_1, nbr_dis_1 = nbr.get_nbr_general(atom_pos, 1.2, sg, latt_vec, grid_coords, nbr_num=30)
+        nbr_idx_2, nbr_dis_2 = nbr.get_nbr_by_table(atom_pos, 1.2, image_idx, image_dis, nbr_num=30)
+        assert nbr_idx_1.shape == nbr_idx_2.shape
+        #ratio scales distances, cutoff is applied before scaling
+        assert sorted_rows(nbr_idx_1, nbr_dis_1/1.2, nbr.dmax) == sorted_rows(nbr_idx_2, nbr_dis_2/1.2, nbr.dmax)
+        assert np.allclose(np.sort(nbr_dis_1, axis=1), np.sort(nbr_dis_2, axis=1))
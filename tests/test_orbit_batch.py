@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pymatgen')
+from pymatgen.symmetry.groups import SpaceGroup
+from pymatgen.util.coord import pbc_diff
+from core.neighbors import Neighbors
+
+
+#reference implementation before batch orbits
+def old_get_equal_coords(point, coords):
+    equal_coords = coords.copy()
+    for i, coord in enumerate(equal_coords):
+        vec = pbc_diff(point, coord)
+        if np.linalg.norm(vec) < 1e-5:
+            del equal_coords[i]
+            break
+    return equal_coords
+
+def old_get_orbit_points(sg, dau_coords):
+    mapping = []
+    all_points = np.array(dau_coords).tolist()
+    spg = SpaceGroup.from_int_number(sg)
+    for i, point in enumerate(dau_coords):
+        equal_coords = old_get_equal_coords(point, list(spg.get_orbit(point)))
+        start = len(all_points)
+        end = start + len(equal_coords)
+        mapping.append([i] + [j for j in range(start, end)])
+        all_points += [list(j) for j in equal_coords]
+    return np.array(all_points), mapping
+
+def sample_coords(seed):
+    rng = np.random.RandomState(seed)
+    #general positions and special positions on symmetry elements
+    x = rng.rand()
+    special = [[0, 0, 0], [.5, .5, .5], [x, x, x], [x, 0, 0], [0, .5, x], [.25, .25, .25], [x, -x, .5]]
+    return np.concatenate((rng.rand(5, 3), special))
+
+@pytest.mark.parametrize('sg', [1, 2, 14, 62, 139, 166, 191, 221, 225, 227])
+def test_orbit_batch_matches_pymatgen(sg):
+    nbr = Neighbors()
+    coords = sample_coords(sg)
+    spg = SpaceGroup.from_int_number(sg)
+    images, unique = nbr.get_orbit_batch(sg, coords)
+    for i, coord in enumerate(coords):
+        orbit = np.array(spg.get_orbit(coord))
+        assert np.allclose(images[i][unique[i]], orbit)
+
+@pytest.mark.parametrize('sg', [1, 2, 14, 62, 139, 166, 191, 221, 225, 227])
+def test_orbit_points_match_old_path(sg):
+    nbr = Neighbors()
+    coords = sample_coords(sg)
+    old_points, old_mapping = old_get_orbit_points(sg, coords)
+    new_points, new_mapping = nbr.get_orbit_points(sg, coords)
+    assert old_mapping == new_mapping
+    assert np.allclose(old_points, new_points)
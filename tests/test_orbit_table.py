@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pymatgen')
+from core.neighbors import Neighbors
+
+
+@pytest.mark.parametrize('sg, latt_vec', [(14, [[5, 0, 0], [0, 6, 0], [-1.5, 0, 7]]),
+                                          (62, np.diag([5, 6, 7])),
+                                          (166, [[4, 0, 0], [-2, 3.4641, 0], [0, 0, 9]]),
+                                          (225, np.eye(3)*6)])
+def test_orbit_table_matches_orbit_expansion(sg, latt_vec):
+    rng = np.random.RandomState(sg)
+    nbr = Neighbors()
+    latt_vec = np.array(latt_vec, dtype=float)
+    #grid of general and special DAU points
+    dau_grid = np.concatenate((rng.rand(10, 3), [[0, 0, 0], [.5, .5, .5], [.25, .25, .25]]))
+    grid_coords, mapping = nbr.get_orbit_points(sg, dau_grid)
+    orbit = nbr.get_orbit_table(mapping)
+    for _ in range(3):
+        atom_pos = rng.choice(len(dau_grid), 4, replace=False)
+        all_points_1, mapping_1 = nbr.get_orbit_points(sg, grid_coords[atom_pos])
+        all_points_2, mapping_2 = nbr.expand_by_orbit(atom_pos, grid_coords, orbit)
+        assert mapping_1 == mapping_2
+        assert np.allclose(all_points_1, all_points_2)
+        nbr_idx_1, nbr_dis_1 = nbr.get_nbr_general(atom_pos, 1.1, sg, latt_vec, grid_coords)
+        nbr_idx_2, nbr_dis_2 = nbr.get_nbr_general(atom_pos, 1.1, sg, latt_vec, grid_coords, orbit=orbit)
+        assert np.array_equal(nbr_idx_1, nbr_idx_2)
+        assert np.allclose(nbr_dis_1, nbr_dis_2)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import core.multi_SA as multi_SA
+
+
+def replica_states(pos, type, energy, vec, nbr_idx, nbr_dis):
+    return [(tuple(p), tuple(t), float(e), tuple(v), n.tobytes(), d.tobytes())
+            for p, t, e, v, n, d in zip(pos, type, energy, vec, nbr_idx, nbr_dis)]
+
+def test_swap_keeps_replica_multiset(search):
+    rng = np.random.RandomState(0)
+    replicas = 6
+    ladder = np.geomspace(1, .01, replicas)
+    pos = [list(rng.randint(0, 64, 4)) for _ in range(replicas)]
+    type = [list(rng.choice([6, 8], 4)) for _ in range(replicas)]
+    energy = list(rng.rand(replicas))
+    vec = [rng.rand(3) for _ in range(replicas)]
+    nbr_idx = [rng.randint(0, 4, (4, 12)) for _ in range(replicas)]
+    nbr_dis = [rng.rand(4, 12) for _ in range(replicas)]
+    swapped = 0
+    for step in range(200):
+        before = replica_states(pos, type, energy, vec, nbr_idx, nbr_dis)
+        pos, type, energy, vec, nbr_idx, nbr_dis = \
+            search.swap_replicas(step, ladder, pos, type, energy, vec, nbr_idx, nbr_dis)
+        after = replica_states(pos, type, energy, vec, nbr_idx, nbr_dis)
+        #whole states move between neighboring temperatures only
+        assert sorted(before) == sorted(after)
+        for i, state in enumerate(after):
+            assert state in before[max(0, i-1):i+2]
+        swapped += sum([i != j for i, j in zip(before, after)])
+    assert swapped > 0
+
+def test_swaps_in_search_keep_scores(search, monkeypatch):
+    monkeypatch.setattr(multi_SA, 'PT_Swap_Interval', 2)
+    swap = search.swap_replicas
+    def checked_swap(step, ladder, *states):
+        before = replica_states(*states)
+        states = swap(step, ladder, *states)
+        assert sorted(before) == sorted(replica_states(*states))
+        return states
+    monkeypatch.setattr(search, 'swap_replicas', checked_swap)
+    pos, type, symm = [0, 21, 42, 63, 10, 53], [6, 6, 6, 8, 8, 8], [1 for _ in range(6)]
+    search.nbr_idx, search.nbr_dis = search.get_nbr_by_table(pos, 1, search.image_idx, search.image_dis, nbr_num=30)
+    nbr_idx, nbr_dis = search.cut_pad_neighbors(search.nbr_idx, search.nbr_dis, search.nbr)
+    energy, vec = search.predict_single(symm, search.get_atom_fea(type, search.elem_embed), nbr_dis, nbr_idx)
+    atom_pos, atom_type, _, _, _, _, _, _, energys, _ = \
+        search.explore_pos_general_pt(pos, type, symm, 0, 1, 1, [], [], energy, vec, 4, 20)
+    assert len(atom_pos) > 1
+    for pos, type, energy in zip(atom_pos, atom_type, energys):
+        nbr_idx, nbr_dis = search.get_nbr_by_table(pos, 1, search.image_idx, search.image_dis, nbr_num=30)
+        nbr_idx, nbr_dis = search.cut_pad_neighbors(nbr_idx, nbr_dis, search.nbr)
+        energy_single, _ = search.predict_single(symm, search.get_atom_fea(type, search.elem_embed), nbr_dis, nbr_idx)
+        assert np.isclose(energy, energy_single, atol=1e-5)
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+from core.GNN_model import CrystalGraphConvNet
+
+
+#reference implementation with per-crystal index tensors
+def old_pooling(atom_fea, atom_symm, crystal_atom_idx):
+    multiplicity = [torch.abs(atom_symm[idx_map]).view(-1, 1) for idx_map in crystal_atom_idx]
+    weights = [multi/torch.sum(multi) for multi in multiplicity]
+    summed_fea = [torch.sum(weight*atom_fea[idx_map], dim=0, keepdim=True)
+                  for weight, idx_map in zip(weights, crystal_atom_idx)]
+    return torch.cat(summed_fea, dim=0)
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_scatter_pooling_matches_loop(seed):
+    rng = np.random.RandomState(seed)
+    atom_num = rng.randint(1, 9, 7)
+    total = int(np.sum(atom_num))
+    atom_fea = torch.from_numpy(rng.randn(total, 64).astype(np.float32))
+    #pooling weights are absolute values of symmetry
+    atom_symm = torch.from_numpy((rng.randint(1, 6, total)*rng.choice([-1, 1], total)).astype(np.float32))
+    offsets = np.cumsum(atom_num) - atom_num
+    crystal_atom_idx = [torch.arange(i, i+n) for i, n in zip(offsets, atom_num)]
+    crystal_idx = torch.from_numpy(np.repeat(np.arange(len(atom_num)), atom_num))
+    model = CrystalGraphConvNet()
+    assert torch.allclose(model.pooling(atom_fea, atom_symm, crystal_idx),
+                          old_pooling(atom_fea, atom_symm, crystal_atom_idx), atol=1e-6)
@@ -0,0 +1,63 @@
+import os, time
+
+import pytest
+
+pytest.importorskip('torch')
+import core.multi_SA as multi_SA
+from core.multi_SA import SearchDaemon
+
+
+class FakeSearch:
+    #path 2 fails once, path 3 always fails, path 4 stalls once
+    def __init__(self, iteration):
+        pass
+    
+    def gnn_SA_general(self, pos, type, symm, grid, ratio, sg, angle, thick, path, node):
+        with open(f'try_{path}', 'a') as f:
+            f.write('1\n')
+        with open(f'try_{path}', 'r') as f:
+            tries = len(f.readlines())
+        if path == 2 and tries == 1 or path == 3:
+            raise ValueError(f'bad path {path}')
+        if path == 4 and tries == 1 or path == 5:
+            time.sleep(60)
+        open(f'done_{path}', 'w').close()
+
+def write_jobs(paths):
+    os.makedirs('data/search/ml_00')
+    with open('jobs.dat', 'w') as f:
+        for path in paths:
+            f.write(f'src/core/multi_SA.py --pos 0 1 --type 6 6 --symm 1 1 --angle 0 --thick 0 '
+                    f'--iteration 0 --path {path} --node 131 --grid 0 --ratio 1 --sg 1\n')
+        f.write(' \n')
+
+def count_tries(path):
+    with open(f'try_{path}', 'r') as f:
+        return len(f.readlines())
+
+@pytest.fixture
+def daemon(workdir, monkeypatch):
+    monkeypatch.setattr(multi_SA, 'Search', FakeSearch)
+    monkeypatch.setattr(multi_SA, 'General_Search', True)
+    return SearchDaemon(0, 131)
+
+def test_failed_and_stalled_paths_are_retried_once(daemon):
+    write_jobs([1, 2, 3, 4])
+    daemon.run('jobs.dat', job_limit=2, wait_time=8)
+    assert [os.path.exists(f'done_{i}') for i in [1, 2, 3, 4]] == [True, True, False, True]
+    assert [count_tries(i) for i in [1, 2, 3, 4]] == [1, 2, 2, 2]
+    assert os.listdir('data/search/ml_00') == []
+    with open('data/log.sccop', 'r') as f:
+        log = f.read()
+    assert 'ValueError: bad path 2' in log
+    assert 'SA path 3 failed on 131, give up' in log
+    assert 'SA path 4 timeout on 131, queued again' in log
+
+def test_deadline_caps_total_run_time(daemon):
+    write_jobs([1, 5, 6])
+    start = time.time()
+    daemon.run('jobs.dat', job_limit=3, wait_time=4)
+    assert time.time() - start < 8
+    assert os.path.exists('done_1') and os.path.exists('done_6')
+    assert not os.path.exists('done_5')
+    assert os.listdir('data/search/ml_00') == []
@@ -0,0 +1,56 @@
+import os
+import numpy as np
+import pytest
+
+from core.data_transfer import MultiGridTransfer
+
+
+def fake_gnn_input(atom_pos, atom_type, fea_len, nbr):
+    #features depend on sample and atom so misplaced rows are detected
+    atom_fea, nbr_fea, nbr_idx = [], [], []
+    for pos, type in zip(atom_pos, atom_type):
+        n = len(pos)
+        atom_fea.append(np.add.outer(pos, np.arange(fea_len)).astype(np.float32))
+        nbr_fea.append(np.add.outer(type, np.arange(nbr)*.5).astype(np.float32))
+        nbr_idx.append(np.tile(np.arange(nbr) % n, (n, 1)).astype(np.int64))
+    return atom_fea, nbr_fea, nbr_idx
+
+def failing_gnn_input(atom_pos, atom_type, fea_len, nbr):
+    raise ValueError('transfer failed')
+
+def shared_files():
+    if os.path.exists('/dev/shm'):
+        return set(os.listdir('/dev/shm'))
+    return set()
+
+@pytest.fixture
+def transfer():
+    transfer = MultiGridTransfer()
+    yield transfer
+    transfer.close_worker_pool()
+
+def test_shared_memory_matches_pickled_results(transfer):
+    rng = np.random.RandomState(0)
+    atom_pos = [rng.randint(0, 50, rng.randint(1, 9)).tolist() for _ in range(23)]
+    atom_type = [rng.randint(1, 5, len(i)).tolist() for i in atom_pos]
+    fea_len = 6
+    args_list = [(atom_pos[i:i+5], atom_type[i:i+5], fea_len, transfer.nbr) for i in range(0, 23, 5)]
+    before = shared_files()
+    shared = transfer.get_gnn_input_shared(fake_gnn_input, args_list, atom_pos, fea_len)
+    #blocks are unlinked before return
+    assert shared_files() == before
+    pickled = [[], [], []]
+    for seqs in transfer.map_jobs(fake_gnn_input, args_list):
+        for store, seq in zip(pickled, seqs):
+            store += seq
+    for a, b in zip(shared, pickled):
+        assert len(a) == len(b) == len(atom_pos)
+        for x, y in zip(a, b):
+            assert x.dtype == y.dtype
+            assert np.array_equal(x, y)
+
+def test_shared_memory_released_on_error(transfer):
+    before = shared_files()
+    with pytest.raises(ValueError):
+        transfer.get_gnn_input_shared(failing_gnn_input, [([[1, 2]], [[1, 1]], 4, transfer.nbr)], [[1, 2]], 4)
+    assert shared_files() == before
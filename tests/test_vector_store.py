@@ -0,0 +1,88 @@
+import os, sys
+import subprocess
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+from core.GNN_tool import InferenceSession, VectorStore
+from core.GNN_model import GNNTrain
+from core.path import Vector_Store_Path
+import core.GNN_model
+
+
+samples = ([[1, 2, 3], [1, 2, 4]], [[5, 5, 6], [5, 5, 6]], [7, 7], [1.5, 1.5], 
+           [12, 12], [[0, 0, 0], [0, 0, 0]], [[0, 1, 0], [0, 1, 0]])
+
+def test_trunk_id_is_exact(workdir):
+    session = InferenceSession(torch.device('cpu'))
+    session.load('random')
+    trunk_id = session.get_trunk_id()
+    assert trunk_id == session.get_trunk_id()
+    #change below tolerance of float sum still changes id
+    with torch.no_grad():
+        session.vec_model.embedding.bias[0] += 1e-6
+    assert trunk_id != session.get_trunk_id()
+
+def test_keys_do_not_depend_on_hash_seed():
+    script = f'import sys; sys.path.append("src"); from core.GNN_tool import VectorStore; ' \
+             f'print(VectorStore().get_keys(*{samples}))'
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    outputs = []
+    for seed in ['1', '2']:
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        outputs.append(subprocess.run([sys.executable, '-c', script], cwd=root, env=env,
+                                      capture_output=True, text=True, check=True).stdout)
+    keys = VectorStore().get_keys(*samples)
+    assert outputs[0] == outputs[1] == f'{keys}\n'
+    assert keys[0] != keys[1]
+
+def test_concurrent_writers_are_merged(workdir):
+    store_1, store_2 = VectorStore(), VectorStore()
+    store_1.load('trunk')
+    store_2.load('trunk')
+    store_1.add(['a'], [np.ones(3)])
+    store_2.add(['b'], [np.zeros(3)])
+    store_1.save()
+    store_2.save()
+    store = VectorStore()
+    store.load('trunk')
+    assert sorted(store.store) == ['a', 'b']
+    #vectors of other trunk are dropped
+    store = VectorStore()
+    store.load('other')
+    assert store.store == {}
+
+def test_save_appends_shards(workdir):
+    store = VectorStore()
+    store.load('trunk')
+    store.add(['a'], [np.ones(3)])
+    store.save()
+    shards = sorted(os.listdir(Vector_Store_Path))
+    stamps = [os.path.getmtime(f'{Vector_Store_Path}/{i}') for i in shards]
+    #nothing new, nothing written
+    store.save()
+    assert sorted(os.listdir(Vector_Store_Path)) == shards
+    store.add(['b'], [np.zeros(3)])
+    store.save()
+    assert len(os.listdir(Vector_Store_Path)) == 2
+    assert [os.path.getmtime(f'{Vector_Store_Path}/{i}') for i in shards] == stamps
+    data = np.load(f'{Vector_Store_Path}/{shards[0]}')
+    assert data['keys'].tolist() == ['a']
+    store = VectorStore()
+    store.load('trunk')
+    assert sorted(store.store) == ['a', 'b']
+
+def test_precision_changes_trunk_id(workdir):
+    session = InferenceSession(torch.device('cpu'))
+    session.load('random')
+    trunk_id = session.get_trunk_id()
+    session.set_precision('bfloat16')
+    assert trunk_id != session.get_trunk_id()
+
+def test_frozen_random_trunk_fails_fast(workdir, monkeypatch):
+    monkeypatch.setattr(core.GNN_model, 'Frozen_Trunk', True)
+    monkeypatch.setattr(core.GNN_model, 'Use_Pretrain_Model', False)
+    with pytest.raises(ValueError, match='Frozen_Trunk'):
+        GNNTrain(1, [], [], [])
+    monkeypatch.setattr(core.GNN_model, 'Use_Pretrain_Model', True)
+    GNNTrain(1, [], [], [])
@@ -0,0 +1,31 @@
+import core.data_transfer
+from core.data_transfer import Transfer, MultiGridTransfer
+
+
+def square(x):
+    return x*x
+
+def test_pool_is_shared_and_closed():
+    transfer_1, transfer_2 = Transfer(), MultiGridTransfer()
+    try:
+        assert list(transfer_1.map_jobs(square, [(i,) for i in range(10)])) == [i*i for i in range(10)]
+        pool = Transfer.worker_pool
+        assert list(transfer_2.map_jobs(square, [(3,)])) == [9]
+        assert Transfer.worker_pool is pool
+        assert Transfer.worker_cores >= 1
+    finally:
+        transfer_2.close_worker_pool()
+    assert Transfer.worker_pool is None
+    #pool is forked again after close
+    assert list(transfer_1.map_jobs(square, [(2,)])) == [4]
+    transfer_1.close_worker_pool()
+
+def test_pool_uses_half_cores_by_default(monkeypatch):
+    monkeypatch.setattr(core.data_transfer, 'Transfer_Cores', 0)
+    monkeypatch.setattr(core.data_transfer.pythonmp, 'cpu_count', lambda: 8)
+    transfer = Transfer()
+    try:
+        transfer.get_worker_pool()
+        assert Transfer.worker_cores == 4
+    finally:
+        transfer.close_worker_pool()